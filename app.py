@@ -1,52 +1,250 @@
+import asyncio
+import fcntl
+import hashlib
+import io
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, RedirectResponse, Response
+from starlette.routing import Match
 from fastapi.staticfiles import StaticFiles
-from paddleocr import PaddleOCRVL
 import os
 import shutil
 import tempfile
+import numpy as np
 import json
 import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional, Dict, List
-from pypdf import PdfReader, PdfWriter
-from pdf2image import convert_from_path
+from urllib.parse import quote
+from typing import Any, Optional, Dict, List, Tuple, Callable, Awaitable
+from PIL import Image
+from executor import run_io, shutdown_executors
+from log import print_with_time
+from batching import BatchScheduler
+from model_server import MODEL_SERVER_SOCKET, RemoteScheduler
+from page_pipeline import PagePipeline, MemoryBudget, RASTER_MEMORY_BUDGET, global_raster_budget
+from ocr_cache import PageCache, DocumentCache, OCR_CACHE_ENABLED, OCR_CACHE_SYNC_SECONDS, document_key, hash_image, hash_file
+from rasterizer import Rasterizer, EmbeddedPageImage, SCANNED_PAGE_REUSE, get_rasterizer, extract_embedded_page_image
+from text_layer import TextLayerPage, resolve_text_layer_mode, detect_text_layer_pages, extract_page_markdown, text_layer_result
+from dpi_policy import FIXED_DPI, parse_dpi_param, page_dpi_upper_bound, select_page_dpi
+from storage import (
+    OUTPUT_DIR, MOUNT_PATH, WRITE_BEHIND_ENABLED, SCRATCH_DIR, ScratchFirstStaticFiles, WriteBehindReplicator,
+    create_storage_backend, is_within, path_to_key,
+)
+from manifest import DocumentManifest, load_manifest
+from output_layout import (
+    MANIFEST_FILENAME, new_document_id, document_dir_rel, manifest_rel_path, staging_dir,
+    publish_dir, discard_dir,
+)
+from extraction import SECTION_TABLES, extract_document
+from page_sections import SECTION_FIELDS, Section, SectionPlan, parse_sections, sections_key
+from retention import RETENTION_INTERVAL, RetentionPolicy, RetentionService, format_bytes
+from metrics import (
+    METRICS_ENABLED, METRICS_FLUSH_SECONDS, CONTENT_TYPE, REGISTRY, CACHE_REQUESTS, DOCUMENT_SECONDS, JOBS,
+    MODEL_LOAD_SECONDS, QUEUE_DEPTH, REQUEST_SECONDS, REQUESTS_IN_FLIGHT, merge_snapshots, observe_stage,
+    read_peer_snapshots, record_page, retire_snapshot, render_metrics, stage_timer, write_snapshot,
+)
+from tracing import TRACING_ENABLED, current_span, record_span, span, start_span, start_trace, trace_request, use_span
+from job_queue import JobStore, STATUS_WAITING, STATUS_OCR, STATUS_ANALYSIS, STATUS_FINISH, STATUS_FAILED
 
 app = FastAPI(title="PaddleOCR-VL API")
 
-def print_with_time(message: str):
-    """Helper function untuk print dengan timestamp"""
-    timestamp = datetime.now().strftime("%H:%M")
-    print(f"{timestamp} {message}")
-
-OUTPUT_DIR = os.path.join("storage", "agen", "production-note", "outputs")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-MOUNT_PATH = "/storage/agen/production-note/outputs"
-app.mount(MOUNT_PATH, StaticFiles(directory=OUTPUT_DIR), name="outputs")
+# Storage artefak output (env STORAGE_BACKEND): local = OUTPUT_DIR, s3 = object storage S3-compatible
+storage_backend = create_storage_backend(OUTPUT_DIR, MOUNT_PATH)
+
+# Write-behind: artefak ditulis ke SCRATCH_DIR lokal lalu dikirim ke storage backend di background.
+# URL output dilayani dari scratch dulu, lalu dari OUTPUT_DIR / redirect presigned URL (s3).
+if WRITE_BEHIND_ENABLED or storage_backend.name != "local":
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    LOCAL_OUTPUT_DIR = SCRATCH_DIR
+    replicator: Optional[WriteBehindReplicator] = WriteBehindReplicator(SCRATCH_DIR, storage_backend)
+    if storage_backend.name == "local":
+        app.mount(MOUNT_PATH, ScratchFirstStaticFiles([SCRATCH_DIR, OUTPUT_DIR]), name="outputs")
+    else:
+        app.mount(MOUNT_PATH, ScratchFirstStaticFiles([SCRATCH_DIR], backend=storage_backend), name="outputs")
+else:
+    LOCAL_OUTPUT_DIR = OUTPUT_DIR
+    replicator = None
+    app.mount(MOUNT_PATH, StaticFiles(directory=OUTPUT_DIR), name="outputs")
 pipeline = None
 
+# DPI render halaman untuk OCR (dipakai mode fixed) dan untuk thumbnail halaman yang tidak di-OCR.
+# DPI per halaman dipilih adaptif oleh dpi_policy.py kecuali request / env meminta DPI tetap.
+OCR_DPI = FIXED_DPI
+THUMBNAIL_DPI = 72
+
+# Mode render halaman yang TIDAK dipilih untuk OCR:
+# - lazy : tidak dirender saat request, thumbnail dibuat on-demand via /page-thumbnail
+# - full : render semua halaman 300 DPI seperti versi lama
+# - none : tidak dirender sama sekali (stored_images berisi string kosong)
+RENDER_REST_MODES = {"lazy", "full", "none"}
+
+# Output rasterisasi (backend dipilih lewat env RASTERIZER / field `rasterizer`, lihat rasterizer.py):
+# - memory : rasterizer -> PIL image di memori -> encode JPEG oleh PIL (dibatasi MemoryBudget)
+# - file   : rasterizer menulis JPEG langsung ke folder image, tidak ada image di memori Python
+RASTER_OUTPUT = os.getenv("RASTER_OUTPUT", "memory")
+
+# Input ke model untuk RASTER_OUTPUT=memory:
+# - array : numpy array hasil render langsung ke predict, JPEG arsip ditulis di background
+# - path  : JPEG ditulis dulu lalu dibaca ulang oleh predict (perilaku lama)
+OCR_INPUT = os.getenv("OCR_INPUT", "array")
+JPEG_QUALITY = 75
+
+# Antrian job async (POST /jobs), jumlah job yang diproses paralel oleh service ini
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+job_store: Optional[JobStore] = None
+
+# Cache OCR per halaman & dedup dokumen utuh (content-addressed), None jika OCR_CACHE_ENABLED=0
+page_cache: Optional[PageCache] = None
+doc_cache: Optional[DocumentCache] = None
+cache_sync_task: Optional[asyncio.Task] = None
+
+# Upload ditampung dulu di disk lokal sambil di-hash, baru dipindah ke OUTPUT_DIR jika bukan duplikat
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", os.path.join("data", "uploads"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+job_wakeup: Optional[asyncio.Event] = None
+job_worker_tasks: List[asyncio.Task] = []
+
+# Retensi & compaction tree output (env RETENTION_*, lihat retention.py), jalan periodik di background
+retention_policy = RetentionPolicy()
+retention_task: Optional[asyncio.Task] = None
+
+# Mode multi-worker: tugas yang cukup 1 proses (recovery write-behind, retensi) dijalankan worker
+# pemegang lock ini. Lock dilepas OS saat worker mati, worker pengganti bisa mengambil alih.
+PRIMARY_LOCK_PATH = os.getenv("PRIMARY_LOCK_PATH", os.path.join("data", "primary.lock"))
+primary_lock_file = None
+is_primary_worker = False
+
+def acquire_primary_lock() -> bool:
+    """True jika proses ini worker utama (selalu True untuk deployment 1 proses)"""
+    global primary_lock_file
+    os.makedirs(os.path.dirname(PRIMARY_LOCK_PATH) or ".", exist_ok=True)
+    lock_file = open(PRIMARY_LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    primary_lock_file = lock_file
+    return True
+
 def get_pipeline():
     """Singleton untuk load model agar tidak reload setiap request"""
     global pipeline
     if pipeline is None:
         print_with_time("Inisialisasi Model PaddleOCR-VL...")
+        started = time.monotonic()
+        # Import di sini: worker HTTP mode multi-worker tidak perlu memuat paddle sama sekali
+        from paddleocr import PaddleOCRVL
         pipeline = PaddleOCRVL()
+        MODEL_LOAD_SECONDS.set(time.monotonic() - started)
         print_with_time("Model berhasil dimuat.")
     return pipeline
 
+# Scheduler lintas request: thread pemilik pipeline yang menggabungkan predict jadi micro-batch.
+# Mode multi-worker (MODEL_SERVER_SOCKET, lihat launcher.py): scheduler ada di proses model_server.py,
+# worker ini hanya mengirim predict lewat Unix socket.
+if MODEL_SERVER_SOCKET:
+    ocr_scheduler = RemoteScheduler(MODEL_SERVER_SOCKET)
+else:
+    ocr_scheduler = BatchScheduler(get_pipeline)
+    # Mode multi-worker queue depth dilaporkan proses model server
+    QUEUE_DEPTH.set_function(lambda: {(): ocr_scheduler.queue_depth()})
+
+# Snapshot metrics worker ini untuk digabung /metrics worker lain (mode multi-worker)
+metrics_flush_task: Optional[asyncio.Task] = None
+
+async def concatenate_markdown_pages(markdown_list: List[Any]) -> str:
+    """concatenate_markdown_pages di thread / proses pemilik model"""
+    with stage_timer("concatenate"), span("concatenate", pages=len(markdown_list)):
+        if isinstance(ocr_scheduler, RemoteScheduler):
+            return await asyncio.wrap_future(ocr_scheduler.concatenate_markdown_pages(markdown_list))
+        return await ocr_scheduler.run(lambda: get_pipeline().concatenate_markdown_pages(markdown_list))
+
 @app.on_event("startup")
 async def startup_event():
-    """Load model saat aplikasi start"""
-    print_with_time("Startup - Load Model PaddleOCR-VL...")
-    get_pipeline()
+    """Load model saat aplikasi start (di thread pemilik model)"""
+    if isinstance(ocr_scheduler, RemoteScheduler):
+        print_with_time(f"Startup - Menunggu model server di {MODEL_SERVER_SOCKET}...")
+        ocr_scheduler.start()
+        await run_io(ocr_scheduler.connect)
+    else:
+        print_with_time("Startup - Load Model PaddleOCR-VL...")
+        ocr_scheduler.start()
+        await ocr_scheduler.run(get_pipeline)
+
+    global job_store, job_wakeup, page_cache, doc_cache, is_primary_worker
+    is_primary_worker = await run_io(acquire_primary_lock)
+    if replicator is not None:
+        replicator.start()
+        pending = await run_io(replicator.recover_pending) if is_primary_worker else 0
+        if pending:
+            print_with_time(f"Write-behind: {pending} dokumen / file di scratch belum tersalin, dijadwalkan ulang")
+    global cache_sync_task
+    if OCR_CACHE_ENABLED:
+        # Folder cache dipakai bersama semua worker, hanya worker primary yang menjaga batas ukuran
+        page_cache = await run_io(PageCache, evict=is_primary_worker)
+        doc_cache = await run_io(DocumentCache)
+        if is_primary_worker:
+            cache_sync_task = asyncio.create_task(cache_sync_loop(page_cache))
+
+    # Antrian job: kembalikan job yang terputus saat restart lalu jalankan worker.
+    # Mode multi-worker recovery dilakukan launcher.py sebelum worker start, karena worker yang
+    # di-restart uvicorn tidak bisa membedakan job terputus dari job yang sedang diproses worker lain.
+    job_store = JobStore()
+    job_wakeup = asyncio.Event()
+    if not MODEL_SERVER_SOCKET:
+        recovered = await run_io(job_store.recover_interrupted)
+        if recovered:
+            print_with_time(f"Melanjutkan {len(recovered)} job yang terputus: {recovered}")
+    for worker_id in range(JOB_WORKERS):
+        job_worker_tasks.append(asyncio.create_task(job_worker_loop(worker_id)))
+
+    global retention_task
+    if retention_policy.enabled() and is_primary_worker:
+        retention_service = RetentionService(
+            storage_backend, retention_policy, local_roots=output_roots(), protected=job_store.active_base_paths,
+        )
+        retention_task = asyncio.create_task(retention_loop(retention_service))
+
+    global metrics_flush_task
+    if METRICS_ENABLED:
+        if is_primary_worker:
+            # Job store dipakai bersama semua worker, cukup 1 worker yang melaporkan
+            JOBS.set_function(lambda: {(status,): total for status, total in job_store.count_by_status().items()})
+        if MODEL_SERVER_SOCKET:
+            metrics_flush_task = asyncio.create_task(metrics_flush_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Hentikan worker job & tutup executor saat aplikasi berhenti"""
+    for task in job_worker_tasks:
+        task.cancel()
+    job_worker_tasks.clear()
+    if retention_task is not None:
+        retention_task.cancel()
+    if cache_sync_task is not None:
+        cache_sync_task.cancel()
+    if metrics_flush_task is not None:
+        metrics_flush_task.cancel()
+        try:
+            retire_snapshot()
+        except Exception as e:
+            print_with_time(f"Gagal menyimpan snapshot metrics terakhir: {e}")
+    ocr_scheduler.stop()
+    if replicator is not None:
+        # Sisa antrian tetap ada di scratch dan disalin saat startup berikutnya
+        replicator.stop()
+    shutdown_executors()
+    if job_store is not None:
+        job_store.close()
 
 def create_response(success: bool, data: Any = None, message: str = "") -> Dict[str, Any]:
     """Helper untuk membuat format response standar"""
-    print_with_time("Membuat Response...")
     return {
         "error": not success,
         "success": success,
@@ -54,249 +252,1664 @@ def create_response(success: bool, data: Any = None, message: str = "") -> Dict[
         "message": message
     }
 
+def estimate_page_bytes(page_size: Optional[Tuple[float, float]], dpi: int) -> int:
+    """Perkiraan memori PIL RGB halaman hasil render (default A4 jika ukuran tidak diketahui)"""
+    width_pt, height_pt = page_size or (595.0, 842.0)
+    return int(width_pt / 72 * dpi) * int(height_pt / 72 * dpi) * 3
+
+def parse_page_selection(pages: Optional[str], total_pages: int) -> List[int]:
+    """
+    Parse field `pages` (JSON list, 1-based) menjadi list halaman yang valid & terurut.
+    Kosong, invalid, atau tidak ada yang cocok = semua halaman.
+    """
+    all_pages = list(range(1, total_pages + 1))
+    if not pages:
+        return all_pages
+
+    try:
+        pages_list = json.loads(pages)
+    except Exception as e:
+        print_with_time(f"Gagal parse filter halaman, memproses semua: {e}")
+        return all_pages
+
+    if not isinstance(pages_list, list) or len(pages_list) == 0:
+        return all_pages
+
+    selected = sorted({p for p in pages_list if isinstance(p, int) and 1 <= p <= total_pages})
+    if not selected:
+        print_with_time("Warning: Tidak ada halaman yang cocok dengan filter user. Menggunakan semua halaman.")
+        return all_pages
+    return selected
+
+def save_page_image(img, image_path: str, dpi: int = OCR_DPI):
+    """Simpan image halaman sebagai JPEG (Baseline DCT, Huffman coding, YCbCr4:2:0)"""
+    img.save(
+        image_path,
+        "JPEG",
+        dpi=(dpi, dpi),
+        quality=JPEG_QUALITY,
+        optimize=True,
+        subsampling=2
+    )
+
+def save_upload(file_obj, dest_path: str) -> str:
+    """Simpan file upload ke disk sambil menghitung sha256 (blocking, jalankan via run_io)"""
+    digest = hashlib.sha256()
+    with open(dest_path, "wb") as f:
+        for chunk in iter(lambda: file_obj.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+def remove_file(path: str):
+    """Hapus file jika ada"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def image_to_array_and_hash(img) -> Tuple[Any, str]:
+    """PIL image -> numpy array BGR (format input PaddleX untuk ndarray) + hash pixel"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    array = np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
+    return array, hash_image(img)
+
+def save_embedded_page(data: bytes, image_path: str, decode: bool) -> Tuple[str, Optional[Any]]:
+    """
+    Simpan byte JPEG asli halaman scan apa adanya (tanpa encode ulang).
+    Return (hash byte JPEG untuk cache OCR, array BGR jika decode=True)
+    """
+    with open(image_path, "wb") as f:
+        f.write(data)
+    array = None
+    if decode:
+        with Image.open(io.BytesIO(data)) as img:
+            array = np.ascontiguousarray(np.asarray(img.convert("RGB"))[:, :, ::-1])
+    return hashlib.sha256(data).hexdigest(), array
+
+def save_and_hash_page(img, img_dir: str, stem: str, page_num: int, dpi: int = OCR_DPI) -> Tuple[str, str]:
+    """Simpan image halaman sebagai JPEG, return (image_path, hash pixel untuk cache OCR)"""
+    # Format nama file image: filename_page_{i+1}.jpg
+    # Page number di filename mulai dari 1
+    image_path = os.path.join(img_dir, f"{stem}_page_{page_num}.jpg")
+    save_page_image(img, image_path, dpi=dpi)
+    return image_path, hash_image(img)
+
+def render_thumbnail(raster: Rasterizer, pdf_path: str, page: int, thumb_path: str):
+    """Render thumbnail 1 halaman jika belum ada"""
+    if os.path.exists(thumb_path):
+        return
+    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+    img = raster.render_page(pdf_path, page, THUMBNAIL_DPI)
+    save_page_image(img, thumb_path, dpi=THUMBNAIL_DPI)
+
+def save_markdown_results(output, markdown_pages_dir: str, page_stem: str) -> List[str]:
+    """
+    Save markdown per page seperti dokumentasi PaddleOCR-VL.
+    save_to_markdown menamai file dari input_path (kosong untuk input array), jadi hasilnya
+    ditulis ke folder sementara lalu file .md-nya dipindah sebagai {page_stem}.md
+    Return path semua file yang ditulis (untuk manifest).
+    """
+    os.makedirs(markdown_pages_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=markdown_pages_dir)
+    written = []
+    try:
+        # Loop setiap result di output (biasanya 1 per file image input)
+        for res in output:
+            res.save_to_markdown(save_path=tmp_dir)
+        for root, _, files in os.walk(tmp_dir):
+            for name in files:
+                src = os.path.join(root, name)
+                rel = os.path.relpath(src, tmp_dir)
+                if root == tmp_dir and name.lower().endswith(".md"):
+                    rel = f"{page_stem}.md"
+                dst = os.path.join(markdown_pages_dir, rel)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                os.replace(src, dst)
+                written.append(dst)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return written
+
+def save_text_layer_markdown(markdown_text: str, markdown_pages_dir: str, page_stem: str) -> List[str]:
+    """Simpan markdown halaman text layer dengan nama yang sama seperti hasil save_to_markdown"""
+    os.makedirs(markdown_pages_dir, exist_ok=True)
+    md_path = os.path.join(markdown_pages_dir, f"{page_stem}.md")
+    write_text_file(md_path, markdown_text)
+    return [md_path]
+
+def markdown_to_text(markdown: Any) -> str:
+    """Ambil teks dari res.markdown (dict PaddleOCR-VL atau string)"""
+    if isinstance(markdown, dict):
+        return markdown.get("markdown_texts", "") or ""
+    return str(markdown or "")
+
+def write_text_file(path: str, text: str):
+    """Tulis file teks UTF-8"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def split_page_files(files: List[str], markdown_pages_dir: str, page_stem: str) -> Tuple[Optional[str], List[str]]:
+    """Pisahkan file hasil 1 halaman jadi (markdown halaman, image di dalam markdown)"""
+    md_path = os.path.join(markdown_pages_dir, f"{page_stem}.md")
+    markdown = md_path if md_path in files else None
+    return markdown, [path for path in files if path != md_path]
+
+def output_url(base_url: str, rel_path: Optional[str]) -> str:
+    """URL static dari key relatif output (string kosong jika None)"""
+    return f"{base_url}{MOUNT_PATH}/{rel_path}" if rel_path else ""
+
+def document_url(base_url: str, manifest: Dict[str, Any], rel_path: Optional[str]) -> str:
+    """URL static artefak dokumen dari path relatif terhadap folder dokumen"""
+    return output_url(base_url, f"{manifest['document_dir']}/{rel_path}" if rel_path else None)
+
+def page_image_url(base_url: str, manifest: Dict[str, Any], page: Dict[str, Any]) -> str:
+    """URL image halaman: JPEG hasil render, thumbnail lazy, atau kosong (mode none)"""
+    if page.get("image"):
+        return document_url(base_url, manifest, page["image"])
+    if page.get("thumbnail"):
+        # Halaman tidak dirender, thumbnail dibuat saat URL diakses
+        source = f"{manifest['document_dir']}/{manifest['source']}"
+        return f"{base_url}/page-thumbnail?file={quote(source)}&page={page['page']}"
+    return ""
+
+def manifest_response_urls(manifest: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+    """
+    URL response dari manifest, index stored_images / stored_markdown sinkron dengan nomor halaman
+    (string kosong untuk halaman tanpa image / markdown).
+    URL hanya dibangun dari manifest yang sudah ada: dokumen tanpa manifest.json dianggap belum dipublish
+    (share lokal dipublish dengan rename folder .tmp-, object storage menyalin manifest.json paling akhir).
+    """
+    pages = [manifest["pages"][str(p)] for p in range(1, manifest["total_pages"] + 1)]
+    urls = {
+        "download_url": document_url(base_url, manifest, manifest.get("markdown")),
+        "stored_images": [page_image_url(base_url, manifest, page) for page in pages],
+        "stored_markdown": [document_url(base_url, manifest, page.get("markdown")) for page in pages],
+        "manifest_url": f"{base_url}/documents/{manifest['document_id']}/manifest",
+    }
+    if manifest.get("sections"):
+        # Index stored_images / stored_markdown section sinkron dengan `pages` section
+        urls["sections"] = {
+            name: {
+                "download_url": document_url(base_url, manifest, section.get("markdown")),
+                "stored_images": [page_image_url(base_url, manifest, manifest["pages"][str(p)]) for p in section["pages"]],
+                "stored_markdown": [document_url(base_url, manifest, rel) for rel in section["markdown_pages"]],
+            }
+            for name, section in manifest["sections"].items()
+        }
+    return urls
+
+def section_response(manifest: Dict[str, Any], urls: Dict[str, Any], texts: Dict[str, str]) -> Dict[str, Any]:
+    """Field `sections` response: setting, halaman, markdown & URL per section (kosong tanpa section)"""
+    if not manifest.get("sections"):
+        return {}
+    return {
+        "sections": {
+            name: dict(
+                {key: value for key, value in section.items() if key not in ("markdown", "markdown_pages")},
+                markdown=texts.get(name, ""),
+                **urls["sections"][name],
+            )
+            for name, section in manifest["sections"].items()
+        }
+    }
+
+def output_roots() -> List[str]:
+    """Folder lokal yang dilayani MOUNT_PATH, urut sesuai prioritas lookup"""
+    if replicator is None:
+        return [OUTPUT_DIR]
+    return [SCRATCH_DIR, OUTPUT_DIR] if storage_backend.name == "local" else [SCRATCH_DIR]
+
+def resolve_output_path(rel_path: str) -> Optional[str]:
+    """
+    Resolve path relatif terhadap folder output (scratch lokal dulu, lalu OUTPUT_DIR),
+    None jika keluar dari folder output. Jika file belum ada, return path di OUTPUT_DIR.
+    """
+    full_path = None
+    for root in output_roots():
+        output_root = os.path.realpath(root)
+        full_path = os.path.realpath(os.path.join(output_root, rel_path))
+        if os.path.commonpath([output_root, full_path]) != output_root:
+            return None
+        if os.path.exists(full_path):
+            return full_path
+    return full_path
+
+def output_rel_path(path: str) -> str:
+    """Path relatif file output terhadap root-nya (scratch atau OUTPUT_DIR), pemisah '/'"""
+    root = SCRATCH_DIR if replicator is not None and is_within(path, SCRATCH_DIR) else OUTPUT_DIR
+    return path_to_key(path, root)
+
+def output_file_exists(rel_path: str) -> bool:
+    """Cek file output di folder lokal lalu di storage backend (blocking, jalankan via run_io)"""
+    path = resolve_output_path(rel_path)
+    if path is None:
+        return False
+    if os.path.exists(path):
+        return True
+    return storage_backend.name != "local" and storage_backend.exists(rel_path)
+
+def fetch_output_file(rel_path: str) -> Optional[str]:
+    """
+    Path lokal file output, None jika tidak ada. File yang hanya ada di object storage
+    diunduh ke scratch lebih dulu (blocking, jalankan via run_io).
+    """
+    path = resolve_output_path(rel_path)
+    if path is None or os.path.exists(path):
+        return path
+    if storage_backend.name == "local" or not storage_backend.exists(rel_path):
+        return None
+    local_path = os.path.join(SCRATCH_DIR, rel_path)
+    storage_backend.download(rel_path, local_path)
+    # Dijadwalkan seperti artefak lain agar salinan scratch ikut dibersihkan
+    replicate_outputs([local_path])
+    return local_path
+
+def replicate_outputs(paths: List[Optional[str]]):
+    """Jadwalkan kirim artefak di scratch ke storage backend (no-op jika write-behind mati)"""
+    if replicator is not None:
+        replicator.enqueue(paths)
+
 @app.get("/health")
 async def health_check():
     """Endpoint untuk cek kesehatan service"""
     print_with_time("Health check...")
     return create_response(success=True, message="Service is healthy and ready")
 
+def route_label(scope: Dict[str, Any]) -> str:
+    """Template path route (mis. /jobs/{job_id}) agar label metrics tidak meledak per URL"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other") or "other"
+    return "other"
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Request in-flight & durasi per route (streaming: sampai response mulai dikirim)"""
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    labels = (route_label(request.scope),)
+    REQUESTS_IN_FLIGHT.inc(1, labels)
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        REQUESTS_IN_FLIGHT.dec(1, labels)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, labels)
+
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    """Waktu request masuk, awal span `receive` (parsing form upload terjadi sebelum handler)"""
+    if TRACING_ENABLED:
+        request.scope["trace_started_ns"] = time.time_ns()
+    return await call_next(request)
+
+async def metrics_flush_loop():
+    """Tulis snapshot metrics worker ini berkala ke METRICS_DIR (mode multi-worker)"""
+    while True:
+        try:
+            await run_io(write_snapshot)
+        except Exception as e:
+            print_with_time(f"Gagal menulis snapshot metrics: {e}")
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Metrics format Prometheus (lihat metrics.py), mode multi-worker digabung dari semua proses"""
+    if not METRICS_ENABLED:
+        return JSONResponse(
+            status_code=404,
+            content=create_response(success=False, message="Metrics tidak aktif (METRICS_ENABLED=0)")
+        )
+    snapshots = [await run_io(REGISTRY.snapshot)]
+    if isinstance(ocr_scheduler, RemoteScheduler):
+        snapshots.extend(await run_io(read_peer_snapshots))
+        try:
+            stats = await asyncio.wait_for(asyncio.wrap_future(ocr_scheduler.remote_stats()), timeout=2)
+            snapshots.append(stats.get("metrics") or {})
+        except Exception as e:
+            print_with_time(f"Metrics model server tidak tersedia: {e}")
+    return Response(content=render_metrics(merge_snapshots(snapshots)), media_type=CONTENT_TYPE)
+
+@app.get("/page-thumbnail")
+async def page_thumbnail(file: str, page: int):
+    """Render thumbnail halaman PDF on-demand (untuk halaman yang tidak dirender saat parsing)"""
+    pdf_path = await run_io(fetch_output_file, file) if file.lower().endswith(".pdf") else None
+    if pdf_path is None or not os.path.isfile(pdf_path):
+        return JSONResponse(
+            status_code=404,
+            content=create_response(success=False, message="File PDF tidak ditemukan")
+        )
+
+    raster = get_rasterizer()
+    if page < 1 or page > await run_io(raster.page_count, pdf_path):
+        return JSONResponse(
+            status_code=400,
+            content=create_response(success=False, message=f"Halaman {page} di luar jangkauan")
+        )
+
+    # Thumbnail disimpan di folder dokumen, di samping folder pdf: {folder dokumen}/thumbnail/
+    document_dir = os.path.dirname(os.path.dirname(output_rel_path(pdf_path)))
+    thumb_rel = os.path.join(document_dir, "thumbnail", f"{Path(pdf_path).stem}_page_{page}.jpg")
+    thumb_path = resolve_output_path(thumb_rel)
+
+    if not os.path.exists(thumb_path):
+        if storage_backend.name != "local" and await run_io(storage_backend.exists, thumb_rel):
+            return RedirectResponse(storage_backend.url(thumb_rel), status_code=307)
+        # Thumbnail baru ditulis ke disk lokal, disalin ke share remote di background
+        thumb_path = os.path.join(LOCAL_OUTPUT_DIR, thumb_rel)
+        await run_io(render_thumbnail, raster, pdf_path, page, thumb_path)
+        replicate_outputs([thumb_path])
+
+    return FileResponse(thumb_path, media_type="image/jpeg")
+
+ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.bmp'}
+
+class ParsingCancelled(Exception):
+    """Dilempar saat client disconnect di tengah proses parsing"""
+
+def unsupported_format_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=400,
+        content=create_response(
+            success=False, 
+            message=f"Format file tidak didukung. Gunakan: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    )
+
+async def stage_upload(file: UploadFile) -> Tuple[str, str]:
+    """Tampung upload di UPLOAD_TMP_DIR sambil di-hash, return (staged_path, sha256)"""
+    await run_io(os.makedirs, UPLOAD_TMP_DIR, exist_ok=True)
+    staged_path = os.path.join(UPLOAD_TMP_DIR, f"{uuid.uuid4().hex}{Path(file.filename).suffix.lower()}")
+    with stage_timer("upload"), span("save", filename=file.filename) as active:
+        digest = await run_io(save_upload, file.file, staged_path)
+        if active is not None:
+            active.set_attribute("bytes", await run_io(os.path.getsize, staged_path))
+    return staged_path, digest
+
+def invalid_options_response(rasterizer: Optional[str], dpi: Optional[str]) -> Optional[JSONResponse]:
+    """Validasi field `rasterizer` & `dpi`, return response 400 jika tidak valid / backend tidak terpasang"""
+    try:
+        parse_dpi_param(dpi)
+        get_rasterizer(rasterizer)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content=create_response(success=False, message=str(e)))
+    except ImportError:
+        return JSONResponse(
+            status_code=400,
+            content=create_response(success=False, message=f"Rasterizer {rasterizer} tidak terpasang di server")
+        )
+    return None
+
+def document_content_key(
+    file_digest: str,
+    pages: Optional[str],
+    render_rest: Optional[str],
+    rasterizer: Optional[str] = None,
+    text_layer: Optional[str] = None,
+    dpi: Optional[str] = None,
+    sections: Optional[Dict[str, Section]] = None,
+) -> str:
+    """Key isi dokumen (upload + seleksi halaman + opsi), dipakai dedup & layout output content"""
+    mode = render_rest if render_rest in RENDER_REST_MODES else "lazy"
+    options = {
+        "render_rest": mode,
+        "dpi": parse_dpi_param(dpi) or "auto",
+        "rasterizer": get_rasterizer(rasterizer).name,
+        "text_layer": resolve_text_layer_mode(text_layer),
+    }
+    if sections:
+        # Tanpa section key tetap sama dengan versi sebelumnya (cache lama masih terpakai)
+        options["sections"] = sections_key(sections)
+    return document_key(file_digest, pages, options)
+
+def cached_output_exists(entry: Dict[str, Any]) -> bool:
+    """Dedup hanya valid jika manifest / file markdown final hasil proses sebelumnya masih ada"""
+    document_id = entry["data"].get("document_id")
+    if document_id:
+        # Retensi menghapus manifest lebih dulu saat membuang dokumen
+        rel_path = manifest_rel_path(document_id)
+        return rel_path is not None and output_file_exists(rel_path)
+    prefix = f"{entry['base_url']}{MOUNT_PATH}/"
+    download_url = entry["data"].get("download_url", "")
+    if not download_url.startswith(prefix):
+        return False
+    return output_file_exists(download_url[len(prefix):])
+
+def rebase_cached_document(entry: Dict[str, Any], base_url: str, filename: str) -> Dict[str, Any]:
+    """Ganti base_url di semua URL response yang di-cache dengan base_url request sekarang"""
+    old_base = entry["base_url"]
+
+    def rebase(url: str) -> str:
+        return base_url + url[len(old_base):] if url.startswith(old_base) else url
+
+    data = dict(entry["data"])
+    data["filename"] = filename
+    data["download_url"] = rebase(data["download_url"])
+    if "manifest_url" in data:
+        data["manifest_url"] = rebase(data["manifest_url"])
+    data["stored_images"] = [rebase(u) for u in data.get("stored_images", [])]
+    data["stored_markdown"] = [rebase(u) for u in data.get("stored_markdown", [])]
+    data["cache"] = {"hits": 0, "misses": 0, "document": "hit"}
+    return data
+
+async def lookup_document_cache(doc_key: Optional[str], base_url: str, filename: str) -> Optional[Dict[str, Any]]:
+    """Return data response jika upload identik sudah pernah diproses"""
+    if doc_key is None:
+        return None
+    entry = await run_io(doc_cache.get, doc_key, cached_output_exists)
+    CACHE_REQUESTS.inc(1, ("document", "miss" if entry is None else "hit"))
+    if entry is None:
+        return None
+    print_with_time("Dokumen identik sudah pernah diproses, memakai hasil cache.")
+    data = rebase_cached_document(entry, base_url, filename)
+    if data.get("document_id"):
+        # URL dibangun ulang dari manifest: image / PDF yang sudah dibuang retensi tidak dikembalikan
+        manifest_path = await run_io(fetch_output_file, manifest_rel_path(data["document_id"]))
+        if manifest_path is None:
+            return None
+        urls = manifest_response_urls(await run_io(load_manifest, manifest_path), base_url)
+        section_urls = urls.pop("sections", {})
+        data.update(urls)
+        for name, section in section_urls.items():
+            data.setdefault("sections", {})[name] = dict(data["sections"].get(name, {}), **section)
+    return data
+
+async def save_uploaded_document(file: UploadFile, staged_path: str, content_key: str) -> Tuple[str, str, str]:
+    """
+    Pindahkan upload yang sudah ditampung ke folder staging dokumen baru.
+    STRUKTUR FOLDER: outputs/YYYY/YYYY.MM.DD/{document_id}/{pdf|image}/filename (lihat output_layout.py),
+    dirakit di folder .tmp- dan baru terlihat setelah dipublish oleh parse_saved_document.
+    Return (base_path staging, saved_file_path, document_id)
+    """
+    document_id = new_document_id(content_key)
+    base_path = staging_dir(LOCAL_OUTPUT_DIR, document_id)
+    pdf_dir = os.path.join(base_path, "pdf")
+    img_dir = os.path.join(base_path, "image")
+    
+    await run_io(os.makedirs, pdf_dir, exist_ok=True)
+    await run_io(os.makedirs, img_dir, exist_ok=True)
+    
+    # PDF Original disimpan di folder pdf, upload image di folder image
+    file_ext = Path(file.filename).suffix.lower()
+    target_dir = pdf_dir if file_ext == '.pdf' else img_dir
+    saved_file_path = os.path.join(target_dir, file.filename)
+    with span("move_upload", document_id=document_id):
+        await run_io(shutil.move, staged_path, saved_file_path)
+    return base_path, saved_file_path, document_id
+
+async def parse_saved_document(
+    saved_file_path: str,
+    filename: str,
+    base_path: str,
+    base_url: str,
+    document_id: str,
+    **options,
+) -> Dict[str, Any]:
+    """
+    Proses inti parsing dokumen yang sudah tersimpan (dipakai endpoint sinkron, streaming & job worker).
+    Artefak dirakit di folder staging base_path lalu dipublish atomik ke folder dokumen.
+    Jika gagal / batal, folder staging dibuang dalam 1 operasi (tidak ada file setengah jadi).
+    Opsi diteruskan ke assemble_document.
+    """
+    try:
+        with span("parse_document", document_id=document_id):
+            return await assemble_document(saved_file_path, filename, base_path, base_url, document_id, **options)
+    except BaseException:
+        # Termasuk asyncio.CancelledError (client stream disconnect / shutdown worker job);
+        # shield: cancel berikutnya tidak menghentikan penghapusan staging yang sudah jalan
+        await asyncio.shield(run_io(discard_dir, base_path))
+        raise
+
+async def assemble_document(
+    saved_file_path: str,
+    filename: str,
+    base_path: str,
+    base_url: str,
+    document_id: str,
+    pages: Optional[str] = None,
+    render_rest: Optional[str] = "lazy",
+    rasterizer: Optional[str] = None,
+    text_layer: Optional[str] = None,
+    dpi: Optional[str] = None,
+    sections: Optional[Dict[str, Section]] = None,
+    is_cancelled: Optional[Callable[[], Awaitable[bool]]] = None,
+    on_progress: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+    on_page: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Render, OCR & simpan artefak dokumen di folder staging base_path, lalu publish.
+    - is_cancelled : dicek sebelum proses berat & setiap halaman, True = lempar ParsingCancelled
+    - on_progress  : dipanggil dengan (status, progress) setiap ada perubahan progress halaman
+    - on_page      : dipanggil dengan event halaman (markdown, URL, timing) begitu 1 halaman selesai
+    - rasterizer   : backend render PDF (poppler / pymupdf), default env RASTERIZER
+    - text_layer   : "auto" = halaman PDF dengan text layer cukup tidak dikirim ke model (lihat text_layer.py)
+    - dpi          : "auto" = DPI adaptif per halaman, angka = DPI tetap (lihat dpi_policy.py)
+    - sections     : map section -> halaman & setting OCR (lihat page_sections.py), menggantikan `pages`
+    """
+    parse_started = time.monotonic()
+
+    async def check_cancelled(stage: str):
+        if is_cancelled is not None and await is_cancelled():
+            print_with_time(f"Client disconnected! Membatalkan proses {stage}.")
+            raise ParsingCancelled()
+
+    img_dir = os.path.join(base_path, "image")
+    # Kita simpan di folder 'markdown_pages' di dalam folder dokumen
+    markdown_pages_dir = os.path.join(base_path, "markdown_pages")
+    document_dir = document_dir_rel(document_id)
+
+    def doc_rel(path: str) -> str:
+        """Path artefak relatif terhadap folder dokumen (tetap valid setelah publish)"""
+        return path_to_key(path, base_path)
+
+    section_plan: Optional[SectionPlan] = None
+    # Span `page` per halaman (tracing), parent span stage halaman di task pipeline
+    document_span = current_span()
+    page_spans: Dict[int, Any] = {}
+    page_sizes: Dict[int, Tuple[float, float]] = {}
+
+    if Path(saved_file_path).suffix.lower() == '.pdf':
+        input_to_model = saved_file_path
+
+        # Cek koneksi sebelum proses berat
+        await check_cancelled("konversi PDF")
+
+        # --- BACA JUMLAH HALAMAN & FILTER SEBELUM RENDER ---
+        # Hanya halaman yang dipilih user yang dirender 300 DPI,
+        # sehingga latency mengikuti jumlah halaman yang di-OCR, bukan jumlah halaman upload
+        raster = get_rasterizer(rasterizer)
+        with span("open_pdf", rasterizer=raster.name) as active:
+            total_pages = await run_io(raster.page_count, input_to_model)
+            page_sizes = await run_io(raster.page_sizes, input_to_model)
+            if active is not None:
+                active.set_attribute("total_pages", total_pages)
+        fixed_dpi = parse_dpi_param(dpi)
+        if sections:
+            section_plan = SectionPlan(sections, total_pages, fixed_dpi)
+            ocr_pages = section_plan.ocr_pages
+            if not ocr_pages:
+                raise ValueError(f"Halaman section di luar jumlah halaman dokumen ({total_pages})")
+            print_with_time(f"Section: {section_plan.section_pages}")
+        else:
+            ocr_pages = parse_page_selection(pages, total_pages)
+        ocr_page_set = set(ocr_pages)
+        print_with_time(f"PDF {total_pages} halaman, OCR halaman: {ocr_pages}")
+
+        def page_fixed_dpi(page_num: int) -> Optional[int]:
+            # Halaman section: DPI tetap terbesar yang diminta section-nya
+            return section_plan.page_dpi(page_num, fixed_dpi) if section_plan is not None else fixed_dpi
+
+        text_pages = set()
+        if resolve_text_layer_mode(text_layer) == "auto":
+            # Halaman dengan parameter predict khusus section (mis. prompt tabel) selalu ke model
+            text_candidates = [p for p in ocr_pages if section_plan is None or section_plan.variants(p) == [{}]]
+            try:
+                with span("detect_text_layer", pages=len(text_candidates)):
+                    text_pages = set(await run_io(detect_text_layer_pages, input_to_model, text_candidates))
+            except Exception as e:
+                print_with_time(f"Gagal membaca text layer, semua halaman di-OCR: {e}")
+            print_with_time(f"Halaman dari text layer (tanpa OCR): {sorted(text_pages)}")
+
+        mode = render_rest if render_rest in RENDER_REST_MODES else "lazy"
+        render_pages = list(range(1, total_pages + 1)) if mode == "full" else ocr_pages
+        original_stem = Path(filename).stem
+
+        dpi_label = "adaptif" if fixed_dpi is None else fixed_dpi
+        print_with_time(f"Konversi {len(render_pages)} halaman PDF ke Image High Res ({dpi_label} DPI, {raster.name})...")
+
+        async def render(page_num: int):
+            if page_num in text_pages:
+                return TextLayerPage(await run_io(extract_page_markdown, input_to_model, page_num))
+            if SCANNED_PAGE_REUSE:
+                # Halaman scan: pakai JPEG asli di dalam PDF, tanpa render ulang
+                try:
+                    target_dpi = page_dpi_upper_bound(page_sizes.get(page_num), page_fixed_dpi(page_num))
+                    embedded = await run_io(extract_embedded_page_image, input_to_model, page_num, target_dpi)
+                except Exception as e:
+                    print_with_time(f"Deteksi halaman scan {page_num} gagal, render biasa: {e}")
+                    embedded = None
+                if embedded is not None:
+                    print_with_time(f"Halaman {page_num} hasil scan, memakai image asli ({embedded.dpi} DPI)")
+                    page_dpis[page_num] = embedded.dpi
+                    return embedded
+            try:
+                page_dpi = await run_io(
+                    select_page_dpi, raster, input_to_model, page_num, page_sizes.get(page_num), page_fixed_dpi(page_num)
+                )
+                page_dpis[page_num] = page_dpi
+                if RASTER_OUTPUT == "file":
+                    return await run_io(
+                        raster.render_page_to_file, input_to_model, page_num, page_dpi,
+                        img_dir, f"{original_stem}_page_{page_num}", JPEG_QUALITY
+                    )
+                return await run_io(raster.render_page, input_to_model, page_num, page_dpi)
+            except Exception as e:
+                hint = " Pastikan poppler-utils terinstall." if raster.name == "poppler" else ""
+                raise Exception(f"Gagal convert PDF ke Image: {str(e)}.{hint}")
+
+        async def encode(page_num: int, img) -> Dict[str, Any]:
+            if isinstance(img, TextLayerPage):
+                return {"path": None, "stem": f"{original_stem}_page_{page_num}", "text_layer": text_layer_result(img.markdown)}
+            if isinstance(img, EmbeddedPageImage):
+                if img.data is not None:
+                    image_path = os.path.join(img_dir, f"{original_stem}_page_{page_num}.jpg")
+                    decode = RASTER_OUTPUT == "memory" and OCR_INPUT == "array"
+                    digest, array = await run_io(save_embedded_page, img.data, image_path, decode)
+                    return {
+                        "path": image_path, "digest": digest, "dpi": "embedded",
+                        "input": array if decode else image_path,
+                    }
+                # Scan beresolusi jauh di atas target DPI sudah di-resample, lanjut seperti hasil render
+                img = img.image
+            page_dpi = page_dpis[page_num]
+            if isinstance(img, str):
+                # JPEG sudah ditulis rasterizer, cukup hash file untuk key cache OCR
+                return {"path": img, "digest": await run_io(hash_file, img), "dpi": page_dpi, "input": img}
+            if RASTER_OUTPUT == "memory" and OCR_INPUT == "array":
+                # Model menerima array langsung; JPEG arsip ditulis di background (di luar jalur kritis OCR)
+                image_path = os.path.join(img_dir, f"{original_stem}_page_{page_num}.jpg")
+                array, digest = await run_io(image_to_array_and_hash, img)
+                archive = asyncio.ensure_future(run_io(save_page_image, img, image_path, page_dpi))
+                archive_tasks.append(archive)
+                if page_num not in ocr_page_set:
+                    await archive
+                return {"path": image_path, "digest": digest, "dpi": page_dpi, "input": array, "archive": archive}
+            image_path, digest = await run_io(save_and_hash_page, img, img_dir, original_stem, page_num, page_dpi)
+            return {"path": image_path, "digest": digest, "dpi": page_dpi, "input": image_path}
+
+        def page_cost(page_num: int) -> int:
+            # Mode file & halaman text layer tidak menyimpan image di memori Python
+            if RASTER_OUTPUT == "file" or page_num in text_pages:
+                return 0
+            # DPI final baru diketahui setelah probe, budget memakai batas atasnya
+            page_size = page_sizes.get(page_num)
+            cost = estimate_page_bytes(page_size, page_dpi_upper_bound(page_size, page_fixed_dpi(page_num)))
+            # Mode array: PIL image (untuk arsip) + array BGR untuk model
+            return cost * 2 if OCR_INPUT == "array" else cost
+
+    else:
+        total_pages = 1
+        ocr_pages = render_pages = [1]
+        mode = "full"
+        if sections:
+            section_plan = SectionPlan(sections, total_pages, None)
+            if not section_plan.ocr_pages:
+                raise ValueError("Upload image hanya punya halaman 1")
+
+        # Upload image langsung di-OCR tanpa render / encode ulang
+        async def render(page_num: int):
+            return None
+
+        async def encode(page_num: int, img) -> Dict[str, Any]:
+            digest = await run_io(hash_file, saved_file_path)
+            return {"path": saved_file_path, "digest": digest, "dpi": "original", "input": saved_file_path}
+
+        def page_cost(page_num: int) -> int:
+            return 0
+
+    # Manifest ditulis di folder dokumen dan diperbarui setiap 1 halaman selesai
+    manifest = DocumentManifest(
+        os.path.join(base_path, MANIFEST_FILENAME),
+        document_id, document_dir, filename, doc_rel(saved_file_path), total_pages, ocr_pages,
+    )
+    await run_io(manifest.write)
+
+    progress = {
+        "pages_total": len(ocr_pages),
+        "pages_done": 0,
+        "pages": {str(p): "waiting" for p in ocr_pages},
+    }
+    if on_progress is not None:
+        await on_progress(STATUS_OCR, progress)
+
+    cache_info = {"hits": 0, "misses": 0}
+    # Jalur yang dipakai tiap halaman: text_layer / cache / ocr
+    page_sources: Dict[int, str] = {}
+    # DPI render tiap halaman PDF (adaptif / tetap / DPI asli scan)
+    page_dpis: Dict[int, int] = {}
+    # Durasi stage render / encode per halaman (detik), dicatat di manifest
+    page_timings: Dict[int, Dict[str, float]] = {}
+    # Markdown per (halaman, index varian), dipakai menyusun markdown per section
+    variant_markdown: Dict[Tuple[int, int], List[Any]] = {}
+    submitted_futures = []
+    archive_tasks = []
+
+    def page_span(page_num: int):
+        """Span `page` halaman (dibuat saat stage pertama halaman dimulai), None tanpa tracing"""
+        if document_span is None:
+            return None
+        if page_num not in page_spans:
+            size = page_sizes.get(page_num)
+            page_spans[page_num] = start_span(
+                "page", parent=document_span, page=page_num,
+                width_pt=round(size[0], 1) if size else None, height_pt=round(size[1], 1) if size else None,
+            )
+        return page_spans[page_num]
+
+    def end_page_span(page_num: int, encoded: Optional[Dict[str, Any]] = None):
+        active = page_spans.get(page_num)
+        if active is None:
+            return
+        page_dpi = page_dpis.get(page_num)
+        size = page_sizes.get(page_num)
+        active.set_attribute("dpi", page_dpi)
+        active.set_attribute("source", page_sources.get(page_num, "render_only"))
+        if size and isinstance(page_dpi, int):
+            active.set_attribute("width_px", round(size[0] * page_dpi / 72))
+            active.set_attribute("height_px", round(size[1] * page_dpi / 72))
+        if encoded is not None and encoded.get("path"):
+            active.set_attribute("image", os.path.basename(encoded["path"]))
+        active.end()
+
+    def timed(stage: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        async def run(page_num: int, *args):
+            started = time.monotonic()
+            try:
+                with span(stage, parent=page_span(page_num)):
+                    return await func(page_num, *args)
+            finally:
+                elapsed = time.monotonic() - started
+                page_timings.setdefault(page_num, {})[f"{stage}_seconds"] = round(elapsed, 3)
+                observe_stage(stage, elapsed)
+        return run
+
+    async def dispatch(page_num: int, encoded: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cek cache OCR, jika miss masukkan ke antrian scheduler (batch bersama request lain).
+        Halaman section dengan beberapa parameter predict di-OCR 1 kali per varian dari image yang sama.
+        """
+        image_path = encoded["path"]
+        stem = encoded.get("stem") or Path(image_path).stem
+        handle = {"path": image_path, "stem": stem, "archive": encoded.get("archive"), "variants": []}
+        if "text_layer" in encoded:
+            handle["text_layer"] = encoded["text_layer"]
+            return handle
+        variants = section_plan.variants(page_num) if section_plan is not None else [{}]
+        for index, predict_kwargs in enumerate(variants):
+            # Varian 0 = markdown utama halaman, varian lain disimpan dengan suffix _v{index}
+            variant = {"stem": stem if index == 0 else f"{stem}_v{index}", "options": predict_kwargs}
+            handle["variants"].append(variant)
+            cache_key = (
+                page_cache.make_key(encoded["digest"], encoded["dpi"], predict_kwargs)
+                if page_cache is not None else None
+            )
+            if cache_key is not None:
+                cached = await run_io(page_cache.get, cache_key, markdown_pages_dir, variant["stem"])
+                CACHE_REQUESTS.inc(1, ("page", "miss" if cached is None else "hit"))
+                if cached is not None:
+                    cache_info["hits"] += 1
+                    variant["cached"], variant["cached_files"] = cached
+                    continue
+            cache_info["misses"] += 1
+            future = ocr_scheduler.submit(encoded["input"], **predict_kwargs)
+            submitted_futures.append(future)
+            variant.update(future=future, cache_key=cache_key)
+        return handle
+
+    async def collect_variant(page_num: int, variant: Dict[str, Any]) -> Tuple[List[Any], List[str], str, Optional[str]]:
+        """Hasil 1 varian OCR halaman -> (markdown, file yang ditulis, sumber, status cache)"""
+        if "cached" in variant:
+            return [variant["cached"]], variant["cached_files"], "cache", "hit"
+        # Waktu tunggu halaman ini: antrian scheduler + predict (durasi model murni di ocr_predict_batch_seconds)
+        with stage_timer("predict"), span("predict", parent=page_span(page_num), variant=variant["stem"], **variant["options"]):
+            output = await asyncio.wrap_future(variant["future"])
+        with stage_timer("save_markdown"), span("save_to_markdown", parent=page_span(page_num)):
+            files = await run_io(save_markdown_results, output, markdown_pages_dir, variant["stem"])
+        if variant["cache_key"] is not None and len(output) == 1:
+            await run_io(page_cache.put, variant["cache_key"], output[0].markdown, markdown_pages_dir, variant["stem"])
+        return [res.markdown for res in output], files, "ocr", "miss" if variant["cache_key"] is not None else None
+
+    # Proses OCR
+    # Render halaman N+1, encode halaman N dan OCR halaman N-1 berjalan bersamaan,
+    # hasil tetap diambil sesuai urutan halaman
+    page_pipeline = PagePipeline(
+        render_pages, ocr_pages, timed("render", render), timed("encode", encode), dispatch,
+        page_cost=page_cost,
+        budgets=[MemoryBudget(RASTER_MEMORY_BUDGET), global_raster_budget],
+    )
+    page_pipeline.start()
+    
+    markdown_list = []
+    try:
+        idx = 0
+        async for page_num, handle in page_pipeline.results():
+            idx += 1
+            inp_path = handle["path"]
+            page_stem = handle["stem"]
+            # Cek koneksi di setiap iterasi halaman
+            await check_cancelled("OCR")
+
+            page_wait_started = time.monotonic()
+            page_markdown_start = len(markdown_list)
+            extra_variants = []
+            if "text_layer" in handle:
+                page_sources[page_num] = "text_layer"
+                with stage_timer("save_markdown"), span("save_to_markdown", parent=page_span(page_num)):
+                    page_files = await run_io(
+                        save_text_layer_markdown, handle["text_layer"]["markdown_texts"], markdown_pages_dir, page_stem
+                    )
+                markdown_list.append(handle["text_layer"])
+                cache_status = None
+                variant_markdown[(page_num, 0)] = [handle["text_layer"]]
+            else:
+                for index, variant in enumerate(handle["variants"]):
+                    markdowns, files, source, status = await collect_variant(page_num, variant)
+                    variant_markdown[(page_num, index)] = markdowns
+                    if index == 0:
+                        markdown_list.extend(markdowns)
+                        page_files, page_sources[page_num], cache_status = files, source, status
+                        continue
+                    md_path, md_images = split_page_files(files, markdown_pages_dir, variant["stem"])
+                    extra_variants.append({
+                        "options": variant["options"],
+                        "markdown": doc_rel(md_path) if md_path else None,
+                        "markdown_images": [doc_rel(path) for path in md_images],
+                        "source": source,
+                        "cache": status,
+                    })
+
+            # JPEG arsip ditulis paralel dengan OCR, pastikan sudah selesai sebelum halaman dilepas
+            if handle["archive"] is not None:
+                await handle["archive"]
+
+            page_md_path, page_md_images = split_page_files(page_files, markdown_pages_dir, page_stem)
+            now_monotonic = time.monotonic()
+            if extra_variants:
+                # Varian OCR tambahan untuk section dengan parameter predict berbeda
+                manifest.update_page(page_num, variants=extra_variants)
+            manifest.update_page(
+                page_num,
+                status="done",
+                image=doc_rel(inp_path) if inp_path else None,
+                markdown=doc_rel(page_md_path) if page_md_path else None,
+                markdown_images=[doc_rel(path) for path in page_md_images],
+                source=page_sources[page_num],
+                cache=cache_status,
+                dpi=page_dpis.get(page_num),
+                timings=dict(
+                    page_timings.get(page_num, {}),
+                    wait_seconds=round(now_monotonic - page_wait_started, 3),
+                    elapsed_seconds=round(now_monotonic - parse_started, 3),
+                ),
+            )
+            await run_io(manifest.write)
+
+            record_page(page_sources[page_num])
+            end_page_span(page_num, handle)
+            progress["pages_done"] = idx
+            progress["pages"][str(page_num)] = "done"
+            if on_progress is not None:
+                await on_progress(STATUS_OCR, progress)
+
+            if on_page is not None:
+                await on_page({
+                    "page": page_num,
+                    "index": idx,
+                    "pages_total": len(ocr_pages),
+                    "markdown": "".join(
+                        markdown_to_text(m) for m in markdown_list[page_markdown_start:]
+                    ),
+                    # URL final, bisa diakses setelah dokumen dipublish
+                    "markdown_url": document_url(base_url, manifest.data, doc_rel(page_md_path) if page_md_path else None),
+                    "cached": page_sources[page_num] == "cache",
+                    "source": page_sources[page_num],
+                    "sections": section_plan.sections_of(page_num) if section_plan is not None else [],
+                    "dpi": page_dpis.get(page_num),
+                    "wait_seconds": round(now_monotonic - page_wait_started, 3),
+                    "elapsed_seconds": round(now_monotonic - parse_started, 3),
+                })
+
+        # Mode full: halaman non-OCR setelah halaman OCR terakhir masih di-render / encode
+        await page_pipeline.wait_finished()
+        await asyncio.gather(*archive_tasks)
+    finally:
+        # Batal / error: hentikan stage dan halaman yang belum diproses tidak perlu masuk batch
+        await page_pipeline.aclose()
+        for future in submitted_futures:
+            future.cancel()
+        await asyncio.gather(*archive_tasks, return_exceptions=True)
+        # Halaman non-OCR (mode full) / halaman yang terpotong error
+        for page_num in list(page_spans):
+            end_page_span(page_num, page_pipeline.encoded.get(page_num))
+
+    print_with_time(f"Cache OCR: {cache_info['hits']} hit, {cache_info['misses']} miss")
+
+    # Image SEMUA halaman (termasuk non-OCR mode full) dicatat di manifest,
+    # halaman yang tidak dirender memakai thumbnail lazy (atau kosong untuk mode none)
+    for page_num in range(1, total_pages + 1):
+        encoded = page_pipeline.encoded.get(page_num)
+        image_path = encoded["path"] if encoded else None
+        manifest.update_page(
+            page_num,
+            image=doc_rel(image_path) if image_path else None,
+            thumbnail=image_path is None and mode != "none",
+        )
+
+    if on_progress is not None:
+        await on_progress(STATUS_ANALYSIS, progress)
+
+    full_markdown_text = await concatenate_markdown_pages(markdown_list)
+
+    # # --- CLEANING ---
+    # if isinstance(full_markdown_text, str):
+    #     full_markdown_text = full_markdown_text.replace("\\n", "\n").replace('\\"', '"')
+
+    # --- SIMPAN MARKDOWN ---
+    # Folder dokumen unik, nama file tidak perlu suffix timestamp lagi
+    output_filename = f"{Path(filename).stem}.md"
+    output_filepath = os.path.join(base_path, output_filename)
+
+    with stage_timer("write_markdown"), span("write_markdown"):
+        await run_io(write_text_file, output_filepath, full_markdown_text)
+
+    section_texts: Dict[str, str] = {}
+    if section_plan is not None:
+        # Markdown per section dari varian OCR milik section, disimpan di sections/{nama}.md
+        sections_dir = os.path.join(base_path, "sections")
+        await run_io(os.makedirs, sections_dir, exist_ok=True)
+        manifest_sections = {}
+        for name, section_pages in section_plan.section_pages.items():
+            variants = [(p, section_plan.variant_of(name, p)) for p in section_pages]
+            section_markdown = [m for key in variants for m in variant_markdown.get(key, [])]
+            section_texts[name] = await concatenate_markdown_pages(section_markdown) if section_markdown else ""
+            section_path = os.path.join(sections_dir, f"{name}.md")
+            await run_io(write_text_file, section_path, section_texts[name])
+
+            markdown_pages = []
+            for page_num, index in variants:
+                page = manifest.data["pages"][str(page_num)]
+                markdown_pages.append(page.get("markdown") if index == 0 else page["variants"][index - 1]["markdown"])
+            manifest_sections[name] = dict(
+                section_plan.sections[name].to_dict(),
+                pages=section_pages,
+                skipped_pages=section_plan.skipped_pages.get(name, []),
+                markdown=doc_rel(section_path),
+                markdown_pages=markdown_pages,
+            )
+        manifest.data["sections"] = manifest_sections
+
+    await run_io(manifest.complete, doc_rel(output_filepath), cache_info)
+    manifest_data = manifest.data
+
+    # --- PUBLISH ---
+    # Folder staging di-rename menjadi folder dokumen final dalam 1 operasi
+    final_path = os.path.join(LOCAL_OUTPUT_DIR, document_dir)
+    with stage_timer("publish"), span("publish") as active:
+        published_now = await run_io(publish_dir, base_path, final_path)
+        if active is not None:
+            active.set_attribute("published", published_now)
+    if published_now:
+        print_with_time(f"Dokumen dipublish: {document_dir}")
+        if replicator is not None:
+            # Response sudah bisa dilayani dari scratch, folder dokumen dikirim ke storage di background
+            replicate_outputs([final_path])
+    else:
+        # Layout content: dokumen identik sudah dipublish request lain lebih dulu, pakai hasilnya
+        print_with_time(f"Dokumen {document_dir} sudah ada, memakai hasil yang sudah dipublish.")
+        await run_io(discard_dir, base_path)
+        published = await run_io(fetch_output_file, manifest_rel_path(document_id))
+        if published is not None:
+            manifest_data = await run_io(load_manifest, published)
+            output_filename = os.path.basename(manifest_data["markdown"])
+
+    # Generate Full Download URL dari manifest (tanpa cek file satu per satu)
+    with span("build_urls"):
+        urls = manifest_response_urls(manifest_data, base_url)
+    DOCUMENT_SECONDS.observe(time.monotonic() - parse_started)
+
+    return {
+        "document_id": document_id,
+        "markdown": full_markdown_text,
+        "filename": filename,
+        "output_filename": output_filename,
+        "download_url": urls["download_url"],
+        "manifest_url": urls["manifest_url"],
+        # Index sinkron dengan nomor halaman (string kosong untuk halaman tanpa image / markdown)
+        "stored_images": urls["stored_images"],
+        "stored_markdown": urls["stored_markdown"],
+        "pages_processed": len(markdown_list),
+        # Index sinkron dengan stored_images, string kosong untuk halaman yang tidak diproses
+        "page_sources": [page_sources.get(p, "") for p in range(1, total_pages + 1)],
+        "page_dpi": [page_dpis.get(p) for p in range(1, total_pages + 1)],
+        "cache": cache_info,
+        **section_response(manifest_data, urls, section_texts),
+    }
+
 @app.post("/document-parsing")
 async def document_parsing(
     request: Request,
     file: UploadFile = File(...),
-    pages: Optional[str] = Form(None)
+    pages: Optional[str] = Form(None),
+    render_rest: Optional[str] = Form("lazy"),
+    rasterizer: Optional[str] = Form(None),
+    text_layer: Optional[str] = Form(None),
+    dpi: Optional[str] = Form(None),
+    sections: Optional[str] = Form(None),
+    rekap_order_page: Optional[str] = Form(None),
+    material_fabric_page: Optional[str] = Form(None),
+    material_accessories_page: Optional[str] = Form(None),
+    material_pack_page: Optional[str] = Form(None),
 ):
     """
     Endpoint parsing dokumen dengan output JSON + URL Download File Markdown.
+    Field `sections` / halaman tp_header: OCR per section dalam 1 request, hasil dikelompokkan per section.
     """
     print_with_time("Document parsing...")
     
-    ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.bmp'}
     file_ext = Path(file.filename).suffix.lower()
-    
     if file_ext not in ALLOWED_EXTENSIONS:
-        return JSONResponse(
-            status_code=400,
-            content=create_response(
-                success=False, 
-                message=f"Format file tidak didukung. Gunakan: {', '.join(ALLOWED_EXTENSIONS)}"
+        return unsupported_format_response()
+    error_response = invalid_options_response(rasterizer, dpi)
+    if error_response is not None:
+        return error_response
+    try:
+        section_map = parse_sections(sections, section_form_fields(
+            rekap_order_page, material_fabric_page, material_accessories_page, material_pack_page
+        ))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content=create_response(success=False, message=str(e)))
+
+    with trace_request("document_parsing", start_ns=request.scope.get("trace_started_ns"), filename=file.filename) as root:
+        if root is not None:
+            record_span("receive", root.start_ns)
+        staged_path = None
+        try:
+            base_url = str(request.base_url).rstrip("/")
+            staged_path, file_digest = await stage_upload(file)
+
+            # Dedup: byte & seleksi halaman sama = langsung return hasil sebelumnya tanpa render / OCR
+            content_key = document_content_key(file_digest, pages, render_rest, rasterizer, text_layer, dpi, section_map)
+            doc_key = content_key if doc_cache is not None else None
+            with span("cache_lookup") as active:
+                cached_data = await lookup_document_cache(doc_key, base_url, file.filename)
+                if active is not None:
+                    active.set_attribute("hit", cached_data is not None)
+            if cached_data is not None:
+                return create_response(success=True, data=cached_data, message="Document parsed successfully")
+
+            base_path, saved_file_path, document_id = await save_uploaded_document(file, staged_path, content_key)
+            data = await parse_saved_document(
+                saved_file_path,
+                file.filename,
+                base_path,
+                base_url,
+                document_id,
+                pages=pages,
+                render_rest=render_rest,
+                rasterizer=rasterizer,
+                text_layer=text_layer,
+                dpi=dpi,
+                sections=section_map,
+                is_cancelled=request.is_disconnected,
             )
-        )
+            data["cache"]["document"] = "miss"
+            if doc_key is not None:
+                await run_io(doc_cache.put, doc_key, base_url, data)
+            return create_response(success=True, data=data, message="Document parsed successfully")
 
-    try:
-        # --- STRUKTUR FOLDER: outputs/YYYY/YYYY.MM.DD/{pdf|image}/filename ---
-        now = datetime.now()
-        year_str = now.strftime("%Y")
-        date_str = now.strftime("%Y.%m.%d")
-        
-        base_path = os.path.join(OUTPUT_DIR, year_str, date_str)
-        pdf_dir = os.path.join(base_path, "pdf")
-        img_dir = os.path.join(base_path, "image")
-        
-        os.makedirs(pdf_dir, exist_ok=True)
-        os.makedirs(img_dir, exist_ok=True)
-        
-        print_with_time(f"Output directories: {pdf_dir}, {img_dir}")
+        except ParsingCancelled:
+            if root is not None:
+                root.set_attribute("cancelled", True)
+            return create_response(success=False, message="Request cancelled")
 
-        # Simpan file upload ke lokasi persistent
-        print_with_time("Menyimpan File Upload...")
+        except Exception as e:
+            print_with_time(f"Error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            if root is not None:
+                root.set_error(e)
+            return JSONResponse(
+                status_code=500,
+                content=create_response(success=False, message=f"Internal Server Error: {str(e)}")
+            )
         
-        all_image_paths = [] # List semua gambar hasil convert (semua halaman)
-        ocr_inputs = []      # List gambar yang AKAN di-OCR (sesuai filter user)
-
-        if file_ext == '.pdf':
-            # Simpan PDF Original
-            saved_file_path = os.path.join(pdf_dir, file.filename)
-            with open(saved_file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            
-            input_to_model = saved_file_path
-            
-            # --- KONVERSI FULL PDF KE IMAGE ---
-            # Tidak ada lagi slicing PDF sebelumnya
-
-            # Cek koneksi sebelum proses berat
-            if await request.is_disconnected():
-                print_with_time("Client disconnected! Membatalkan proses konversi PDF.")
-                return create_response(success=False, message="Request cancelled")
-
-            print_with_time("Konversi FULL PDF ke Image High Res (300 DPI)...")
-            
+        finally:
+            # Upload sementara yang tidak dipindah (duplikat / error) dibuang
+            if staged_path is not None:
+                await run_io(remove_file, staged_path)
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+def format_stream_event(stream_format: str, event: str, payload: Dict[str, Any]) -> str:
+    """Format 1 event sebagai baris NDJSON atau Server-Sent Event"""
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": event, **payload}) + "\n"
+
+@app.post("/document-parsing/stream")
+async def document_parsing_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None),
+    render_rest: Optional[str] = Form("lazy"),
+    rasterizer: Optional[str] = Form(None),
+    text_layer: Optional[str] = Form(None),
+    dpi: Optional[str] = Form(None),
+    sections: Optional[str] = Form(None),
+    rekap_order_page: Optional[str] = Form(None),
+    material_fabric_page: Optional[str] = Form(None),
+    material_accessories_page: Optional[str] = Form(None),
+    material_pack_page: Optional[str] = Form(None),
+    stream_format: Optional[str] = Form("ndjson")
+):
+    """
+    Versi streaming /document-parsing: 1 event `page` per halaman begitu OCR halaman selesai,
+    lalu event `done` berisi data yang sama dengan response /document-parsing
+    (termasuk markdown hasil concatenate_markdown_pages). Error dikirim sebagai event `error`.
+    """
+    print_with_time("Document parsing (stream)...")
+
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        return unsupported_format_response()
+    error_response = invalid_options_response(rasterizer, dpi)
+    if error_response is not None:
+        return error_response
+    if stream_format not in STREAM_FORMATS:
+        stream_format = "ndjson"
+    try:
+        section_map = parse_sections(sections, section_form_fields(
+            rekap_order_page, material_fabric_page, material_accessories_page, material_pack_page
+        ))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content=create_response(success=False, message=str(e)))
+
+    # Root span ditutup oleh task parsing di dalam stream (atau di sini jika gagal sebelum stream)
+    root = start_trace("document_parsing_stream", start_ns=request.scope.get("trace_started_ns"), filename=file.filename)
+    if root is not None:
+        record_span("receive", root.start_ns, parent=root)
+
+    # Upload harus selesai disimpan sebelum response streaming dimulai
+    staged_path = None
+    try:
+        with use_span(root):
+            base_url = str(request.base_url).rstrip("/")
+            staged_path, file_digest = await stage_upload(file)
+            content_key = document_content_key(file_digest, pages, render_rest, rasterizer, text_layer, dpi, section_map)
+            doc_key = content_key if doc_cache is not None else None
+            with span("cache_lookup") as active:
+                cached_data = await lookup_document_cache(doc_key, base_url, file.filename)
+                if active is not None:
+                    active.set_attribute("hit", cached_data is not None)
+            if cached_data is None:
+                base_path, saved_file_path, document_id = await save_uploaded_document(file, staged_path, content_key)
+    except Exception as e:
+        print_with_time(f"Error: {str(e)}")
+        if root is not None:
+            root.end(error=e)
+        return JSONResponse(
+            status_code=500,
+            content=create_response(success=False, message=f"Internal Server Error: {str(e)}")
+        )
+    finally:
+        if staged_path is not None:
+            await run_io(remove_file, staged_path)
+
+    async def event_stream():
+        if cached_data is not None:
+            if root is not None:
+                root.end()
+            yield format_stream_event(stream_format, "done", create_response(
+                success=True, data=cached_data, message="Document parsed successfully"
+            ))
+            return
+
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def on_page(page_event: Dict[str, Any]):
+            await events.put(("page", page_event))
+
+        async def run_parsing():
+            with use_span(root, end=True):
+                await parse_and_publish()
+
+        async def parse_and_publish():
             try:
-                # Convert SELURUH halaman PDF ke images
-                # Gunakan dpi=300 untuk high resolution
-                # fmt="jpeg" untuk matching request user
-                images = convert_from_path(input_to_model, dpi=300, fmt="jpeg", thread_count=4)
-                print_with_time(f"Berhasil convert total {len(images)} halaman ke gambar.")
-                
-                original_stem = Path(file.filename).stem
-                
-                for i, img in enumerate(images):
-                    # Format nama file image: filename_page_{i+1}.jpg
-                    # Page number di filename mulai dari 1
-                    page_num = i + 1
-                    image_filename = f"{original_stem}_page_{page_num}.jpg"
-                    image_path = os.path.join(img_dir, image_filename)
-                    
-                    # Simpan dengan metadata DPI 300, Format JPEG
-                    # Setting sesuai request: Baseline DCT, Huffman coding, YCbCr4:2:0
-                    img.save(
-                        image_path, 
-                        "JPEG", 
-                        dpi=(300, 300), 
-                        quality=75, 
-                        optimize=True, 
-                        subsampling=2
-                    )
-                    
-                    # Simpan path dengan info halaman untuk filtering nanti
-                    all_image_paths.append({
-                        "path": image_path,
-                        "page_num": page_num
-                    })
-                    
+                data = await parse_saved_document(
+                    saved_file_path,
+                    file.filename,
+                    base_path,
+                    base_url,
+                    document_id,
+                    pages=pages,
+                    render_rest=render_rest,
+                    rasterizer=rasterizer,
+                    text_layer=text_layer,
+                    dpi=dpi,
+                    sections=section_map,
+                    is_cancelled=request.is_disconnected,
+                    on_page=on_page,
+                )
+                data["cache"]["document"] = "miss"
+                if doc_key is not None:
+                    await run_io(doc_cache.put, doc_key, base_url, data)
+                await events.put(("done", create_response(
+                    success=True, data=data, message="Document parsed successfully"
+                )))
+            except ParsingCancelled:
+                await events.put(("error", create_response(success=False, message="Request cancelled")))
             except Exception as e:
-                raise Exception(f"Gagal convert PDF ke Image: {str(e)}. Pastikan poppler-utils terinstall.")
-            
-            # --- FILTER IMAGE UNTUK OCR ---
-            # Pilih image mana saja yang akan masuk pipeline OCR berdasarkan input user
-            if pages:
-                try:
-                    pages_list = json.loads(pages)
-                    if isinstance(pages_list, list) and len(pages_list) > 0:
-                        print_with_time(f"Filtering halaman untuk OCR: {pages_list}")
-                        # User input page numbers (1-based index)
-                        # Kita ambil image yang page_num-nya ada di list user
-                        
-                        target_pages = set(pages_list)
-                        for img_info in all_image_paths:
-                            if img_info["page_num"] in target_pages:
-                                ocr_inputs.append(img_info["path"])
-                                
-                        if not ocr_inputs:
-                             print_with_time("Warning: Tidak ada halaman yang cocok dengan filter user. Menggunakan semua halaman.")
-                             ocr_inputs = [x["path"] for x in all_image_paths]
-                    else:
-                        # List kosong atau invalid format, pakai semua
-                        ocr_inputs = [x["path"] for x in all_image_paths]
-                except Exception as e:
-                    print_with_time(f"Gagal parse filter halaman, memproses semua: {e}")
-                    ocr_inputs = [x["path"] for x in all_image_paths]
-            else:
-                # Tidak ada filter, proses semua
-                ocr_inputs = [x["path"] for x in all_image_paths]
+                print_with_time(f"Error: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                if root is not None:
+                    root.set_error(e)
+                await events.put(("error", create_response(
+                    success=False, message=f"Internal Server Error: {str(e)}"
+                )))
 
-        else:
-            # Jika upload image, simpan di folder image
-            saved_file_path = os.path.join(img_dir, file.filename)
-            with open(saved_file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            
-            ocr_inputs = [saved_file_path]
-            # Untuk image upload, all_image_paths juga diisi agar info returned lengkap
-            all_image_paths.append({"path": saved_file_path, "page_num": 1})
-
-        # Proses OCR
-        print_with_time(f"OCR Document ({len(ocr_inputs)} files)...")
-        ocr_pipeline = get_pipeline()
-        
-        all_outputs = []
-        for idx, inp_path in enumerate(ocr_inputs, start=1):
-            # Cek koneksi di setiap iterasi halaman
-            if await request.is_disconnected():
-                print_with_time("Client disconnected! Membatalkan proses OCR.")
-                return create_response(success=False, message="Request cancelled")
-
-            print_with_time(f"Processing file {idx} of {len(ocr_inputs)}: {inp_path}")
-            output = ocr_pipeline.predict(input=inp_path)
-            
-            # Save markdown per page seperti dokumentasi PaddleOCR-VL
-            # Kita simpan di folder 'markdown_pages' di dalam folder tanggal
-            markdown_pages_dir = os.path.join(base_path, "markdown_pages")
-            os.makedirs(markdown_pages_dir, exist_ok=True)
-            
-            # Loop setiap result di output (biasanya 1 per file image input)
-            for res in output:
-                res.save_to_markdown(save_path=markdown_pages_dir)
-                
-            all_outputs.extend(output)
-
-        print_with_time("Extract Markdown...")
-        markdown_list = []
-        for res in all_outputs:
-            markdown_list.append(res.markdown)
-
-        full_markdown_text = ocr_pipeline.concatenate_markdown_pages(markdown_list)
-
-        # # --- CLEANING ---
-        # if isinstance(full_markdown_text, str):
-        #     full_markdown_text = full_markdown_text.replace("\\n", "\n").replace('\\"', '"')
-
-        # --- SIMPAN MARKDOWN ---
-        original_stem = Path(file.filename).stem
-        unique_id = f"{int(time.time())}"
-        output_filename = f"{original_stem}_{unique_id}.md"
-        output_filepath = os.path.join(base_path, output_filename)
-
-        print_with_time("Menyimpan File Markdown...")
-        with open(output_filepath, "w", encoding="utf-8") as f:
-            f.write(full_markdown_text)
-
-        # Generate Full Download URL Markdown
-        print_with_time("Generate Full Download URL...")
-        base_url = str(request.base_url).rstrip("/")
-        rel_path = os.path.relpath(output_filepath, OUTPUT_DIR).replace("\\", "/")
-        download_url = f"{base_url}{MOUNT_PATH}/{rel_path}"
-
-        # URL untuk file image yang disimpan (SEMUA converted images, bukan cuma yg di-OCR)
-        stored_images_info = []
-        for img_info in all_image_paths:
-             rel = os.path.relpath(img_info["path"], OUTPUT_DIR).replace("\\", "/")
-             stored_images_info.append(f"{base_url}{MOUNT_PATH}/{rel}")
-
-        # URL untuk file markdown per halaman (stored_readme)
-        stored_markdown = []
-        markdown_pages_base = os.path.join(base_path, "markdown_pages")
-        
-        # Iterasi semua halaman (bukan cuma yg di-OCR) agar index sinkron dengan stored_images
-        for img_info in all_image_paths:
-             img_path = img_info["path"]
-             stem = Path(img_path).stem
-             md_filename = f"{stem}.md"
-             md_path = os.path.join(markdown_pages_base, md_filename)
-             
-             if os.path.exists(md_path):
-                 rel = os.path.relpath(md_path, OUTPUT_DIR).replace("\\", "/")
-                 stored_markdown.append(f"{base_url}{MOUNT_PATH}/{rel}")
-             else:
-                 # Jika tidak ada markdown (kena filter atau gagal), isi string kosong
-                 stored_markdown.append("")
-
-        return create_response(
-            success=True, 
-            data={
-                "markdown": full_markdown_text,
-                "filename": file.filename,
-                "output_filename": output_filename,
-                "download_url": download_url,
-                "stored_images": stored_images_info,
-                "stored_markdown": stored_markdown,
-                "pages_processed": len(markdown_list)
-            },
-            message="Document parsed successfully"
+        task = asyncio.create_task(run_parsing())
+        try:
+            while True:
+                event, payload = await events.get()
+                yield format_stream_event(stream_format, event, payload)
+                if event in ("done", "error"):
+                    break
+        finally:
+            # Client menutup koneksi di tengah stream: hentikan proses parsing
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type=STREAM_FORMATS[stream_format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ================= JOB API (ANTRIAN ASYNC) =================
+
+def job_status_payload(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Format status job untuk response (tanpa result lengkap)"""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "pages_total": job["pages_total"],
+        "pages_done": job["pages_done"],
+        "page_progress": job["page_progress"],
+        "error": job["error"],
+        "created_at": datetime.fromtimestamp(job["created_at"]).isoformat(),
+        "updated_at": datetime.fromtimestamp(job["updated_at"]).isoformat(),
+    }
+
+def resolve_job_file(path: str) -> str:
+    """
+    File upload job yang sudah dikirim & dibersihkan dari scratch: dibaca langsung dari OUTPUT_DIR
+    (backend local) atau diunduh kembali ke scratch (object storage). Blocking, panggil via run_io.
+    """
+    if replicator is None or os.path.exists(path) or not is_within(path, SCRATCH_DIR):
+        return path
+    key = replicator.key_for(path)
+    local_path = storage_backend.local_path(key)
+    if local_path is not None:
+        return local_path
+    storage_backend.download(key, path)
+    replicate_outputs([path])
+    return path
+
+async def run_job(job: Dict[str, Any]):
+    """Jalankan 1 job dari antrian dan simpan hasil / error ke JobStore"""
+    job_id = job["id"]
+    params = job["params"]
+    print_with_time(f"Job {job_id} mulai diproses ({job['filename']})...")
+
+    async def on_progress(status: str, progress: Dict[str, Any]):
+        await run_io(
+            job_store.update_progress, job_id, status,
+            progress["pages_total"], progress["pages_done"], progress["pages"]
         )
 
+    with trace_request("job", job_id=job_id, filename=job["filename"]) as root:
+        try:
+            if not params.get("document_id"):
+                # Job lama (folder output per tanggal) tidak bisa dipublish sebagai folder dokumen
+                raise Exception("Job dibuat sebelum layout folder per dokumen, upload ulang dokumen")
+            data = await parse_saved_document(
+                await run_io(resolve_job_file, job["file_path"]),
+                job["filename"],
+                job["base_path"],
+                job["base_url"],
+                params["document_id"],
+                pages=params.get("pages"),
+                render_rest=params.get("render_rest"),
+                rasterizer=params.get("rasterizer"),
+                text_layer=params.get("text_layer"),
+                dpi=params.get("dpi"),
+                sections=parse_sections(params.get("sections")),
+                on_progress=on_progress,
+            )
+            data["cache"]["document"] = "miss"
+            result = data
+            if params.get("extraction"):
+                # Tahap 'on progress analysis': tabel BOM dari halaman section, langsung dari markdown halaman
+                manifest = await load_published_manifest(data["document_id"])
+                if manifest is None:
+                    raise Exception("Manifest dokumen tidak ditemukan untuk ekstraksi")
+                result = dict(data, extraction=await extract_document_tables(
+                    manifest, params["extraction"], job["base_url"], params.get("tp_header_id")
+                ))
+            await run_io(job_store.finish, job_id, result)
+            if doc_cache is not None and params.get("document_key"):
+                await run_io(doc_cache.put, params["document_key"], job["base_url"], data)
+            print_with_time(f"Job {job_id} selesai.")
+        except Exception as e:
+            print_with_time(f"Job {job_id} gagal: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            if root is not None:
+                root.set_error(e)
+            await run_io(job_store.fail, job_id, str(e))
+
+async def job_worker_loop(worker_id: int):
+    """Worker yang terus mengambil job 'waiting' dari antrian"""
+    while True:
+        try:
+            job = await run_io(job_store.claim_next)
+        except Exception as e:
+            print_with_time(f"Job worker {worker_id}: gagal ambil job: {e}")
+            job = None
+
+        if job is None:
+            # Tunggu job baru (atau polling berkala jika ada proses lain yang menambah job)
+            job_wakeup.clear()
+            try:
+                await asyncio.wait_for(job_wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await run_job(job)
+
+async def cache_sync_loop(cache: PageCache):
+    """Sinkronkan index LRU cache OCR dengan disk (entry worker lain) & evict setiap OCR_CACHE_SYNC_SECONDS"""
+    while True:
+        await asyncio.sleep(OCR_CACHE_SYNC_SECONDS)
+        try:
+            await run_io(cache.sync)
+        except Exception as e:
+            print_with_time(f"Sinkronisasi cache OCR gagal: {e}")
+
+async def retention_loop(service: RetentionService):
+    """Jalankan retensi setiap RETENTION_INTERVAL detik"""
+    while True:
+        await asyncio.sleep(RETENTION_INTERVAL)
+        try:
+            report = await run_io(service.run)
+        except Exception as e:
+            print_with_time(f"Retensi gagal: {e}")
+            continue
+        if report["files_deleted"] or report["dirs_removed"]:
+            print_with_time(
+                f"Retensi: {report['files_deleted']} file ({format_bytes(report['bytes_reclaimed'])}) dan "
+                f"{report['dirs_removed']} folder kosong dihapus dalam {report['duration_seconds']} detik"
+            )
+
+@app.post("/jobs")
+async def create_job(
+    request: Request,
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None),
+    render_rest: Optional[str] = Form("lazy"),
+    rasterizer: Optional[str] = Form(None),
+    text_layer: Optional[str] = Form(None),
+    dpi: Optional[str] = Form(None),
+    sections: Optional[str] = Form(None),
+    rekap_order_page: Optional[str] = Form(None),
+    material_fabric_page: Optional[str] = Form(None),
+    material_accessories_page: Optional[str] = Form(None),
+    material_pack_page: Optional[str] = Form(None),
+    tp_header_id: Optional[int] = Form(None),
+):
+    """
+    Simpan upload dan masukkan ke antrian, langsung return job id.
+    Section (field `sections` / rekap_order_page, material_*_page) di-OCR per section dan section
+    tp_header mengaktifkan ekstraksi tabel BOM pada tahap 'on progress analysis' (lihat extraction.py).
+    """
+    print_with_time("Create job...")
+
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        return unsupported_format_response()
+    error_response = invalid_options_response(rasterizer, dpi)
+    if error_response is not None:
+        return error_response
+    try:
+        section_map = parse_sections(sections, section_form_fields(
+            rekap_order_page, material_fabric_page, material_accessories_page, material_pack_page
+        ))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content=create_response(success=False, message=str(e)))
+    extraction_sections = parse_extraction_sections(section_map)
+    section_params = {name: section.to_dict() for name, section in section_map.items()}
+
+    staged_path = None
+    try:
+        base_url = str(request.base_url).rstrip("/")
+        staged_path, file_digest = await stage_upload(file)
+        content_key = document_content_key(file_digest, pages, render_rest, rasterizer, text_layer, dpi, section_map)
+        doc_key = content_key if doc_cache is not None else None
+        cached_data = await lookup_document_cache(doc_key, base_url, file.filename)
+
+        if cached_data is not None:
+            # Upload identik: job langsung selesai tanpa masuk antrian OCR
+            job_id = await run_io(
+                job_store.create, file.filename, None, None, base_url,
+                {"pages": pages, "render_rest": render_rest, "rasterizer": rasterizer, "text_layer": text_layer, "dpi": dpi,
+                 "sections": section_params, "extraction": extraction_sections, "tp_header_id": tp_header_id}
+            )
+            if extraction_sections and cached_data.get("document_id"):
+                manifest = await load_published_manifest(cached_data["document_id"])
+                if manifest is not None:
+                    cached_data["extraction"] = await extract_document_tables(
+                        manifest, extraction_sections, base_url, tp_header_id
+                    )
+            await run_io(job_store.finish, job_id, cached_data)
+            return JSONResponse(
+                status_code=202,
+                content=create_response(
+                    success=True,
+                    data={"job_id": job_id, "status": STATUS_FINISH},
+                    message="Job finished from cache"
+                )
+            )
+
+        base_path, saved_file_path, document_id = await save_uploaded_document(file, staged_path, content_key)
+        job_id = await run_io(
+            job_store.create,
+            file.filename,
+            saved_file_path,
+            base_path,
+            base_url,
+            {"pages": pages, "render_rest": render_rest, "rasterizer": rasterizer, "text_layer": text_layer, "dpi": dpi,
+             "document_key": doc_key, "document_id": document_id, "sections": section_params,
+             "extraction": extraction_sections, "tp_header_id": tp_header_id},
+        )
+        job_wakeup.set()
+        return JSONResponse(
+            status_code=202,
+            content=create_response(
+                success=True,
+                data={"job_id": job_id, "status": STATUS_WAITING},
+                message="Job queued"
+            )
+        )
     except Exception as e:
         print_with_time(f"Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
         return JSONResponse(
             status_code=500,
             content=create_response(success=False, message=f"Internal Server Error: {str(e)}")
         )
-        
     finally:
-        pass
+        if staged_path is not None:
+            await run_io(remove_file, staged_path)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status job beserta progress per halaman"""
+    job = await run_io(job_store.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content=create_response(success=False, message="Job tidak ditemukan")
+        )
+    return create_response(success=True, data=job_status_payload(job), message=f"Job {job['status']}")
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Hasil parsing job (sama dengan data /document-parsing) jika status sudah 'finish'"""
+    job = await run_io(job_store.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content=create_response(success=False, message="Job tidak ditemukan")
+        )
+    if job["status"] == STATUS_FAILED:
+        return JSONResponse(
+            status_code=500,
+            content=create_response(success=False, data=job_status_payload(job), message=f"Job gagal: {job['error']}")
+        )
+    if job["status"] != STATUS_FINISH:
+        return JSONResponse(
+            status_code=409,
+            content=create_response(success=False, data=job_status_payload(job), message=f"Job masih {job['status']}")
+        )
+    return create_response(success=True, data=job["result"], message="Document parsed successfully")
+
+EXTRACTION_FILENAME = "extraction.json"
+
+def section_form_fields(
+    rekap_order_page: Optional[str],
+    material_fabric_page: Optional[str],
+    material_accessories_page: Optional[str],
+    material_pack_page: Optional[str],
+) -> Dict[str, Optional[str]]:
+    """Field halaman tp_header (format "1, 2, 3") per nama section"""
+    return dict(zip(SECTION_FIELDS, (rekap_order_page, material_fabric_page, material_accessories_page, material_pack_page)))
+
+def parse_extraction_sections(sections: Dict[str, Section]) -> Dict[str, List[int]]:
+    """Section tp_header yang punya schema tabel BOM -> {section: [halaman]}"""
+    return {name: section.pages for name, section in sections.items() if name in SECTION_TABLES}
+
+def load_section_markdown(manifest: Dict[str, Any], sections: Dict[str, List[int]]) -> Dict[str, Dict[int, str]]:
+    """
+    Markdown per section per halaman dari manifest (blocking, jalankan via run_io).
+    Section yang di-OCR dengan setting sendiri memakai varian markdown section-nya.
+    """
+    texts: Dict[str, Dict[int, str]] = {}
+    loaded: Dict[str, str] = {}
+    for section, pages in sections.items():
+        entry = (manifest.get("sections") or {}).get(section)
+        section_files = dict(zip(entry["pages"], entry["markdown_pages"])) if entry else {}
+        texts[section] = {}
+        for page_num in pages:
+            page = manifest["pages"].get(str(page_num)) or {}
+            rel_path = section_files.get(page_num) or page.get("markdown")
+            if not rel_path:
+                continue
+            if rel_path not in loaded:
+                path = fetch_output_file(f"{manifest['document_dir']}/{rel_path}")
+                if path is None:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    loaded[rel_path] = f.read()
+            texts[section][page_num] = loaded[rel_path]
+    return texts
+
+async def extract_document_tables(
+    manifest: Dict[str, Any], sections: Dict[str, List[int]], base_url: str, tp_header_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Ekstraksi BOM dari markdown halaman section, hasil disimpan sebagai extraction.json di folder dokumen"""
+    print_with_time(f"Ekstraksi tabel BOM: {sections}")
+    with stage_timer("extraction"), span("extraction"):
+        section_texts = await run_io(load_section_markdown, manifest, sections)
+        result = await run_io(extract_document, section_texts, sections, tp_header_id)
+
+    extraction_path = os.path.join(LOCAL_OUTPUT_DIR, manifest["document_dir"], EXTRACTION_FILENAME)
+    await run_io(os.makedirs, os.path.dirname(extraction_path), exist_ok=True)
+    await run_io(write_text_file, extraction_path, json.dumps(result, ensure_ascii=False))
+    replicate_outputs([extraction_path])
+    result["extraction_url"] = document_url(base_url, manifest, EXTRACTION_FILENAME)
+    return result
+
+async def load_published_manifest(document_id: str) -> Optional[Dict[str, Any]]:
+    rel_path = manifest_rel_path(document_id)
+    manifest_path = await run_io(fetch_output_file, rel_path) if rel_path else None
+    return await run_io(load_manifest, manifest_path) if manifest_path is not None else None
+
+@app.post("/documents/{document_id}/extract")
+async def extract_document_endpoint(
+    request: Request,
+    document_id: str,
+    rekap_order_page: Optional[str] = Form(None),
+    material_fabric_page: Optional[str] = Form(None),
+    material_accessories_page: Optional[str] = Form(None),
+    material_pack_page: Optional[str] = Form(None),
+    tp_header_id: Optional[int] = Form(None),
+):
+    """Ekstraksi baris tp_breakdown_order_size / tp_material_list dari dokumen yang sudah diparsing"""
+    try:
+        sections = parse_extraction_sections(parse_sections(None, section_form_fields(
+            rekap_order_page, material_fabric_page, material_accessories_page, material_pack_page
+        )))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content=create_response(success=False, message=str(e)))
+    if not sections:
+        return JSONResponse(
+            status_code=400,
+            content=create_response(success=False, message=f"Isi minimal 1 halaman section: {', '.join(SECTION_TABLES)}")
+        )
+
+    manifest = await load_published_manifest(document_id)
+    if manifest is None:
+        return JSONResponse(
+            status_code=404,
+            content=create_response(success=False, message="Dokumen tidak ditemukan")
+        )
+    try:
+        base_url = str(request.base_url).rstrip("/")
+        data = await extract_document_tables(manifest, sections, base_url, tp_header_id)
+    except Exception as e:
+        print_with_time(f"Error: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content=create_response(success=False, message=f"Internal Server Error: {str(e)}")
+        )
+    return create_response(success=True, data=data, message="Ekstraksi selesai")
+
+@app.get("/documents/{document_id}/manifest")
+async def get_document_manifest(request: Request, document_id: str):
+    """Manifest dokumen (artefak per halaman, timing, status cache) beserta URL-nya"""
+    rel_path = manifest_rel_path(document_id)
+    manifest_path = await run_io(fetch_output_file, rel_path) if rel_path else None
+    if manifest_path is None and rel_path:
+        # Dokumen yang masih diproses: manifest ada di folder staging
+        staging_manifest = os.path.join(staging_dir(LOCAL_OUTPUT_DIR, document_id), MANIFEST_FILENAME)
+        manifest_path = staging_manifest if await run_io(os.path.exists, staging_manifest) else None
+    if manifest_path is None:
+        return JSONResponse(
+            status_code=404,
+            content=create_response(success=False, message="Dokumen tidak ditemukan")
+        )
+    manifest = await run_io(load_manifest, manifest_path)
+
+    base_url = str(request.base_url).rstrip("/")
+    data = dict(manifest, **manifest_response_urls(manifest, base_url))
+    data["pages"] = {
+        key: dict(
+            page,
+            image_url=page_image_url(base_url, manifest, page),
+            markdown_url=document_url(base_url, manifest, page.get("markdown")),
+            markdown_image_urls=[document_url(base_url, manifest, rel) for rel in page.get("markdown_images", [])],
+        )
+        for key, page in manifest["pages"].items()
+    }
+    return create_response(success=True, data=data, message=f"Dokumen {manifest['status']}")
 
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""
+Scheduler batching lintas request untuk PaddleOCRVL.predict.
+
+Semua halaman dari semua request yang sedang berjalan masuk ke satu antrian. Thread scheduler
+(satu-satunya pemilik pipeline) mengumpulkan halaman menjadi micro-batch dan flush ketika:
+- jumlah item mencapai max_batch_size, atau
+- item pertama di batch sudah menunggu max_wait detik.
+
+Setiap batch = 1 kali panggilan predict(input=[...]); hasil dikembalikan ke Future milik
+masing-masing pemanggil, sehingga urutan halaman per request tetap terjaga.
+Saat stop(), Future yang masih antri / ditunda diisi SchedulerStopped (pemanggil tidak menunggu selamanya).
+
+Pipeline diambil lewat `pipeline_getter`, jadi scheduler bisa dites di CPU dengan stub pipeline:
+
+    class StubPipeline:
+        def __init__(self):
+            self.batch_sizes = []
+        def predict(self, input, **kwargs):
+            self.batch_sizes.append(len(input))
+            return [f"res-{x}" for x in input]
+
+    stub = StubPipeline()
+    scheduler = BatchScheduler(lambda: stub, max_batch_size=4, max_wait=0.05)
+
+Lihat benchmark/bench_batching.py (--check) untuk pemeriksaan batching & urutan hasil.
+"""
+import asyncio
+import collections
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from metrics import BATCH_SIZE, PREDICT_BATCH_SECONDS
+
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "4"))
+OCR_BATCH_MAX_WAIT = float(os.getenv("OCR_BATCH_MAX_WAIT_MS", "50")) / 1000.0
+
+
+class SchedulerStopped(Exception):
+    """Scheduler dihentikan (shutdown) sebelum item diproses"""
+
+
+class _PredictItem:
+    __slots__ = ("input", "kwargs", "key", "future", "enqueued_at")
+
+    def __init__(self, inp: Any, kwargs: Dict[str, Any]):
+        self.input = inp
+        self.kwargs = kwargs
+        # Item hanya digabung dengan item lain yang parameter predict-nya sama
+        self.key = tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class _CallItem:
+    __slots__ = ("func", "args", "kwargs", "future")
+
+    def __init__(self, func: Callable, args: Tuple, kwargs: Dict[str, Any]):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+_STOP = object()
+
+
+class BatchScheduler:
+    """Thread pemilik model yang menggabungkan predict dari banyak request menjadi micro-batch"""
+
+    def __init__(
+        self,
+        pipeline_getter: Callable[[], Any],
+        max_batch_size: int = OCR_BATCH_SIZE,
+        max_wait: float = OCR_BATCH_MAX_WAIT,
+    ):
+        self.pipeline_getter = pipeline_getter
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # Item predict yang ditunda karena parameter berbeda dengan batch yang sedang dikumpulkan
+        self._deferred: Deque[_PredictItem] = collections.deque()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"batches": 0, "items": 0, "max_batch": 0}
+
+    # ---------- API untuk pemanggil ----------
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="ocr-batch-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Masih di tengah predict, sisa antrian dibereskan thread itu sendiri setelah _STOP
+                self._thread = None
+                return
+        self._thread = None
+        # Item yang masuk setelah thread berhenti
+        self._fail_pending()
+
+    def submit(self, inp: Any, **predict_kwargs) -> Future:
+        """Masukkan 1 input (path / array) ke antrian, Future berisi list result predict"""
+        item = _PredictItem(inp, predict_kwargs)
+        self._queue.put(item)
+        return item.future
+
+    def submit_call(self, func: Callable, *args, **kwargs) -> Future:
+        """Jalankan fungsi lain yang menyentuh pipeline (load model, concatenate) di thread pemilik"""
+        item = _CallItem(func, args, kwargs)
+        self._queue.put(item)
+        return item.future
+
+    async def predict(self, inp: Any, **predict_kwargs) -> List[Any]:
+        return await asyncio.wrap_future(self.submit(inp, **predict_kwargs))
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit_call(func, *args, **kwargs))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + len(self._deferred)
+
+    # ---------- Thread scheduler ----------
+
+    def _next_item(self, timeout: Optional[float]) -> Any:
+        """Ambil item berikutnya (item yang ditunda didahulukan)"""
+        if self._deferred:
+            return self._deferred.popleft()
+        if timeout is None:
+            return self._queue.get()
+        return self._queue.get(timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self._next_item(None)
+            if item is _STOP:
+                break
+            if isinstance(item, _CallItem):
+                self._run_call(item)
+                continue
+
+            batch = [item]
+            deferred: List[_PredictItem] = []
+            calls: List[_CallItem] = []
+            stop_requested = False
+            deadline = item.enqueued_at + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._next_item(max(0.0, remaining))
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop_requested = True
+                    break
+                if isinstance(nxt, _CallItem):
+                    calls.append(nxt)
+                elif nxt.key == item.key:
+                    batch.append(nxt)
+                else:
+                    deferred.append(nxt)
+
+            self._run_batch(batch)
+            for call in calls:
+                self._run_call(call)
+            self._deferred.extend(deferred)
+            if stop_requested:
+                break
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Isi Future item yang belum diproses (antrian & ditunda) dengan SchedulerStopped"""
+        items: List[Any] = list(self._deferred)
+        self._deferred.clear()
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        error = SchedulerStopped("Scheduler OCR dihentikan sebelum item diproses")
+        for item in items:
+            if item is not _STOP and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(error)
+
+    def _run_call(self, item: _CallItem):
+        if not item.future.set_running_or_notify_cancel():
+            return
+        try:
+            item.future.set_result(item.func(*item.args, **item.kwargs))
+        except BaseException as e:
+            item.future.set_exception(e)
+
+    def _run_batch(self, batch: List[_PredictItem]):
+        # Lewati halaman yang sudah dibatalkan pemanggilnya (client disconnect)
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        BATCH_SIZE.observe(len(batch))
+
+        try:
+            pipeline = self.pipeline_getter()
+            with PREDICT_BATCH_SECONDS.time():
+                results = list(pipeline.predict(input=[item.input for item in batch], **batch[0].kwargs))
+        except BaseException as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Satu halaman rusak jangan menggagalkan halaman lain: ulangi per item
+            results = None
+
+        if results is not None and len(results) == len(batch):
+            for item, res in zip(batch, results):
+                item.future.set_result([res])
+            return
+
+        for item in batch:
+            try:
+                item.future.set_result(list(self.pipeline_getter().predict(input=[item.input], **item.kwargs)))
+            except BaseException as e:
+                item.future.set_exception(e)
@@ -0,0 +1,168 @@
+"""
+Benchmark BatchScheduler (batching.py) dengan stub pipeline di CPU (tanpa model / GPU).
+
+Beberapa request konkuren masing-masing men-submit halamannya ke satu scheduler; stub predict
+butuh --batch-overhead + --latency * jumlah input detik per panggilan, jadi throughput naik
+jika halaman dari request berbeda benar-benar digabung menjadi micro-batch.
+
+--check menjalankan pemeriksaan cepat lalu keluar (exit 1 jika gagal):
+- halaman dari request konkuren digabung (batch terbesar > 1)
+- hasil setiap request kembali dalam urutan halaman yang di-submit
+- item dengan parameter predict berbeda tidak digabung, dan 1 halaman rusak tidak menggagalkan batch
+
+Contoh:
+    python benchmark/bench_batching.py --requests 8 --pages 10 --batch-size 4
+    python benchmark/bench_batching.py --check
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import BatchScheduler
+
+
+class StubPipeline:
+    def __init__(self, latency: float = 0.0, batch_overhead: float = 0.0):
+        self.latency = latency
+        self.batch_overhead = batch_overhead
+        self.batch_sizes = []
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def predict(self, input, **kwargs):
+        with self._lock:
+            self.batch_sizes.append(len(input))
+            self.batches.append((list(input), kwargs))
+        time.sleep(self.batch_overhead + self.latency * len(input))
+        broken = [x for x in input if str(x).startswith("rusak")]
+        if broken:
+            raise ValueError(f"halaman rusak: {broken}")
+        return [f"res-{x}" for x in input]
+
+
+async def submit_request(scheduler: BatchScheduler, request_id: int, pages: int, **predict_kwargs):
+    """1 request = semua halamannya di-submit sekaligus, ditunggu bersama (seperti PagePipeline)"""
+    inputs = [f"r{request_id}-p{page}" for page in range(pages)]
+    results = await asyncio.gather(*(scheduler.predict(inp, **predict_kwargs) for inp in inputs))
+    return inputs, results
+
+
+async def run_requests(scheduler: BatchScheduler, requests: int, pages: int):
+    return await asyncio.gather(*(submit_request(scheduler, i, pages) for i in range(requests)))
+
+
+def run(requests: int, pages: int, batch_size: int, max_wait: float, latency: float, batch_overhead: float):
+    stub = StubPipeline(latency, batch_overhead)
+    scheduler = BatchScheduler(lambda: stub, max_batch_size=batch_size, max_wait=max_wait)
+    scheduler.start()
+    try:
+        started = time.perf_counter()
+        outputs = asyncio.run(run_requests(scheduler, requests, pages))
+        elapsed = time.perf_counter() - started
+    finally:
+        scheduler.stop()
+    in_order = all(results == [[f"res-{inp}"] for inp in inputs] for inputs, results in outputs)
+    total = requests * pages
+    return {
+        "pages": total,
+        "batches": len(stub.batch_sizes),
+        "max_batch": max(stub.batch_sizes, default=0),
+        "mean_batch": round(total / len(stub.batch_sizes), 2) if stub.batch_sizes else 0,
+        "in_order": in_order,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(total / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def _report(name: str, ok: bool, detail) -> bool:
+    print(f"{'ok' if ok else 'GAGAL':>6} {name}: {detail}")
+    return ok
+
+
+def check() -> bool:
+    ok = True
+
+    result = run(requests=6, pages=5, batch_size=4, max_wait=0.05, latency=0.005, batch_overhead=0.01)
+    ok &= _report("batch konkuren > 1", result["max_batch"] > 1, result)
+    ok &= _report("urutan hasil per request", result["in_order"], result["in_order"])
+
+    # Parameter predict berbeda tidak boleh masuk ke batch yang sama
+    stub = StubPipeline()
+    scheduler = BatchScheduler(lambda: stub, max_batch_size=8, max_wait=0.05)
+    scheduler.start()
+
+    async def mixed():
+        return await asyncio.gather(
+            submit_request(scheduler, 0, 4, use_layout_detection=True),
+            submit_request(scheduler, 1, 4, use_layout_detection=False),
+        )
+
+    try:
+        outputs = asyncio.run(mixed())
+    finally:
+        scheduler.stop()
+    # Request 0 memakai use_layout_detection=True, request 1 False: setiap batch hanya berisi satu request
+    separated = all(
+        all(inp.startswith("r0-") == kwargs["use_layout_detection"] for inp in inputs) for inputs, kwargs in stub.batches
+    )
+    in_order = all(results == [[f"res-{inp}"] for inp in inputs] for inputs, results in outputs)
+    ok &= _report("parameter berbeda dipisah", separated and in_order, stub.batches)
+
+    # Halaman rusak: batch diulang per item, halaman lain tetap berhasil
+    stub = StubPipeline()
+    scheduler = BatchScheduler(lambda: stub, max_batch_size=4, max_wait=0.05)
+    scheduler.start()
+
+    async def broken():
+        futures = [scheduler.predict(inp) for inp in ["a", "rusak-b", "c"]]
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    try:
+        results = asyncio.run(broken())
+    finally:
+        scheduler.stop()
+    isolated = results[0] == ["res-a"] and isinstance(results[1], ValueError) and results[2] == ["res-c"]
+    ok &= _report("halaman rusak terisolasi", isolated, results)
+    return bool(ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=8, help="Jumlah request konkuren")
+    parser.add_argument("--pages", type=int, default=10, help="Halaman per request")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="Detik per input di stub predict")
+    parser.add_argument("--batch-overhead", type=float, default=0.05, help="Detik tetap per panggilan stub predict")
+    parser.add_argument("--json", dest="json_path", help="Simpan hasil ke file JSON")
+    parser.add_argument("--check", action="store_true", help="Jalankan pemeriksaan batching saja")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check() else 1)
+
+    rows = []
+    for batch_size in sorted({1, args.batch_size}):
+        result = run(args.requests, args.pages, batch_size, args.max_wait_ms / 1000.0, args.latency, args.batch_overhead)
+        rows.append({"batch_size": batch_size, **result})
+
+    print(f"{'batch':>6}{'pages':>8}{'batches':>9}{'max':>6}{'mean':>7}{'order':>7}{'seconds':>10}{'pages/sec':>12}")
+    for row in rows:
+        print(
+            f"{row['batch_size']:>6}{row['pages']:>8}{row['batches']:>9}{row['max_batch']:>6}{row['mean_batch']:>7}"
+            f"{str(row['in_order']):>7}{row['seconds']:>10}{row['pages_per_sec']:>12}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
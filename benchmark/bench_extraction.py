@@ -0,0 +1,180 @@
+"""
+Benchmark ekstraksi tabel BOM (extraction.py) pada corpus markdown halaman hasil OCR.
+
+Corpus = file .md halaman (mis. folder markdown_pages/ di OUTPUT_DIR) atau folder yang di-walk.
+Tanpa corpus, --synthetic N membuat N halaman rekap order & material list (HTML table seperti
+output PaddleOCR-VL) dengan --rows baris per tabel.
+
+Setiap halaman diekstrak dengan deteksi schema otomatis (extract_page tanpa section).
+--check menjalankan kasus regresi sel OCR bermasalah (qty sangat panjang, digit non-ASCII) lalu keluar.
+
+Contoh:
+    python benchmark/bench_extraction.py storage/agen/production-note/outputs --repeat 3
+    python benchmark/bench_extraction.py --synthetic 500 --rows 40 --json hasil.json
+    python benchmark/bench_extraction.py --check
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import BREAKDOWN_TABLE, MATERIAL_TABLE, extract_page, extract_tables
+
+SIZES = ["XS", "S", "M", "L", "XL", "2XL"]
+COUNTRIES = ["US", "JP", "DE", "ID", "AU"]
+
+
+def load_corpus(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                pages.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(".md"))
+        else:
+            pages.append(path)
+    corpus = []
+    for path in pages:
+        with open(path, "r", encoding="utf-8") as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def synthetic_rekap(rng: random.Random, rows: int) -> str:
+    head = (
+        '<table border=1><tr><td rowspan="2">COLOR</td><td rowspan="2">COUNTRY</td><td rowspan="2">SHIP DATE</td>'
+        f'<td colspan="{len(SIZES)}">SIZE</td><td rowspan="2">TOTAL</td></tr>'
+        "<tr>" + "".join(f"<td>{size}</td>" for size in SIZES) + "</tr>"
+    )
+    body = []
+    for i in range(rows):
+        quantities = [rng.choice(["", "0", str(rng.randint(1, 3000)), f"{rng.randint(1, 9)},{rng.randint(100, 999)}"]) for _ in SIZES]
+        color = f"<td>COLOR {i // 3:03d}</td>" if i % 3 == 0 else "<td></td>"
+        body.append(
+            f"<tr>{color}<td>{rng.choice(COUNTRIES)}</td><td>{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025</td>"
+            + "".join(f"<td>{q}</td>" for q in quantities) + "<td>999</td></tr>"
+        )
+    return "# REKAP ORDER\n\n" + head + "".join(body) + "<tr><td>TOTAL</td>" + "<td></td>" * (len(SIZES) + 3) + "</tr></table>\n"
+
+
+def synthetic_material(rng: random.Random, rows: int) -> str:
+    head = (
+        "<table><tr><th>No</th><th>Style</th><th>Garment Color</th><th>Material Color</th><th>JO</th>"
+        "<th>Item Description</th><th>Description 2</th><th>Cons (YY/MT)</th><th>UM</th></tr>"
+    )
+    body = []
+    for i in range(rows):
+        body.append(
+            f"<tr><td>{i + 1}</td><td>{'ST-100' if i == 0 else ''}</td><td>BLACK</td><td>COLOR {rng.randint(1, 50)}</td>"
+            f"<td>{rng.randint(10000, 99999)}</td><td>Material {rng.randint(1, 500)}</td><td>Ref {i}</td>"
+            f"<td>{rng.randint(0, 3)},{rng.randint(0, 99):02d}</td><td>{rng.choice(['YD', 'MT', 'PCS'])}</td></tr>"
+        )
+    return "# MATERIAL LIST\n\n" + head + "".join(body) + "</table>\n"
+
+
+def synthetic_corpus(count: int, rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [synthetic_rekap(rng, rows) if i % 2 == 0 else synthetic_material(rng, rows) for i in range(count)]
+
+
+def rekap_page(cells) -> str:
+    """Halaman rekap order 1 baris dengan isi sel qty per size apa adanya"""
+    head = (
+        '<table border=1><tr><td rowspan="2">COLOR</td><td rowspan="2">COUNTRY</td><td rowspan="2">SHIP DATE</td>'
+        f'<td colspan="{len(SIZES)}">SIZE</td><td rowspan="2">TOTAL</td></tr>'
+        "<tr>" + "".join(f"<td>{size}</td>" for size in SIZES) + "</tr>"
+    )
+    quantities = "".join(f"<td>{cell}</td>" for cell in list(cells) + [""] * (len(SIZES) - len(cells)))
+    return f"# REKAP ORDER\n\n{head}<tr><td>BLACK</td><td>US</td><td>01/02/2025</td>{quantities}<td>1</td></tr></table>\n"
+
+
+# (sel qty per size, {size: qty} yang diharapkan)
+REGRESSION_CASES = [
+    # Melebihi int64: dulu OverflowError saat cast
+    (["99999999999999999999999"], {"XS": "99999999999999999999999"}),
+    # Superscript lolos isdigit tapi bukan angka: dulu ValueError
+    (["12²", "5"], {"S": "5"}),
+    (["0012", "0", "1.234"], {"XS": "12", "M": "1234"}),
+]
+
+
+def check_regressions() -> bool:
+    ok = True
+    for cells, expected in REGRESSION_CASES:
+        rows = extract_page(rekap_page(cells))[BREAKDOWN_TABLE]
+        got = {row["size_code"]: row["quantity"] for row in rows}
+        status = "ok" if got == expected else "GAGAL"
+        ok = ok and got == expected
+        print(f"{status:>6} {cells} -> {got}")
+    return ok
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run(corpus, repeat: int):
+    latencies = []
+    rows = {BREAKDOWN_TABLE: 0, MATERIAL_TABLE: 0}
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for markdown in corpus:
+            page_started = time.perf_counter()
+            result = extract_page(markdown)
+            latencies.append(time.perf_counter() - page_started)
+            for name in rows:
+                rows[name] += len(result[name])
+    elapsed = time.perf_counter() - started
+    tables = sum(len(extract_tables(markdown)) for markdown in corpus) * repeat
+    pages = len(corpus) * repeat
+    return {
+        "pages": pages,
+        "tables": tables,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1) if elapsed > 0 else None,
+        "rows_per_sec": round(sum(rows.values()) / elapsed, 1) if elapsed > 0 else None,
+        "page_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="File .md halaman atau folder berisi markdown_pages/")
+    parser.add_argument("--synthetic", type=int, default=0, help="Jumlah halaman sintetis jika tanpa corpus")
+    parser.add_argument("--rows", type=int, default=30, help="Baris per tabel sintetis")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Simpan hasil ke file JSON")
+    parser.add_argument("--check", action="store_true", help="Jalankan kasus regresi saja")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check_regressions() else 1)
+
+    corpus = load_corpus(args.paths) if args.paths else synthetic_corpus(args.synthetic or 200, args.rows)
+    if not corpus:
+        parser.error("Corpus kosong")
+    result = run(corpus, args.repeat)
+
+    print(f"{'pages':>8}{'tables':>8}{'rows':>10}{'seconds':>10}{'pages/sec':>12}{'rows/sec':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    print(
+        f"{result['pages']:>8}{result['tables']:>8}{sum(result['rows'].values()):>10}{result['seconds']:>10}"
+        f"{result['pages_per_sec']:>12}{result['rows_per_sec']:>12}{result['page_ms']['p50']:>10}{result['page_ms']['p95']:>10}"
+    )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"paths": args.paths, "synthetic": not args.paths, "repeat": args.repeat, "result": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,677 @@
+"""
+Benchmark & load generator endpoint parsing: replay corpus PDF dengan concurrency tertentu,
+laporan latency p50/p95/p99, pages/sec & peak RSS per stage dalam JSON yang bisa dibandingkan
+antar versi app.
+
+Target:
+- --app FILE (default app.py, boleh diulang, mis. version/app-v5.py): app dijalankan uvicorn
+  di proses terpisah per app (peak RSS tidak tercampur), model = stub (default) atau model asli
+- --url URL: server yang sudah berjalan (model asli / deployment), stage dari GET /metrics
+
+Model stub (benchmark/stub_paddleocr.py): durasi predict = --batch-overhead + --latency * jumlah
+halaman, jadi hasil mengukur overhead app (render, encode, antrian, simpan, publish) secara
+reproducible tanpa GPU. --model real memakai paddleocr yang terinstall.
+
+Stage (mode --app, app dengan metrics.py): durasi mentah tiap observasi ocr_stage_seconds
+(render, encode, predict, save_markdown, ...), predict_batch (panggilan model) & document;
+peak RSS stage = RSS proses tertinggi selama stage tersebut berjalan (sampling --rss-interval).
+Stage "request" = latency end-to-end di sisi client. Mode --url: quantile stage diestimasi dari
+bucket histogram /metrics (selisih sebelum & sesudah run), peak RSS = jumlah RSS semua worker.
+
+Cache OCR dimatikan (OCR_CACHE_ENABLED=0) kecuali --cache, dan setiap upload diberi byte unik
+(komentar PDF di akhir file) agar dedup dokumen tidak membuat request berikutnya gratis.
+Untuk --url jalankan server dengan OCR_CACHE_ENABLED=0 agar cache halaman juga tidak ikut.
+Form field lain (pages, dpi, sections, ...) lewat --field key=value, header lewat --header
+(mis. --header "Paddle-API-Key: ..." untuk version/app-v1.py).
+
+Contoh:
+    python benchmark/bench_parsing.py samples/*.pdf --concurrency 4 --requests 40 --json hasil.json
+    python benchmark/bench_parsing.py --synthetic 8 --app app.py --app version/app-v5.py --latency 0.2
+    python benchmark/bench_parsing.py samples/ --url http://localhost:8000 --concurrency 8 --baseline hasil.json
+"""
+import argparse
+import bisect
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+ENDPOINTS = ["/document-parsing", "/ocr"]
+# Metric histogram app -> nama stage laporan
+STAGE_HISTOGRAMS = {
+    "ocr_stage_seconds": None,
+    "ocr_predict_batch_seconds": "predict_batch",
+    "ocr_document_seconds": "document",
+}
+
+
+# ---------- Statistik ----------
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+        "mean": round(sum(values) / len(values), 4),
+        "total_seconds": round(sum(values), 3),
+    }
+
+
+def histogram_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """Estimasi quantile dari bucket kumulatif [(le, count)] (interpolasi linear seperti Prometheus)"""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    prev_le, prev_count = 0.0, 0.0
+    for le, count in buckets:
+        if count >= rank:
+            if le == float("inf"):
+                return round(prev_le, 4)
+            if count == prev_count:
+                return round(le, 4)
+            return round(prev_le + (le - prev_le) * (rank - prev_count) / (count - prev_count), 4)
+        prev_le, prev_count = le, count
+    return round(prev_le, 4)
+
+
+# ---------- Corpus ----------
+
+def pdf_page_count(data: bytes) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def load_corpus(paths: List[str]) -> List[Dict[str, Any]]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(".pdf"))
+        else:
+            files.append(path)
+    corpus = []
+    for path in files:
+        with open(path, "rb") as f:
+            data = f.read()
+        corpus.append({"name": os.path.basename(path), "data": data, "pages": pdf_page_count(data)})
+    return corpus
+
+
+def synthetic_pdf(pages: int, seed: int = 0) -> bytes:
+    """PDF A4 (150 DPI) berisi baris teks & tabel sederhana, deterministik per seed"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    images = []
+    for page in range(pages):
+        img = Image.new("RGB", (1240, 1754), "white")
+        draw = ImageDraw.Draw(img)
+        draw.text((80, 80), f"PRODUCTION NOTE {seed}-{page + 1}", fill="black")
+        for row in range(40):
+            y = 160 + row * 38
+            draw.line((80, y, 1160, y), fill="gray")
+            for col in range(6):
+                draw.text((90 + col * 180, y + 10), f"{rng.randint(0, 99999):05d}", fill="black")
+        images.append(img)
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def synthetic_corpus(pages: int, documents: int = 4) -> List[Dict[str, Any]]:
+    return [
+        {"name": f"synthetic_{i}.pdf", "data": synthetic_pdf(pages, seed=i), "pages": pages}
+        for i in range(documents)
+    ]
+
+
+def unique_pdf(data: bytes, index: int) -> bytes:
+    # Komentar setelah %%EOF diabaikan pembaca PDF, tapi mengubah hash dokumen
+    return data + f"\n%bench-{index}-{uuid.uuid4().hex}\n".encode("ascii")
+
+
+# ---------- HTTP client (stdlib, tanpa dependency tambahan) ----------
+
+def encode_multipart(fields: Dict[str, str], filename: str, data: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n".encode("utf-8")
+    )
+    parts.append(data)
+    parts.append(f"\r\n--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def post_document(
+    url: str, fields: Dict[str, str], headers: Dict[str, str], filename: str, data: bytes, timeout: float
+) -> Tuple[int, Any]:
+    body, content_type = encode_multipart(fields, filename, data)
+    request = urllib.request.Request(url, data=body, method="POST", headers=dict(headers, **{"Content-Type": content_type}))
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        try:
+            return e.code, json.loads(e.read() or b"null")
+        except ValueError:
+            return e.code, None
+
+
+def fetch_text(url: str, timeout: float = 5.0) -> Optional[str]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.read().decode("utf-8")
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+# ---------- Sampling RSS & stage ----------
+
+def process_rss_bytes() -> int:
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class RssSampler(threading.Thread):
+    """Sampling RSS berkala (t perf_counter, byte) via fungsi `read`"""
+
+    def __init__(self, read, interval: float):
+        super().__init__(name="bench-rss", daemon=True)
+        self.read = read
+        self.interval = interval
+        self.times: List[float] = []
+        self.values: List[int] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            value = self.read()
+            if value is not None:
+                self.times.append(time.perf_counter())
+                self.values.append(value)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def peak(self, start: Optional[float] = None, end: Optional[float] = None) -> Optional[int]:
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect.bisect_right(self.times, end)
+        # Stage lebih pendek dari interval sampling: pakai sampel terdekat sesudahnya
+        window = self.values[lo:hi] or self.values[lo:lo + 1]
+        return max(window) if window else None
+
+
+class StageRecorder:
+    """Rekam setiap observasi histogram stage app (durasi + interval waktu) lewat metrics.py app"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, metrics_module) -> bool:
+        attached = False
+        for attr in ("STAGE_SECONDS", "PREDICT_BATCH_SECONDS", "DOCUMENT_SECONDS"):
+            metric = getattr(metrics_module, attr, None)
+            if metric is not None and metric.name in STAGE_HISTOGRAMS:
+                self._wrap(metric, STAGE_HISTOGRAMS[metric.name])
+                attached = True
+        return attached
+
+    def _wrap(self, histogram, stage_name: Optional[str]):
+        observe = histogram.observe
+
+        def recording_observe(value, labels=()):
+            stage = stage_name or (labels[0] if labels else histogram.name)
+            end = time.perf_counter()
+            with self._lock:
+                self.samples.setdefault(stage, []).append((end - value, end))
+            observe(value, labels)
+
+        histogram.observe = recording_observe
+
+    def record(self, stage: str, start: float, end: float):
+        with self._lock:
+            self.samples.setdefault(stage, []).append((start, end))
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    def summary(self, sampler: Optional[RssSampler]) -> Dict[str, Any]:
+        stages = {}
+        with self._lock:
+            samples = {stage: list(items) for stage, items in self.samples.items()}
+        for stage, items in sorted(samples.items()):
+            stats = summarize([end - start for start, end in items])
+            if sampler is not None:
+                peaks = [sampler.peak(start, end) for start, end in items]
+                peaks = [peak for peak in peaks if peak is not None]
+                stats["peak_rss_mb"] = round(max(peaks) / 1024 / 1024, 1) if peaks else None
+            stages[stage] = stats
+        return stages
+
+
+# ---------- Replay ----------
+
+def replay(
+    base_url: str,
+    endpoint: str,
+    corpus: List[Dict[str, Any]],
+    fields: Dict[str, str],
+    headers: Dict[str, str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    unique: bool,
+    timeout: float,
+    recorder: StageRecorder,
+    sampler: Optional[RssSampler] = None,
+    on_measure_start: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    url = base_url.rstrip("/") + endpoint
+
+    def send(index: int) -> Dict[str, Any]:
+        doc = corpus[index % len(corpus)]
+        data = unique_pdf(doc["data"], index) if unique else doc["data"]
+        started = time.perf_counter()
+        try:
+            status, payload = post_document(url, fields, headers, doc["name"], data, timeout)
+        except Exception as e:
+            status, payload = None, {"message": str(e)}
+        ended = time.perf_counter()
+        body = payload if isinstance(payload, dict) else {}
+        ok = status == 200 and body.get("success", True) is not False
+        data_field = body.get("data") if isinstance(body.get("data"), dict) else {}
+        return {
+            "ok": ok,
+            "status": status,
+            "message": None if ok else str(body.get("message"))[:200],
+            "start": started,
+            "end": ended,
+            # App baru melaporkan halaman yang di-OCR, app lama: jumlah halaman PDF
+            "pages": data_field.get("pages_processed") or doc["pages"],
+        }
+
+    for index in range(warmup):
+        send(-1 - index)
+    recorder.reset()
+    if on_measure_start is not None:
+        on_measure_start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    done = [r for r in results if r["ok"]]
+    for r in done:
+        recorder.record("request", r["start"], r["end"])
+    pages = sum(r["pages"] for r in done)
+    errors = [r for r in results if not r["ok"]]
+    return {
+        "requests": len(results),
+        "errors": len(errors),
+        "error_samples": sorted({f"{r['status']}: {r['message']}" for r in errors})[:5],
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(done) / elapsed, 3) if elapsed > 0 else None,
+        "pages_per_sec": round(pages / elapsed, 3) if elapsed > 0 else None,
+        "latency_seconds": summarize([r["end"] - r["start"] for r in done]),
+        "peak_rss_mb": round(sampler.peak() / 1024 / 1024, 1) if sampler is not None and sampler.values else None,
+    }
+
+
+# ---------- Target: app lokal (uvicorn in-process, 1 proses per app) ----------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_app(app_path: str):
+    spec = importlib.util.spec_from_file_location("app", app_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["app"] = module
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def run_local(app_path: str, options: Dict[str, Any], corpus: List[Dict[str, Any]], result_queue):
+    """Target proses spawn: jalankan 1 app di folder kerja sementara lalu replay corpus"""
+    import uvicorn
+
+    workdir = tempfile.mkdtemp(prefix="bench-parsing-")
+    os.chdir(workdir)
+    if not options["cache"]:
+        os.environ["OCR_CACHE_ENABLED"] = "0"
+    if options["model"] == "stub":
+        sys.path.insert(0, BENCH_DIR)
+        import stub_paddleocr
+        stub_paddleocr.install(options["latency"], options["batch_overhead"])
+
+    try:
+        app = load_app(app_path)
+        recorder = StageRecorder()
+        has_stages = "metrics" in sys.modules and recorder.attach(sys.modules["metrics"])
+        endpoint = options["endpoint"] or next(
+            (path for path in ENDPOINTS if any(getattr(r, "path", None) == path for r in app.routes)), ENDPOINTS[0]
+        )
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, name="bench-uvicorn", daemon=True)
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("Server gagal start")
+            time.sleep(0.05)
+
+        sampler = RssSampler(process_rss_bytes, options["rss_interval"])
+        sampler.start()
+        try:
+            result = replay(
+                f"http://127.0.0.1:{port}", endpoint, corpus, options["fields"], options["headers"], options["requests"],
+                options["concurrency"], options["warmup"], options["unique"], options["timeout"], recorder, sampler,
+            )
+        finally:
+            sampler.stop()
+            server.should_exit = True
+            thread.join(timeout=30)
+
+        result["stages"] = recorder.summary(sampler)
+        if not has_stages:
+            result["stages_note"] = "app tanpa metrics.py, hanya stage request"
+        if options["model"] == "stub":
+            result["model_calls"] = dict(sys.modules["paddleocr"].stats)
+        result_queue.put({"target": app_path, "endpoint": endpoint, "result": result})
+    except Exception as e:
+        result_queue.put({"target": app_path, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ---------- Target: server yang sudah berjalan ----------
+
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$")
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    samples = {}
+    for line in (text or "").splitlines():
+        match = _SAMPLE_RE.match(line)
+        if match is None or line.startswith("#"):
+            continue
+        labels = tuple(sorted(_LABEL_RE.findall(match.group(2) or "")))
+        samples[(match.group(1), labels)] = float(match.group(3))
+    return samples
+
+
+def histogram_stages(before: Dict, after: Dict) -> Dict[str, Any]:
+    """Quantile stage dari selisih bucket histogram /metrics sebelum & sesudah run"""
+    buckets: Dict[str, List[Tuple[float, float]]] = {}
+    totals: Dict[str, float] = {}
+    for (name, labels), value in after.items():
+        family = name.rsplit("_", 1)[0]
+        if family not in STAGE_HISTOGRAMS:
+            continue
+        label_map = dict(labels)
+        stage = STAGE_HISTOGRAMS[family] or label_map.get("stage", family)
+        delta = value - before.get((name, labels), 0.0)
+        if name.endswith("_bucket"):
+            buckets.setdefault(stage, []).append((float(label_map["le"]), delta))
+        elif name.endswith("_sum"):
+            totals[stage] = delta
+    stages = {}
+    for stage, items in sorted(buckets.items()):
+        items.sort()
+        count = items[-1][1] if items else 0
+        if count <= 0:
+            continue
+        stages[stage] = {
+            "count": int(count),
+            "p50": histogram_quantile(0.50, items),
+            "p95": histogram_quantile(0.95, items),
+            "p99": histogram_quantile(0.99, items),
+            "mean": round(totals.get(stage, 0.0) / count, 4),
+            "total_seconds": round(totals.get(stage, 0.0), 3),
+        }
+    return stages
+
+
+def run_remote(url: str, options: Dict[str, Any], corpus: List[Dict[str, Any]]) -> Dict[str, Any]:
+    metrics_url = url.rstrip("/") + "/metrics"
+
+    def server_rss() -> Optional[int]:
+        samples = parse_metrics(fetch_text(metrics_url))
+        values = [v for (name, _), v in samples.items() if name == "process_resident_memory_bytes"]
+        return int(sum(values)) if values else None
+
+    has_metrics = bool(parse_metrics(fetch_text(metrics_url)))
+    # Snapshot histogram diambil setelah warmup agar request warmup tidak ikut dihitung
+    before: Dict = {}
+
+    def snapshot_metrics():
+        before.update(parse_metrics(fetch_text(metrics_url)))
+
+    recorder = StageRecorder()
+    sampler = RssSampler(server_rss, max(options["rss_interval"], 1.0)) if has_metrics else None
+    if sampler is not None:
+        sampler.start()
+    try:
+        result = replay(
+            url, options["endpoint"] or ENDPOINTS[0], corpus, options["fields"], options["headers"], options["requests"],
+            options["concurrency"], options["warmup"], options["unique"], options["timeout"], recorder, sampler,
+            on_measure_start=snapshot_metrics if has_metrics else None,
+        )
+    finally:
+        if sampler is not None:
+            sampler.stop()
+    stages = histogram_stages(before, parse_metrics(fetch_text(metrics_url))) if has_metrics else {}
+    stages["request"] = recorder.summary(None).get("request", {"count": 0})
+    result["stages"] = stages
+    if not has_metrics:
+        result["stages_note"] = "GET /metrics tidak tersedia, hanya stage request"
+    return {"target": url, "endpoint": options["endpoint"] or ENDPOINTS[0], "result": result}
+
+
+# ---------- Laporan ----------
+
+def print_results(results: List[Dict[str, Any]]):
+    for item in results:
+        print(f"\n== {item['target']}")
+        if "error" in item:
+            print(f"   gagal: {item['error']}")
+            continue
+        result = item["result"]
+        latency = result["latency_seconds"]
+        print(
+            f"   {result['requests']} request ({result['errors']} error), {result['pages']} halaman, "
+            f"{result['seconds']} detik, {result['pages_per_sec']} pages/sec, peak RSS {result['peak_rss_mb']} MB"
+        )
+        for sample in result["error_samples"]:
+            print(f"   error: {sample}")
+        print(f"   {'stage':<16}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'total s':>10}{'RSS MB':>9}")
+        stages = dict(result["stages"])
+        for stage, stats in [("request", stages.pop("request", latency))] + sorted(stages.items()):
+            if not stats.get("count"):
+                continue
+            print(
+                f"   {stage:<16}{stats['count']:>7}{stats['p50']:>9}{stats['p95']:>9}{stats['p99']:>9}"
+                f"{stats.get('total_seconds', ''):>10}{stats.get('peak_rss_mb') or '':>9}"
+            )
+
+
+def compare(baseline: Dict[str, Any], results: List[Dict[str, Any]]):
+    """Selisih terhadap hasil JSON sebelumnya (target pertama baseline vs setiap target run ini)"""
+    base = next((item for item in baseline.get("results", []) if "result" in item), None)
+    if base is None:
+        print("\nBaseline tanpa hasil yang bisa dibandingkan")
+        return
+    metrics = [
+        ("pages/sec", lambda r: r["pages_per_sec"]),
+        ("latency p50", lambda r: r["latency_seconds"].get("p50")),
+        ("latency p95", lambda r: r["latency_seconds"].get("p95")),
+        ("latency p99", lambda r: r["latency_seconds"].get("p99")),
+        ("peak RSS MB", lambda r: r["peak_rss_mb"]),
+    ]
+    stage_names = sorted(set(base["result"].get("stages", {})) - {"request"})
+    metrics += [
+        (f"{stage} p95", lambda r, stage=stage: r.get("stages", {}).get(stage, {}).get("p95"))
+        for stage in stage_names
+    ]
+    for item in results:
+        if "result" not in item:
+            continue
+        print(f"\n== {item['target']} vs baseline {base['target']}")
+        print(f"   {'metric':<24}{'baseline':>12}{'sekarang':>12}{'selisih':>10}")
+        for label, getter in metrics:
+            old, new = getter(base["result"]), getter(item["result"])
+            change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else ""
+            print(f"   {label:<24}{old if old is not None else '-':>12}{new if new is not None else '-':>12}{change:>10}")
+
+
+def parse_pairs(values: List[str], separator: str, option: str) -> Dict[str, str]:
+    pairs = {}
+    for value in values:
+        key, sep, pair_value = value.partition(separator)
+        if not sep or not key.strip():
+            raise ValueError(f"{option} harus key{separator}value: {value}")
+        pairs[key.strip()] = pair_value.strip()
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="File PDF / folder corpus")
+    parser.add_argument("--synthetic", type=int, default=0, help="Jumlah halaman PDF sintetis jika tanpa corpus")
+    parser.add_argument("--app", dest="apps", action="append", help="File app (boleh diulang), default app.py")
+    parser.add_argument("--url", help="Benchmark server yang sudah berjalan, bukan app lokal")
+    parser.add_argument("--endpoint", help="Path endpoint upload (default: deteksi /document-parsing atau /ocr)")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub: detik predict per halaman")
+    parser.add_argument("--batch-overhead", type=float, default=0.0, help="Stub: detik tambahan per panggilan predict")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, help="Jumlah request (default: 1x corpus)")
+    parser.add_argument("--warmup", type=int, default=1, help="Request awal yang tidak dihitung")
+    parser.add_argument("--field", dest="fields", action="append", default=[], help="Form field key=value, mis. pages=1-3")
+    parser.add_argument("--header", dest="headers", action="append", default=[], help="Header HTTP 'Nama: nilai'")
+    parser.add_argument("--cache", action="store_true", help="Biarkan cache OCR aktif (app lokal)")
+    parser.add_argument("--no-unique", dest="unique", action="store_false", help="Kirim byte PDF asli (dedup bisa kena)")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--rss-interval", type=float, default=0.02, help="Interval sampling RSS (detik)")
+    parser.add_argument("--json", dest="json_path", help="Simpan hasil ke file JSON")
+    parser.add_argument("--baseline", help="File JSON hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    try:
+        fields = parse_pairs(args.fields, "=", "--field")
+        headers = parse_pairs(args.headers, ":", "--header")
+    except ValueError as e:
+        parser.error(str(e))
+    corpus = load_corpus(args.paths) if args.paths else synthetic_corpus(args.synthetic or 4)
+    if not corpus:
+        parser.error("Corpus kosong")
+    options = {
+        "model": args.model,
+        "latency": args.latency,
+        "batch_overhead": args.batch_overhead,
+        "concurrency": args.concurrency,
+        "requests": args.requests or len(corpus),
+        "warmup": args.warmup,
+        "fields": fields,
+        "headers": headers,
+        "cache": args.cache,
+        "unique": args.unique,
+        "timeout": args.timeout,
+        "rss_interval": args.rss_interval,
+        "endpoint": args.endpoint,
+    }
+
+    results = []
+    if args.url:
+        results.append(run_remote(args.url, options, corpus))
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        for app_path in args.apps or [os.path.join(REPO_DIR, "app.py")]:
+            result_queue = ctx.Queue()
+            proc = ctx.Process(target=run_local, args=(os.path.abspath(app_path), options, corpus, result_queue))
+            proc.start()
+            # Ambil hasil sebelum join: data besar di Queue menahan proses anak keluar
+            result = None
+            while result is None:
+                try:
+                    result = result_queue.get(timeout=1)
+                except queue.Empty:
+                    if not proc.is_alive():
+                        break
+            proc.join()
+            if result is None:
+                try:
+                    result = result_queue.get_nowait()
+                except queue.Empty:
+                    result = {"target": app_path, "error": f"exit code {proc.exitcode}"}
+            results.append(result)
+
+    print_results(results)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+    if args.json_path:
+        # Nilai header (API key) tidak ikut disimpan
+        config = dict(options, headers=sorted(options["headers"]), corpus=[{"name": doc["name"], "pages": doc["pages"], "bytes": len(doc["data"])} for doc in corpus])
+        if args.model != "stub" or args.url:
+            config.pop("latency")
+            config.pop("batch_overhead")
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "cpu_count": os.cpu_count(),
+                "config": config,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
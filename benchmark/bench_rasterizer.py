@@ -0,0 +1,97 @@
+"""
+Benchmark backend rasterisasi: pages/sec & peak RSS per backend pada corpus PDF.
+
+Backend yang dibandingkan:
+- convert_from_path : jalur lama, convert_from_path(dpi, thread_count=4) untuk seluruh dokumen sekaligus
+- poppler           : PopplerRasterizer, render per halaman (pdftoppm per range)
+- pymupdf           : PyMuPDFRasterizer, render in-process per halaman
+
+Setiap backend dijalankan di proses terpisah agar peak RSS tidak tercampur;
+peak RSS = max(RSS proses benchmark, RSS subprocess pdftoppm yang sudah selesai).
+
+Contoh:
+    python benchmark/bench_rasterizer.py samples/*.pdf --dpi 300 --repeat 2 --json hasil.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKENDS = ["convert_from_path", "poppler", "pymupdf"]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss dalam KB di Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024.0
+
+
+def run_backend(backend: str, pdf_paths, dpi: int, repeat: int, result_queue):
+    from rasterizer import get_rasterizer
+
+    pages = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for pdf_path in pdf_paths:
+            if backend == "convert_from_path":
+                from pdf2image import convert_from_path
+                images = convert_from_path(pdf_path, dpi=dpi, fmt="jpeg", thread_count=4)
+                pages += len(images)
+                del images
+                continue
+            raster = get_rasterizer(backend)
+            page_numbers = list(range(1, raster.page_count(pdf_path) + 1))
+            for _, img in raster.render_pages(pdf_path, page_numbers, dpi):
+                pages += 1
+                del img
+    elapsed = time.perf_counter() - started
+    result_queue.put({
+        "backend": backend,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 3) if elapsed > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+", help="File PDF corpus")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Daftar backend dipisah koma")
+    parser.add_argument("--json", dest="json_path", help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in args.backends.split(","):
+        result_queue = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, args.pdfs, args.dpi, args.repeat, result_queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            results.append({"backend": backend, "error": f"exit code {proc.exitcode}"})
+            continue
+        results.append(result_queue.get())
+
+    print(f"{'backend':<20}{'pages':>8}{'seconds':>10}{'pages/sec':>12}{'peak RSS MB':>14}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<20}{r['error']}")
+            continue
+        print(f"{r['backend']:<20}{r['pages']:>8}{r['seconds']:>10}{r['pages_per_sec']:>12}{r['peak_rss_mb']:>14}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"dpi": args.dpi, "repeat": args.repeat, "pdfs": args.pdfs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
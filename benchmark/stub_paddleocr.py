@@ -0,0 +1,83 @@
+"""
+Pengganti modul `paddleocr` untuk benchmark tanpa model / GPU (dipakai bench_parsing.py --model stub).
+
+PaddleOCRVL palsu dengan latency yang bisa diatur:
+    durasi 1 panggilan predict = batch_overhead + latency * jumlah input
+
+Result meniru bagian PaddleOCR-VL yang dipakai app: res.markdown (dict markdown_texts /
+markdown_images), save_to_markdown(save_path), to_dict(), dan concatenate_markdown_pages.
+Input PDF (app versi lama mengirim PDF utuh ke model) menghasilkan 1 result per halaman.
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+LATENCY_SECONDS = 0.5
+BATCH_OVERHEAD_SECONDS = 0.0
+MODEL_LOAD_SECONDS = 0.0
+
+# Statistik panggilan predict (jumlah batch & input), dibaca bench_parsing.py
+stats = {"calls": 0, "inputs": 0, "max_batch": 0}
+_stats_lock = threading.Lock()
+
+
+def install(latency: float = LATENCY_SECONDS, batch_overhead: float = BATCH_OVERHEAD_SECONDS, load_seconds: float = MODEL_LOAD_SECONDS):
+    """Daftarkan modul ini sebagai `paddleocr` (panggil sebelum app di-import)"""
+    global LATENCY_SECONDS, BATCH_OVERHEAD_SECONDS, MODEL_LOAD_SECONDS
+    LATENCY_SECONDS, BATCH_OVERHEAD_SECONDS, MODEL_LOAD_SECONDS = latency, batch_overhead, load_seconds
+    sys.modules["paddleocr"] = sys.modules[__name__]
+
+
+def _pdf_pages(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+class StubResult:
+    def __init__(self, input_path: str, page: int):
+        self.input_path = input_path
+        self.page = page
+        text = f"# {Path(input_path).stem or 'page'} {page}\n\nStub PaddleOCR-VL.\n"
+        self.markdown = {"markdown_texts": text, "markdown_images": {}, "page_continuation_flags": (True, True)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"input_path": self.input_path, "page_index": self.page, "markdown": self.markdown["markdown_texts"]}
+
+    def save_to_markdown(self, save_path: str):
+        # Seperti PaddleOCR-VL: path .md = file tujuan, selain itu folder (nama file dari input_path)
+        if save_path.lower().endswith(".md"):
+            target = save_path
+        else:
+            stem = Path(self.input_path).stem or "page"
+            target = os.path.join(save_path, f"{stem}_{self.page}.md" if self.page else f"{stem}.md")
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(self.markdown["markdown_texts"])
+
+
+class PaddleOCRVL:
+    def __init__(self, *args, **kwargs):
+        time.sleep(MODEL_LOAD_SECONDS)
+
+    def predict(self, input: Any, **kwargs) -> List[StubResult]:
+        items = input if isinstance(input, list) else [input]
+        results = []
+        for item in items:
+            # Input array (OCR_INPUT=array) tidak punya nama file
+            path = item if isinstance(item, str) else ""
+            if path.lower().endswith(".pdf"):
+                results.extend(StubResult(path, page) for page in range(1, _pdf_pages(path) + 1))
+            else:
+                results.append(StubResult(path, 0))
+        with _stats_lock:
+            stats["calls"] += 1
+            stats["inputs"] += len(results)
+            stats["max_batch"] = max(stats["max_batch"], len(results))
+        time.sleep(BATCH_OVERHEAD_SECONDS + LATENCY_SECONDS * len(results))
+        return results
+
+    def concatenate_markdown_pages(self, markdown_list: List[Any]) -> str:
+        return "\n\n".join(m["markdown_texts"] if isinstance(m, dict) else str(m) for m in markdown_list)
@@ -0,0 +1,29 @@
+"""
+Executor layer untuk pekerjaan blocking agar event loop asyncio tetap responsif.
+
+- io_executor : thread pool terbatas untuk I/O & encoding (simpan upload, poppler, JPEG, markdown)
+- pipeline PaddleOCRVL dimiliki 1 thread scheduler (lihat batching.BatchScheduler)
+
+Handler cukup `await run_io(...)`, sehingga /health dan request lain tetap dilayani
+walaupun ada upload besar yang sedang diproses.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io-worker")
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Jalankan fungsi blocking I/O / encoding di io_executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """Tutup semua executor saat aplikasi shutdown"""
+    io_executor.shutdown(wait=False, cancel_futures=True)
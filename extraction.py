@@ -0,0 +1,514 @@
+"""
+Ekstraksi BOM terstruktur dari markdown hasil OCR ke baris tabel guid/flow.md:
+
+- rekap_order_page                                  -> tp_breakdown_order_size
+- material_fabric_page / _accessories_ / _pack_page -> tp_material_list
+
+PaddleOCR-VL menulis tabel sebagai HTML (<table>) di dalam markdown, kadang sebagai tabel markdown
+(| a | b |). Setiap tabel diubah jadi grid numpy (sel rowspan/colspan diisi ulang), header dicocokkan
+ke kolom schema, lalu sel diproses per kolom dengan operasi numpy: normalisasi, forward-fill sel
+merge, melt matriks color x size, parse angka & tanggal per nilai unik (bukan regex per baris).
+
+Rekap order bisa berbentuk matriks (kolom per size) atau panjang (kolom size + qty). Tabel yang
+punya kolom country / shipment date dianggap type "breakdown", selain itu "main".
+Kolom yang tidak ditemukan di tabel bernilai None. Tabel di halaman section yang tidak cocok
+dengan schema dilewati (dihitung di tables_skipped).
+"""
+import re
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BREAKDOWN_TABLE = "tp_breakdown_order_size"
+MATERIAL_TABLE = "tp_material_list"
+
+# Field halaman di tp_header -> tabel tujuan
+SECTION_TABLES = {
+    "rekap_order_page": BREAKDOWN_TABLE,
+    "material_fabric_page": MATERIAL_TABLE,
+    "material_accessories_page": MATERIAL_TABLE,
+    "material_pack_page": MATERIAL_TABLE,
+}
+
+BREAKDOWN_HEADERS = {
+    "color": ("color", "colour", "color name", "colour name", "colorway", "color way", "color code", "warna"),
+    "size_code": ("size", "size code", "sizes", "ukuran"),
+    "quantity": ("qty", "quantity", "order qty", "qty pcs", "pcs", "jumlah"),
+    "country_code": ("country", "country code", "ctry", "destination", "dest", "negara"),
+    "shipment_date": (
+        "shipment date", "ship date", "shipment", "ex factory", "ex factory date", "ex fty", "exfty",
+        "etd", "delivery", "delivery date", "tanggal kirim",
+    ),
+    "total": ("total", "total qty", "grand total", "sub total", "subtotal", "ttl"),
+}
+
+MATERIAL_HEADERS = {
+    "item_number": ("item", "item no", "item number", "no", "#", "nomor"),
+    "style": ("style", "style no", "style number", "article"),
+    "garmen_color": (
+        "garment color", "garment colour", "gmt color", "gmt colour", "garmen color", "body color", "garment",
+    ),
+    "material_color": ("material color", "material colour", "mat color", "mtl color", "color", "colour", "warna"),
+    "job_order": ("job order", "job order no", "jo", "jo no", "job no", "job"),
+    "description": (
+        "description", "item description", "material description", "item material description",
+        "item material", "material", "desc", "deskripsi",
+    ),
+    "consumption_yy_mt": (
+        "consumption", "consumption yy mt", "cons", "cons yy", "yy", "yy mt", "yield", "usage", "kebutuhan",
+    ),
+    "um": ("um", "uom", "unit", "u m", "satuan"),
+    "total": ("total", "grand total", "sub total", "subtotal"),
+}
+
+# Token tunggal yang cukup spesifik untuk dicocokkan sebagai bagian header ("Description 2", "Color Name")
+_STRONG_TOKENS = {
+    "color", "colour", "size", "qty", "quantity", "country", "shipment", "description", "consumption",
+    "style", "uom", "total", "delivery",
+}
+
+_SIZE_RE = re.compile(
+    r"^(?:[2-6]?x{0,4}[sl]|m|xs|os|f|one size|free size|"
+    r"\d{1,3}(?:[tmy]|m)?|\d{1,2} ?[-/] ?\d{1,2}(?: ?[my])?|[2-6]?x{0,3}[sml] ?/ ?[2-6]?x{0,3}[sml])$"
+)
+_DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d.%m.%Y", "%Y/%m/%d", "%d/%m/%y", "%d-%m-%y",
+    "%d-%b-%y", "%d-%b-%Y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y", "%d %b %y",
+)
+
+_SIZE_LABEL = "size:"
+
+
+def parse_page_spec(spec: Optional[str]) -> List[int]:
+    """Halaman format tp_header ("1, 2, 3"), range ("3-5") atau JSON list ("[1,2]")"""
+    if not spec:
+        return []
+    pages = set()
+    for part in str(spec).strip().strip("[]").replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        try:
+            first = int(start)
+            last = int(end) if end else first
+        except ValueError:
+            raise ValueError(f"Format halaman tidak valid: {spec}")
+        if first < 1 or last < first:
+            raise ValueError(f"Format halaman tidak valid: {spec}")
+        pages.update(range(first, last + 1))
+    return sorted(pages)
+
+
+# ---------- Tabel markdown / HTML -> grid numpy ----------
+
+class _HTMLTableParser(HTMLParser):
+    """Kumpulkan <table> sebagai list baris, sel = (teks, rowspan, colspan)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables: List[List[List[Tuple[str, int, int]]]] = []
+        self._open: List[List[List[Tuple[str, int, int]]]] = []
+        self._cell: Optional[List[Any]] = None
+
+    @staticmethod
+    def _span(value: Optional[str]) -> int:
+        try:
+            return max(1, min(int(value), 500))
+        except (TypeError, ValueError):
+            return 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._open.append([])
+        elif not self._open:
+            return
+        elif tag == "tr":
+            self._open[-1].append([])
+        elif tag in ("td", "th"):
+            attrs = dict(attrs)
+            if not self._open[-1]:
+                self._open[-1].append([])
+            self._cell = [[], self._span(attrs.get("rowspan")), self._span(attrs.get("colspan"))]
+        elif tag == "br" and self._cell is not None:
+            self._cell[0].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None and self._open:
+            text, rowspan, colspan = self._cell
+            self._open[-1][-1].append(("".join(text), rowspan, colspan))
+            self._cell = None
+        elif tag == "table" and self._open:
+            self.tables.append(self._open.pop())
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell[0].append(data)
+
+
+def _markdown_tables(text: str) -> List[List[List[Tuple[str, int, int]]]]:
+    tables, current = [], []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+            if all(cell and set(cell) <= set("-: ") for cell in cells):
+                continue  # Baris pemisah |---|
+            current.append([(cell, 1, 1) for cell in cells])
+        elif current:
+            tables.append(current)
+            current = []
+    if current:
+        tables.append(current)
+    return tables
+
+
+def _to_grid(rows: List[List[Tuple[str, int, int]]]) -> np.ndarray:
+    """Sel rowspan/colspan diisi ke semua posisi yang ditutupinya"""
+    cells: Dict[Tuple[int, int], str] = {}
+    for r, row in enumerate(rows):
+        c = 0
+        for text, rowspan, colspan in row:
+            while (r, c) in cells:
+                c += 1
+            for dr in range(rowspan):
+                for dc in range(colspan):
+                    cells[(r + dr, c + dc)] = text
+            c += colspan
+    if not cells:
+        return np.empty((0, 0), dtype=str)
+    n_rows = max(r for r, _ in cells) + 1
+    n_cols = max(c for _, c in cells) + 1
+    grid = np.full((n_rows, n_cols), "", dtype=object)
+    for (r, c), text in cells.items():
+        grid[r, c] = text
+    return _map_unique(grid.astype(str), lambda value: " ".join(value.split())).astype(str)
+
+
+def extract_tables(markdown: str) -> List[np.ndarray]:
+    """Semua tabel (HTML & markdown) di 1 halaman sebagai grid string, minimal 2x2"""
+    parser = _HTMLTableParser()
+    parser.feed(markdown)
+    parser.close()
+    grids = [_to_grid(rows) for rows in parser.tables + _markdown_tables(markdown)]
+    return [grid for grid in grids if grid.shape[0] >= 2 and grid.shape[1] >= 2]
+
+
+# ---------- Operasi kolom ----------
+
+def _map_unique(values: np.ndarray, func: Callable[[str], Any], dtype=object) -> np.ndarray:
+    """func dijalankan sekali per nilai unik lalu disebar kembali ke semua sel"""
+    if values.size == 0:
+        return np.empty(values.shape, dtype=dtype)
+    uniq, inverse = np.unique(values, return_inverse=True)
+    mapped = np.empty(len(uniq), dtype=dtype)
+    mapped[:] = [func(value) for value in uniq]
+    return mapped[inverse].reshape(values.shape)
+
+
+def _forward_fill(column: np.ndarray) -> np.ndarray:
+    """Sel kosong diisi nilai terakhir di atasnya (sel merge yang ditulis kosong oleh OCR)"""
+    filled = column != ""
+    index = np.where(filled, np.arange(len(column)), 0)
+    np.maximum.accumulate(index, out=index)
+    return column[index]
+
+
+def _header_key(text: str) -> str:
+    return " ".join("".join(ch if ch.isalnum() or ch == "#" else " " for ch in text.lower()).split())
+
+
+def _header_matcher(headers: Dict[str, Tuple[str, ...]]) -> Callable[[str], Optional[str]]:
+    exact = {synonym: field for field, synonyms in headers.items() for synonym in synonyms}
+    # Cocok sebagian: sinonim terpanjang didahulukan ("garment color" sebelum "color")
+    partial = sorted(
+        ((frozenset(synonym.split()), field) for synonym, field in exact.items()
+         if len(synonym.split()) > 1 or synonym in _STRONG_TOKENS),
+        key=lambda item: -len(item[0]),
+    )
+
+    def match(text: str) -> Optional[str]:
+        key = _header_key(text)
+        if not key:
+            return None
+        if key in exact:
+            return exact[key]
+        if "size" in headers.get("size_code", ()) and _SIZE_RE.match(key):
+            return _SIZE_LABEL + text.strip().upper()
+        tokens = set(key.split())
+        for synonym_tokens, field in partial:
+            if synonym_tokens <= tokens:
+                return field
+        return None
+
+    return match
+
+
+def _resolve_header(grid: np.ndarray, headers: Dict[str, Tuple[str, ...]]) -> Tuple[np.ndarray, int]:
+    """
+    Label per kolom + index baris data pertama. Header = baris awal (maks 3) pertama yang punya >= 2 sel
+    dikenali. Header bertingkat ("SIZE" colspan di atas "S M L") dilanjutkan baris berikutnya hanya
+    jika baris itu berisi size di bawah group "SIZE", agar baris data (qty 800, size "s") tidak
+    terbaca sebagai header.
+    """
+    head = grid[: min(3, grid.shape[0] - 1)]
+    labels = _map_unique(head, _header_matcher(headers))
+    recognized = labels != None  # noqa: E711 (perbandingan elemen array object)
+    candidates = np.nonzero(recognized.sum(axis=1) >= 2)[0]
+    if len(candidates) == 0:
+        return np.full(grid.shape[1], None, dtype=object), 0
+    first = last = int(candidates[0])
+    column_labels = np.where(recognized[first], labels[first], None)
+    while last + 1 < head.shape[0]:
+        group = column_labels == "size_code"
+        sizes = np.array([isinstance(label, str) and label.startswith(_SIZE_LABEL) for label in labels[last + 1]])
+        # Group "SIZE" selalu colspan >= 2; kolom size tunggal = tabel format panjang (size di baris data)
+        if (group & sizes).sum() < 2:
+            break
+        last += 1
+        column_labels = np.where(recognized[last], labels[last], column_labels)
+    return column_labels, last + 1
+
+
+def _columns(labels: np.ndarray, field: str) -> List[int]:
+    return [int(i) for i in np.nonzero(labels == field)[0]]
+
+
+def _column(data: np.ndarray, labels: np.ndarray, field: str, fill: bool = False) -> Optional[np.ndarray]:
+    index = _columns(labels, field)
+    if not index:
+        return None
+    column = data[:, index[0]]
+    return _forward_fill(column) if fill else column
+
+
+def _total_rows(data: np.ndarray, label_columns: List[int]) -> np.ndarray:
+    """Baris total / subtotal (tidak ikut jadi baris data)"""
+    if not label_columns:
+        return np.zeros(data.shape[0], dtype=bool)
+    lowered = np.char.lower(data[:, label_columns])
+    return (np.char.find(lowered, "total") >= 0).any(axis=1)
+
+
+def _quantity_text(value: str) -> str:
+    # Tetap string (tanpa cast int64): qty hasil OCR bisa sangat panjang / berisi digit non-ASCII ("12²")
+    digits = value.replace(",", "").replace(".", "").replace(" ", "")
+    if not (digits.isascii() and digits.isdecimal()):
+        return ""
+    return digits.lstrip("0")
+
+
+def _quantity_digits(cells: np.ndarray) -> np.ndarray:
+    """Qty -> string digit tanpa pemisah ribuan & nol di depan, "" untuk sel kosong / bukan angka / nol"""
+    return _map_unique(cells, _quantity_text).astype(str)
+
+
+def parse_int(value: str) -> Optional[int]:
+    digits = "".join(ch for ch in value if ch.isascii() and ch.isdecimal())
+    return int(digits) if digits else None
+
+
+def parse_decimal(value: str) -> Optional[float]:
+    """Angka dengan koma / titik desimal ("0,35", "1.234,5", "1,234.5")"""
+    text = "".join(ch for ch in value if ch.isdigit() or ch in ",.-")
+    if not any(ch.isdigit() for ch in text):
+        return None
+    if "," in text and "." in text:
+        thousands = "," if text.rfind(",") < text.rfind(".") else "."
+        text = text.replace(thousands, "")
+    text = text.replace(",", ".")
+    if text.count(".") > 1:
+        head, _, tail = text.rpartition(".")
+        text = head.replace(".", "") + "." + tail
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_date(value: str) -> Optional[str]:
+    """Tanggal berbagai format -> ISO YYYY-MM-DD, None jika tidak dikenali"""
+    text = " ".join(value.replace(",", " ").split())
+    if not text:
+        return None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _none_if_empty(column: Optional[np.ndarray], rows: np.ndarray) -> List[Optional[str]]:
+    if column is None:
+        return [None] * len(rows)
+    return [value or None for value in column[rows].tolist()]
+
+
+# ---------- Parser per schema ----------
+
+def parse_breakdown_table(grid: np.ndarray) -> Optional[List[Dict[str, Any]]]:
+    """Tabel rekap order -> baris tp_breakdown_order_size, None jika bukan tabel rekap"""
+    labels, start = _resolve_header(grid, BREAKDOWN_HEADERS)
+    data = grid[start:]
+    size_columns = [i for i, label in enumerate(labels) if isinstance(label, str) and label.startswith(_SIZE_LABEL)]
+    color = _column(data, labels, "color", fill=True)
+    long_format = _columns(labels, "size_code") and _columns(labels, "quantity")
+    if color is None or data.shape[0] == 0 or not (size_columns or long_format):
+        return None
+
+    country = _column(data, labels, "country_code", fill=True)
+    shipment = _column(data, labels, "shipment_date", fill=True)
+    row_type = "breakdown" if country is not None or shipment is not None else "main"
+    label_columns = [i for i, label in enumerate(labels) if not (isinstance(label, str) and label.startswith(_SIZE_LABEL))]
+    keep = (color != "") & ~_total_rows(data, label_columns)
+
+    if size_columns:
+        # Matriks color x size -> 1 baris per sel qty terisi
+        quantities = _quantity_digits(data[:, size_columns])
+        rows, cols = np.nonzero((quantities != "") & keep[:, None])
+        sizes = np.array([labels[i][len(_SIZE_LABEL):] for i in size_columns], dtype=object)[cols]
+        quantity_values = quantities[rows, cols]
+    else:
+        quantities = _quantity_digits(data[:, _columns(labels, "quantity")[0]])
+        size_column = np.char.upper(data[:, _columns(labels, "size_code")[0]])
+        rows = np.nonzero((quantities != "") & (size_column != "") & keep)[0]
+        sizes = size_column[rows]
+        quantity_values = quantities[rows]
+
+    country_values = _none_if_empty(np.char.upper(country) if country is not None else None, rows)
+    dates = _map_unique(shipment, parse_date) if shipment is not None else None
+    return [
+        {
+            "color": color_value,
+            "size_code": str(size),
+            "quantity": str(quantity),
+            "country_code": country_value,
+            "shipment_date": dates[row] if dates is not None else None,
+            "type": row_type,
+            "status": None,
+        }
+        for row, color_value, size, quantity, country_value in zip(
+            rows.tolist(), color[rows].tolist(), sizes.tolist(), quantity_values.tolist(), country_values
+        )
+    ]
+
+
+def parse_material_table(grid: np.ndarray) -> Optional[List[Dict[str, Any]]]:
+    """Tabel material list -> baris tp_material_list, None jika bukan tabel material"""
+    labels, start = _resolve_header(grid, MATERIAL_HEADERS)
+    data = grid[start:]
+    descriptions = _columns(labels, "description")
+    if not descriptions or data.shape[0] == 0:
+        return None
+    if not (_columns(labels, "consumption_yy_mt") or _columns(labels, "um") or _columns(labels, "item_number")):
+        return None
+
+    description_1 = data[:, descriptions[0]]
+    description_2 = data[:, descriptions[1]] if len(descriptions) > 1 else None
+    label_columns = [i for i, label in enumerate(labels) if label in ("item_number", "description", "total")]
+    rows = np.nonzero((description_1 != "") & ~_total_rows(data, label_columns))[0]
+
+    item_number = _column(data, labels, "item_number")
+    job_order = _column(data, labels, "job_order", fill=True)
+    consumption = _column(data, labels, "consumption_yy_mt")
+    item_values = _map_unique(item_number[rows], parse_int) if item_number is not None else [None] * len(rows)
+    job_values = _map_unique(job_order[rows], parse_int) if job_order is not None else [None] * len(rows)
+    consumption_values = _map_unique(consumption[rows], parse_decimal) if consumption is not None else [None] * len(rows)
+    um = _column(data, labels, "um")
+
+    columns = zip(
+        list(item_values),
+        _none_if_empty(_column(data, labels, "style", fill=True), rows),
+        _none_if_empty(_column(data, labels, "garmen_color", fill=True), rows),
+        _none_if_empty(_column(data, labels, "material_color"), rows),
+        list(job_values),
+        description_1[rows].tolist(),
+        _none_if_empty(description_2, rows),
+        list(consumption_values),
+        _none_if_empty(np.char.upper(um) if um is not None else None, rows),
+    )
+    return [
+        {
+            "item_number": item,
+            "style": style,
+            "garmen_color": garmen_color,
+            "material_color": material_color,
+            "job_order": job,
+            "item_material_description_1": description,
+            "item_material_description_2": description_extra,
+            "consumption_yy_mt": cons,
+            "um": unit,
+            "status": None,
+        }
+        for item, style, garmen_color, material_color, job, description, description_extra, cons, unit in columns
+    ]
+
+
+TABLE_PARSERS = {
+    BREAKDOWN_TABLE: parse_breakdown_table,
+    MATERIAL_TABLE: parse_material_table,
+}
+
+
+def extract_page(markdown: str, table: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Semua baris dari 1 halaman markdown. table=None: setiap tabel dicoba ke semua schema
+    (dipakai benchmark / halaman tanpa section).
+    """
+    result: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLE_PARSERS}
+    targets = [table] if table else list(TABLE_PARSERS)
+    for index, grid in enumerate(extract_tables(markdown)):
+        for name in targets:
+            rows = TABLE_PARSERS[name](grid)
+            if rows is not None:
+                for row in rows:
+                    row["table"] = index
+                result[name].extend(rows)
+                break
+    return result
+
+
+def extract_document(
+    section_texts: Dict[str, Dict[int, str]],
+    section_pages: Dict[str, List[int]],
+    tp_header_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Ekstraksi seluruh section dokumen. section_texts = markdown per section per nomor halaman
+    (section bisa di-OCR dengan setting berbeda, halaman tanpa markdown dilaporkan di missing_pages).
+    Setiap baris diberi tp_header_id & asal (section, page, table).
+    """
+    started = time.monotonic()
+    result: Dict[str, Any] = {
+        BREAKDOWN_TABLE: [],
+        MATERIAL_TABLE: [],
+        "tables": 0,
+        "tables_skipped": 0,
+        "missing_pages": {},
+    }
+    for section, pages in section_pages.items():
+        table = SECTION_TABLES[section]
+        parser = TABLE_PARSERS[table]
+        missing = []
+        page_texts = section_texts.get(section, {})
+        for page in pages:
+            markdown = page_texts.get(page)
+            if markdown is None:
+                missing.append(page)
+                continue
+            for index, grid in enumerate(extract_tables(markdown)):
+                rows = parser(grid)
+                if rows is None:
+                    result["tables_skipped"] += 1
+                    continue
+                result["tables"] += 1
+                source = {"section": section, "page": page, "table": index}
+                result[table].extend(dict(row, tp_header_id=tp_header_id, source=source) for row in rows)
+        if missing:
+            result["missing_pages"][section] = missing
+    result["duration_seconds"] = round(time.monotonic() - started, 4)
+    return result
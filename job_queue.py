@@ -0,0 +1,176 @@
+"""
+Antrian job OCR persisten berbasis SQLite.
+
+Status mengikuti lifecycle tp_header (lihat guid/flow.md):
+    'waiting' -> 'on progress ocr' -> 'on progress analysis' -> 'finish' / 'failed'
+
+Job yang masih 'on progress *' saat service mati dikembalikan ke 'waiting' ketika startup,
+sehingga job tetap jalan setelah restart.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+STATUS_WAITING = "waiting"
+STATUS_OCR = "on progress ocr"
+STATUS_ANALYSIS = "on progress analysis"
+STATUS_FINISH = "finish"
+STATUS_FAILED = "failed"
+
+IN_PROGRESS_STATUSES = (STATUS_OCR, STATUS_ANALYSIS)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+
+# Job yang sudah dicoba sebanyak ini (termasuk crash saat proses) langsung ditandai failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'waiting',
+    filename TEXT,
+    file_path TEXT,
+    base_path TEXT,
+    base_url TEXT,
+    params TEXT,
+    pages_total INTEGER NOT NULL DEFAULT 0,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    page_progress TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobStore:
+    """Akses tabel jobs. Semua method blocking, panggil via run_io dari handler async."""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def _row_to_job(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["page_progress"] = json.loads(job["page_progress"]) if job["page_progress"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, filename: str, file_path: str, base_path: str, base_url: str, params: Dict[str, Any]) -> str:
+        """Simpan job baru dengan status 'waiting', return job id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, file_path, base_path, base_url, params, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_WAITING, filename, file_path, base_path, base_url, json.dumps(params), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Ambil job 'waiting' tertua secara atomik dan ubah statusnya ke 'on progress ocr'"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (STATUS_WAITING,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (STATUS_OCR, time.time(), row["id"]),
+                )
+                job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row_to_job(job)
+
+    def update_progress(self, job_id: str, status: str, pages_total: int, pages_done: int, page_progress: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, pages_total = ?, pages_done = ?, page_progress = ?, updated_at = ? WHERE id = ?",
+                (status, pages_total, pages_done, json.dumps(page_progress), time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (STATUS_FINISH, json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (STATUS_FAILED, error, time.time(), job_id),
+            )
+
+    def recover_interrupted(self) -> List[str]:
+        """
+        Kembalikan job yang terputus (service restart) ke 'waiting'.
+        Job yang sudah mencapai JOB_MAX_ATTEMPTS ditandai 'failed'.
+        """
+        placeholders = ",".join("?" for _ in IN_PROGRESS_STATUSES)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                f"WHERE status IN ({placeholders}) AND attempts >= ?",
+                (STATUS_FAILED, "Job terputus terlalu sering", now, *IN_PROGRESS_STATUSES, JOB_MAX_ATTEMPTS),
+            )
+            rows = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders})", IN_PROGRESS_STATUSES
+            ).fetchall()
+            self._conn.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ? WHERE status IN ({placeholders})",
+                (STATUS_WAITING, now, *IN_PROGRESS_STATUSES),
+            )
+        return [row["id"] for row in rows]
+
+    def active_base_paths(self) -> List[str]:
+        """Folder staging job yang belum selesai (tidak boleh dibersihkan retensi)"""
+        placeholders = ",".join("?" for _ in (STATUS_WAITING, *IN_PROGRESS_STATUSES))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT base_path FROM jobs WHERE status IN ({placeholders}) AND base_path IS NOT NULL",
+                (STATUS_WAITING, *IN_PROGRESS_STATUSES),
+            ).fetchall()
+        return [row["base_path"] for row in rows]
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["total"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,110 @@
+"""
+Launcher deployment: 1 proses model server + N worker HTTP uvicorn.
+
+- HTTP_WORKERS=1 (default) : 1 proses uvicorn yang memuat model sendiri (perilaku lama)
+- HTTP_WORKERS>1           : model_server.py jalan sebagai proses terpisah (model dimuat sekali),
+                             N worker uvicorn untuk upload, rasterisasi & static file terhubung lewat
+                             MODEL_SERVER_SOCKET. Model server yang mati dijalankan ulang otomatis,
+                             worker menyambung lagi pada predict berikutnya.
+
+Setiap launch membuat MODEL_SERVER_AUTHKEY acak dan (jika MODEL_SERVER_SOCKET tidak diset) folder
+runtime privat 0700 untuk socket, keduanya diwariskan ke model server & worker lewat environment.
+
+    HTTP_WORKERS=4 python launcher.py
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+import uvicorn
+
+from job_queue import JobStore
+from log import print_with_time
+
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "1"))
+HTTP_HOST = os.getenv("HTTP_HOST", "0.0.0.0")
+HTTP_PORT = int(os.getenv("HTTP_PORT", "8000"))
+MODEL_SERVER_RESTART_DELAY = 5
+
+
+def recover_jobs():
+    """Kembalikan job yang terputus ke antrian sebelum ada worker yang mengambil job"""
+    store = JobStore()
+    try:
+        recovered = store.recover_interrupted()
+    finally:
+        store.close()
+    if recovered:
+        print_with_time(f"Melanjutkan {len(recovered)} job yang terputus: {recovered}")
+
+
+class ModelServerProcess:
+    """Jalankan model_server.py sebagai subprocess dan jalankan ulang jika mati"""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.process = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        # Socket lama dari proses sebelumnya: worker jangan sampai connect ke sana
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._spawn()
+        threading.Thread(target=self._watch, name="model-server-watch", daemon=True).start()
+
+    def _spawn(self):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_server.py")
+        self.process = subprocess.Popen([sys.executable, script], env=dict(os.environ, MODEL_SERVER_SOCKET=self.socket_path))
+
+    def _watch(self):
+        while not self._stopping.wait(1):
+            code = self.process.poll()
+            if code is None:
+                continue
+            print_with_time(f"Model server berhenti (exit {code}), dijalankan ulang dalam {MODEL_SERVER_RESTART_DELAY} detik")
+            if self._stopping.wait(MODEL_SERVER_RESTART_DELAY):
+                return
+            self._spawn()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def main():
+    if HTTP_WORKERS <= 1:
+        uvicorn.run("app:app", host=HTTP_HOST, port=HTTP_PORT)
+        return
+
+    socket_path = os.getenv("MODEL_SERVER_SOCKET")
+    runtime_dir = None
+    if not socket_path:
+        # Bukan di data/ (bind mount): mkdtemp membuat folder 0700 milik user proses ini
+        runtime_dir = tempfile.mkdtemp(prefix="paddleocr-vl-", dir=os.getenv("XDG_RUNTIME_DIR") or None)
+        socket_path = os.path.join(runtime_dir, "model.sock")
+    # Diwariskan ke worker uvicorn: app.py memakai RemoteScheduler, bukan load model sendiri
+    os.environ["MODEL_SERVER_SOCKET"] = socket_path
+    # Kunci baru setiap launch, tidak pernah ditulis ke disk
+    os.environ["MODEL_SERVER_AUTHKEY"] = os.urandom(32).hex()
+    recover_jobs()
+    model_server = ModelServerProcess(socket_path)
+    model_server.start()
+    try:
+        uvicorn.run("app:app", host=HTTP_HOST, port=HTTP_PORT, workers=HTTP_WORKERS)
+    finally:
+        model_server.stop()
+        if runtime_dir is not None:
+            shutil.rmtree(runtime_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
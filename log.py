@@ -0,0 +1,11 @@
+"""
+Log ke stdout dengan timestamp, dipakai app.py dan modul background (write-behind, model server,
+tracing, retensi) agar format log semua proses sama.
+"""
+from datetime import datetime
+
+
+def print_with_time(message: str):
+    """Helper function untuk print dengan timestamp"""
+    timestamp = datetime.now().strftime("%H:%M")
+    print(f"{timestamp} {message}")
@@ -0,0 +1,70 @@
+"""
+Manifest JSON per dokumen, ditulis di folder dokumen (lihat output_layout.py) sebagai manifest.json.
+
+Manifest dibuat saat parsing dimulai dan ditulis ulang setiap kali 1 halaman selesai, berisi
+path image & markdown tiap halaman, markdown final, sumber hasil (ocr / cache / text_layer),
+status cache, DPI dan timing. Response API dibangun dari manifest ini, bukan dari menebak nama
+file lalu os.path.exists (mahal di share CIFS).
+
+Path artefak relatif terhadap folder dokumen (`document_dir`, relatif terhadap root output),
+sehingga manifest tetap valid setelah folder staging dipublish dengan rename.
+"""
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List
+
+MANIFEST_VERSION = 2
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class DocumentManifest:
+    """Manifest 1 dokumen yang sedang diproses. Method blocking, panggil via run_io."""
+
+    def __init__(
+        self, path: str, document_id: str, document_dir: str, filename: str, source: str,
+        total_pages: int, ocr_pages: List[int],
+    ):
+        self.path = path
+        now = time.time()
+        ocr_page_set = set(ocr_pages)
+        self.data: Dict[str, Any] = {
+            "version": MANIFEST_VERSION,
+            "document_id": document_id,
+            "document_dir": document_dir,
+            "filename": filename,
+            "source": source,
+            "status": "processing",
+            "created_at": now,
+            "updated_at": now,
+            "total_pages": total_pages,
+            "ocr_pages": list(ocr_pages),
+            "markdown": None,
+            "cache": None,
+            "pages": {
+                str(p): {"page": p, "status": "waiting" if p in ocr_page_set else "skipped"}
+                for p in range(1, total_pages + 1)
+            },
+        }
+
+    def update_page(self, page_num: int, **fields):
+        self.data["pages"][str(page_num)].update(fields)
+
+    def write(self):
+        """Tulis atomik (file sementara + rename) agar pembaca tidak pernah melihat JSON setengah jadi"""
+        self.data["updated_at"] = time.time()
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex[:8]}-{os.path.basename(self.path)}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def complete(self, markdown: str, cache: Dict[str, Any]):
+        self.data.update(status="finish", markdown=markdown, cache=cache)
+        self.write()
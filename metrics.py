@@ -0,0 +1,455 @@
+"""
+Metrics format Prometheus (text exposition 0.0.4) tanpa dependency tambahan, dilayani di GET /metrics.
+
+Metrics utama:
+- ocr_stage_seconds{stage}        : histogram durasi per stage (upload, render, encode, predict,
+                                    save_markdown, concatenate, write_markdown, publish, storage_write, ...)
+- ocr_predict_batch_seconds        : durasi 1 panggilan predict model (per micro-batch) + ocr_batch_size
+- ocr_pages_total{source}          : halaman selesai per sumber (ocr / cache / text_layer),
+                                    ocr_pages_per_second = rata-rata METRICS_RATE_WINDOW detik terakhir
+- ocr_cache_requests_total{cache,result} & ocr_cache_hit_ratio{cache}
+- ocr_queue_depth, ocr_requests_in_flight{route}, ocr_model_load_seconds,
+  process_resident_memory_bytes, ocr_gpu_memory_bytes{device,kind}
+
+Observasi cukup time.perf_counter + 1 lock, label di-resolve ke tuple (tanpa format string di jalur panas).
+
+Mode multi-worker (launcher.py): setiap proses menulis snapshot ke METRICS_DIR secara periodik dan
+/metrics menggabungkan (menjumlahkan) snapshot semua proses yang masih hidup, termasuk snapshot
+proses model server yang diambil lewat op `stats`. Counter & histogram proses yang sudah berhenti
+(mati / restart) dipindahkan ke retired.json dan tetap ikut dijumlahkan, jadi total tidak turun.
+"""
+import collections
+import fcntl
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join("data", "metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_RATE_WINDOW = float(os.getenv("METRICS_RATE_WINDOW", "60"))
+
+# Detik, dari encode 1 halaman (ms) sampai dokumen besar (menit)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} butuh label {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return dict(self._values)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(key), value] for key, value in self.samples().items()],
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, labels: Sequence[Any] = ()):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._callback: Optional[Callable[[], Dict[Tuple[Any, ...], float]]] = None
+
+    def set(self, value: float, labels: Sequence[Any] = ()):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, labels: Sequence[Any] = ()):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Sequence[Any] = ()):
+        self.inc(-amount, labels)
+
+    def set_function(self, callback: Callable[[], Dict[Tuple[Any, ...], float]]):
+        """Nilai dihitung saat scrape: callback return {tuple label: nilai}"""
+        self._callback = callback
+
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        if self._callback is None:
+            return super().samples()
+        try:
+            values = self._callback()
+        except Exception:
+            values = {}
+        return {self._key(labels): float(value) for labels, value in values.items() if value is not None}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Sequence[Any] = ()):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [count per bucket (non-kumulatif, + bucket +Inf), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, labels: Sequence[Any] = ()) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, labels)
+
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {key: [list(state[0]), state[1], state[2]] for key, state in self._values.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(super().snapshot(), buckets=list(self.buckets))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State semua metric dalam bentuk JSON (untuk digabung lintas proses)"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("ocr_stage_seconds", "Durasi per stage parsing (detik)", ["stage"])
+DOCUMENT_SECONDS = REGISTRY.histogram("ocr_document_seconds", "Durasi parsing 1 dokumen dari render sampai publish (detik)")
+REQUEST_SECONDS = REGISTRY.histogram("ocr_request_seconds", "Durasi request HTTP sampai response dimulai (detik)", ["route"])
+REQUESTS_IN_FLIGHT = REGISTRY.gauge("ocr_requests_in_flight", "Request HTTP yang sedang diproses", ["route"])
+PREDICT_BATCH_SECONDS = REGISTRY.histogram("ocr_predict_batch_seconds", "Durasi 1 panggilan predict model per micro-batch (detik)")
+BATCH_SIZE = REGISTRY.histogram("ocr_batch_size", "Jumlah halaman per micro-batch predict", buckets=BATCH_BUCKETS)
+PAGES = REGISTRY.counter("ocr_pages_total", "Halaman selesai diproses per sumber", ["source"])
+PAGES_PER_SECOND = REGISTRY.gauge("ocr_pages_per_second", "Rata-rata halaman per detik selama METRICS_RATE_WINDOW terakhir")
+CACHE_REQUESTS = REGISTRY.counter("ocr_cache_requests_total", "Lookup cache OCR halaman / dedup dokumen", ["cache", "result"])
+QUEUE_DEPTH = REGISTRY.gauge("ocr_queue_depth", "Halaman yang menunggu di antrian scheduler predict")
+JOBS = REGISTRY.gauge("ocr_jobs", "Job antrian per status", ["status"])
+MODEL_LOAD_SECONDS = REGISTRY.gauge("ocr_model_load_seconds", "Waktu load model PaddleOCR-VL (detik)")
+RSS_BYTES = REGISTRY.gauge("process_resident_memory_bytes", "RSS proses (byte)")
+PEAK_RSS_BYTES = REGISTRY.gauge("process_peak_resident_memory_bytes", "RSS tertinggi proses (byte)")
+GPU_MEMORY_BYTES = REGISTRY.gauge("ocr_gpu_memory_bytes", "Memori GPU yang dipakai paddle (byte)", ["device", "kind"])
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Timer 1 stage: `with stage_timer("render"): ...`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, (stage,))
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, (stage,))
+
+
+_page_times: "collections.deque[float]" = collections.deque()
+_page_times_lock = threading.Lock()
+
+
+def record_page(source: str):
+    """1 halaman selesai (ocr / cache / text_layer)"""
+    PAGES.inc(1, (source,))
+    now = time.monotonic()
+    with _page_times_lock:
+        _page_times.append(now)
+        _trim_page_times(now)
+
+
+def _trim_page_times(now: float):
+    while _page_times and _page_times[0] < now - METRICS_RATE_WINDOW:
+        _page_times.popleft()
+
+
+def _pages_per_second() -> Dict[Tuple[Any, ...], float]:
+    now = time.monotonic()
+    with _page_times_lock:
+        _trim_page_times(now)
+        return {(): len(_page_times) / METRICS_RATE_WINDOW}
+
+
+def _process_rss() -> Dict[Tuple[Any, ...], float]:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return {(): int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")}
+    except (OSError, ValueError, IndexError):
+        return {}
+
+
+def _peak_rss() -> Dict[Tuple[Any, ...], float]:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: byte
+    return {(): peak if sys.platform == "darwin" else peak * 1024}
+
+
+def _gpu_memory() -> Dict[Tuple[Any, ...], float]:
+    """Hanya proses yang sudah memuat paddle (proses pemilik model), tanpa import paddle di worker HTTP"""
+    paddle = sys.modules.get("paddle")
+    if paddle is None:
+        return {}
+    try:
+        if not paddle.device.is_compiled_with_cuda():
+            return {}
+        values = {}
+        for device in range(paddle.device.cuda.device_count()):
+            values[(str(device), "allocated")] = paddle.device.cuda.memory_allocated(device)
+            values[(str(device), "reserved")] = paddle.device.cuda.memory_reserved(device)
+        return values
+    except Exception:
+        return {}
+
+
+PAGES_PER_SECOND.set_function(_pages_per_second)
+RSS_BYTES.set_function(_process_rss)
+PEAK_RSS_BYTES.set_function(_peak_rss)
+GPU_MEMORY_BYTES.set_function(_gpu_memory)
+
+
+# ---------- Gabung snapshot lintas proses & render ----------
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Jumlahkan snapshot beberapa proses (counter, gauge & histogram per label)"""
+    merged: Dict[str, Any] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if metric["type"] != "histogram":
+                    target["samples"][key] = (current or 0.0) + value
+                elif current is None:
+                    target["samples"][key] = [list(value[0]), value[1], value[2]]
+                elif len(current[0]) == len(value[0]):
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+    for metric in merged.values():
+        metric["samples"] = [[list(key), value] for key, value in metric["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _cache_hit_ratio(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """ocr_cache_hit_ratio dihitung dari counter yang sudah digabung"""
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in (tuple(s) for s in snapshot.get("ocr_cache_requests_total", {}).get("samples", [])):
+        hits_total = totals.setdefault(cache, [0.0, 0.0])
+        hits_total[0] += value if result == "hit" else 0.0
+        hits_total[1] += value
+    return {
+        "type": "gauge",
+        "help": "Porsi lookup cache yang hit sejak proses start",
+        "labelnames": ["cache"],
+        "samples": [[[cache], hits / total] for cache, (hits, total) in totals.items() if total],
+    }
+
+
+def render_metrics(snapshot: Dict[str, Any]) -> str:
+    """Snapshot (hasil REGISTRY.snapshot / merge_snapshots) -> text exposition Prometheus"""
+    snapshot = dict(snapshot, ocr_cache_hit_ratio=_cache_hit_ratio(snapshot))
+    lines = []
+    for name, metric in snapshot.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for labels, value in metric["samples"]:
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(names, labels, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(names, labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Snapshot file per proses (mode multi-worker) ----------
+
+RETIRED_SNAPSHOT = "retired.json"
+
+
+def _snapshot_path(metrics_dir: str, pid: int) -> str:
+    return os.path.join(metrics_dir, f"worker-{pid}.json")
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cumulative(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Hanya counter & histogram; gauge (in-flight, RSS, queue) milik proses mati tidak berlaku lagi"""
+    return {name: metric for name, metric in snapshot.items() if metric.get("type") != "gauge"}
+
+
+def _retire(metrics_dir: str, paths: List[str], final: Optional[Dict[str, Any]] = None):
+    """
+    Tambahkan snapshot proses yang sudah berhenti ke retired.json lalu hapus file snapshot-nya.
+    Dikunci flock: beberapa worker bisa menemukan proses mati yang sama bersamaan.
+    """
+    os.makedirs(metrics_dir, exist_ok=True)
+    retired_path = os.path.join(metrics_dir, RETIRED_SNAPSHOT)
+    with open(os.path.join(metrics_dir, ".retired.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        snapshots = [_read_json(retired_path) or {}]
+        # File yang sudah hilang = sudah dipindahkan worker lain
+        existing = [path for path in paths if os.path.exists(path)]
+        if final is not None:
+            # State terakhir proses ini menggantikan file snapshot-nya (jangan dijumlahkan 2 kali)
+            snapshots.append(_cumulative(final))
+        else:
+            snapshots.extend(_cumulative(_read_json(path) or {}) for path in existing)
+        if len(snapshots) > 1:
+            _write_json(retired_path, merge_snapshots(snapshots))
+        for path in existing:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def write_snapshot(metrics_dir: str = METRICS_DIR):
+    """Tulis snapshot proses ini secara atomik (blocking, jalankan via run_io)"""
+    os.makedirs(metrics_dir, exist_ok=True)
+    _write_json(_snapshot_path(metrics_dir, os.getpid()), REGISTRY.snapshot())
+
+
+def retire_snapshot(metrics_dir: str = METRICS_DIR):
+    """Saat proses berhenti: state terakhir dipindahkan ke retired.json (blocking)"""
+    _retire(metrics_dir, [_snapshot_path(metrics_dir, os.getpid())], final=REGISTRY.snapshot())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_peer_snapshots(metrics_dir: str = METRICS_DIR) -> List[Dict[str, Any]]:
+    """Snapshot proses lain yang masih hidup + retired.json (proses mati dipindahkan ke sana dulu)"""
+    snapshots = []
+    dead = []
+    try:
+        names = os.listdir(metrics_dir)
+    except OSError:
+        return snapshots
+    for name in names:
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        try:
+            pid = int(name[len("worker-"):-len(".json")])
+        except ValueError:
+            continue
+        path = os.path.join(metrics_dir, name)
+        if pid == os.getpid():
+            continue
+        if not _pid_alive(pid):
+            dead.append(path)
+            continue
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    if dead:
+        _retire(metrics_dir, dead)
+    retired = _read_json(os.path.join(metrics_dir, RETIRED_SNAPSHOT))
+    if retired:
+        snapshots.append(retired)
+    return snapshots
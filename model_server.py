@@ -0,0 +1,410 @@
+"""
+Proses model terpisah untuk deployment multi-worker.
+
+Tanpa ini setiap worker uvicorn memuat PaddleOCRVL sendiri (GPU memory habis), jadi service hanya
+bisa jalan 1 worker. Dengan MODEL_SERVER_SOCKET:
+
+- model_server.py    : 1 proses pemilik model, memakai BatchScheduler yang sama seperti mode 1 proses,
+                       jadi halaman dari semua worker digabung ke micro-batch yang sama
+- app.py (N worker)  : upload, rasterisasi, encode JPEG, static file & job. Predict dikirim ke model
+                       server lewat Unix socket (multiprocessing.connection), lihat RemoteScheduler
+
+Protokol: tiap worker membuka 1 koneksi, pesan (request_id, op, payload) dijawab (request_id, ok, result)
+tanpa harus berurutan, sehingga banyak halaman dari 1 worker bisa in-flight sekaligus.
+Op: predict, cancel, concatenate, stats.
+
+Result PaddleOCRVL tidak dikirim apa adanya: model server menjalankan save_to_markdown ke folder
+sementara lalu mengirim markdown + isi file-nya (RemoteResult), worker menulis ulang file yang sama.
+
+Keamanan: multiprocessing.connection meng-unpickle setiap pesan, jadi siapa pun yang bisa membuka
+socket dan tahu authkey bisa menjalankan kode di proses ini. Karena itu MODEL_SERVER_AUTHKEY tidak
+punya default (launcher.py membuat kunci acak setiap launch) dan socket diletakkan di folder privat
+0700 di luar data/ (bind mount), file socket sendiri 0600.
+
+Biasanya dijalankan oleh launcher.py (HTTP_WORKERS > 1), atau manual:
+
+    export MODEL_SERVER_AUTHKEY=$(python -c "import os; print(os.urandom(32).hex())")
+    export MODEL_SERVER_SOCKET=$(mktemp -d)/model.sock
+    python model_server.py &
+    uvicorn app:app --workers 4
+"""
+import asyncio
+import itertools
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import AuthenticationError, Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional
+
+from batching import BatchScheduler
+from executor import io_executor
+from log import print_with_time
+from metrics import MODEL_LOAD_SECONDS, QUEUE_DEPTH, REGISTRY
+
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+# Wajib diset (tanpa default), dibuat acak oleh launcher.py: lihat docstring modul
+MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY", "").encode()
+MODEL_SERVER_AUTHKEY_MIN_LENGTH = 32
+# Worker menunggu model server selesai load model saat startup
+MODEL_SERVER_CONNECT_TIMEOUT = float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "900"))
+# Model server mati & dijalankan ulang launcher (restart delay + load model): request menunggu selama ini
+MODEL_SERVER_RECONNECT_TIMEOUT = float(os.getenv("MODEL_SERVER_RECONNECT_TIMEOUT", "300"))
+# Backoff percobaan connect: mulai 0.1 detik, dikali 2 sampai maksimal ini
+MODEL_SERVER_RETRY_MAX_DELAY = 5.0
+# Thread untuk save_to_markdown hasil predict di model server (di luar thread pemilik model)
+MODEL_SERVER_IO_WORKERS = int(os.getenv("MODEL_SERVER_IO_WORKERS", "4"))
+
+_STOP = object()
+
+
+def load_pipeline():
+    from paddleocr import PaddleOCRVL
+    return PaddleOCRVL()
+
+
+def check_authkey(authkey: bytes) -> bytes:
+    if len(authkey) < MODEL_SERVER_AUTHKEY_MIN_LENGTH:
+        raise ValueError(
+            f"MODEL_SERVER_AUTHKEY belum diset / terlalu pendek (minimal {MODEL_SERVER_AUTHKEY_MIN_LENGTH} karakter), "
+            "jalankan lewat launcher.py atau isi dengan kunci acak"
+        )
+    return authkey
+
+
+class RemoteError(Exception):
+    """Error dari model server (exception asli belum tentu bisa di-pickle)"""
+
+
+class RemoteResult:
+    """Pengganti result PaddleOCRVL yang bisa di-pickle: res.markdown + file hasil save_to_markdown"""
+
+    def __init__(self, markdown: Any, files: Dict[str, bytes]):
+        self.markdown = markdown
+        self.files = files
+
+    @classmethod
+    def from_result(cls, res: Any) -> "RemoteResult":
+        tmp_dir = tempfile.mkdtemp(prefix="model-server-")
+        try:
+            res.save_to_markdown(save_path=tmp_dir)
+            files = {}
+            for root, _, names in os.walk(tmp_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        files[os.path.relpath(path, tmp_dir)] = f.read()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return cls(res.markdown, files)
+
+    def save_to_markdown(self, save_path: str):
+        for rel_path, data in self.files.items():
+            path = os.path.join(save_path, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+
+class ModelServer:
+    """Proses pemilik model: terima predict dari worker HTTP lewat Unix socket"""
+
+    def __init__(
+        self,
+        address: str = MODEL_SERVER_SOCKET,
+        authkey: bytes = MODEL_SERVER_AUTHKEY,
+        pipeline_loader: Callable[[], Any] = load_pipeline,
+    ):
+        self.address = address
+        self.authkey = check_authkey(authkey)
+        self.pipeline_loader = pipeline_loader
+        self.pipeline = None
+        self.model_load_seconds: Optional[float] = None
+        self.scheduler = BatchScheduler(self.get_pipeline)
+        self.io_executor = ThreadPoolExecutor(max_workers=MODEL_SERVER_IO_WORKERS, thread_name_prefix="model-server-io")
+        # Diubah dari thread per koneksi
+        self.connections = 0
+        self._connections_lock = threading.Lock()
+        QUEUE_DEPTH.set_function(lambda: {(): self.scheduler.queue_depth()})
+
+    def get_pipeline(self):
+        """Dipanggil di thread scheduler (pemilik model)"""
+        if self.pipeline is None:
+            started = time.monotonic()
+            self.pipeline = self.pipeline_loader()
+            self.model_load_seconds = round(time.monotonic() - started, 3)
+            MODEL_LOAD_SECONDS.set(self.model_load_seconds)
+        return self.pipeline
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self.scheduler.stats,
+            queue_depth=self.scheduler.queue_depth(),
+            connections=self._connection_count(),
+            model_load_seconds=self.model_load_seconds,
+        )
+
+    def _connection_count(self, delta: int = 0) -> int:
+        with self._connections_lock:
+            self.connections += delta
+            return self.connections
+
+    def serve_forever(self):
+        self.scheduler.start()
+        print_with_time("Model server: load model...")
+        # Socket baru dibuka setelah model siap, worker yang connect lebih awal menunggu
+        self.scheduler.submit_call(self.get_pipeline).result()
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        if os.path.dirname(self.address):
+            os.makedirs(os.path.dirname(self.address), mode=0o700, exist_ok=True)
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            os.chmod(self.address, 0o600)
+            print_with_time(f"Model server siap di {self.address} (load model {self.model_load_seconds} detik)")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError, EOFError) as e:
+                    print_with_time(f"Model server: koneksi ditolak: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), name="model-server-conn", daemon=True).start()
+
+    def _serve_connection(self, conn: Connection):
+        self._connection_count(1)
+        send_lock = threading.Lock()
+        # Future scheduler yang masih berjalan, agar bisa dibatalkan worker (client disconnect)
+        pending: Dict[int, Future] = {}
+
+        def reply(request_id: int, ok: bool, result: Any):
+            pending.pop(request_id, None)
+            with send_lock:
+                try:
+                    conn.send((request_id, ok, result))
+                except (OSError, EOFError, ValueError):
+                    pass  # Worker sudah putus
+
+        try:
+            while True:
+                try:
+                    request_id, op, payload = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    self._dispatch(request_id, op, payload, pending, reply)
+                except Exception as e:
+                    reply(request_id, False, RemoteError(f"{type(e).__name__}: {e}"))
+        finally:
+            # Worker mati: halaman yang belum diproses tidak perlu di-OCR lagi
+            for future in list(pending.values()):
+                future.cancel()
+            conn.close()
+            self._connection_count(-1)
+
+    def _dispatch(self, request_id: int, op: str, payload: Any, pending: Dict[int, Future], reply: Callable):
+        if op == "predict":
+            inp, kwargs = payload
+            future = self.scheduler.submit(inp, **kwargs)
+            pending[request_id] = future
+            future.add_done_callback(
+                lambda f: self.io_executor.submit(self._reply_predict, request_id, f, reply)
+            )
+        elif op == "cancel":
+            future = pending.get(payload)
+            if future is not None:
+                future.cancel()
+        elif op == "concatenate":
+            future = self.scheduler.submit_call(lambda: self.get_pipeline().concatenate_markdown_pages(payload))
+            pending[request_id] = future
+            future.add_done_callback(lambda f: self._reply_future(request_id, f, reply, lambda result: result))
+        elif op == "stats":
+            # Snapshot metrics proses model (predict, batch, GPU) digabung /metrics di worker HTTP
+            reply(request_id, True, dict(self.stats(), metrics=REGISTRY.snapshot()))
+        else:
+            raise ValueError(f"Operasi model server tidak dikenal: {op}")
+
+    def _reply_predict(self, request_id: int, future: Future, reply: Callable):
+        self._reply_future(request_id, future, reply, lambda output: [RemoteResult.from_result(res) for res in output])
+
+    @staticmethod
+    def _reply_future(request_id: int, future: Future, reply: Callable, convert: Callable[[Any], Any]):
+        if future.cancelled():
+            reply(request_id, False, RemoteError("Dibatalkan"))
+            return
+        try:
+            reply(request_id, True, convert(future.result()))
+        except BaseException as e:
+            reply(request_id, False, RemoteError(f"{type(e).__name__}: {e}"))
+
+
+class RemoteScheduler:
+    """
+    Pengganti BatchScheduler di worker HTTP: predict dijalankan model server.
+    Pengiriman lewat thread sender agar pickle + tulis input (numpy array halaman) tidak memblok event loop.
+    """
+
+    def __init__(self, address: str = MODEL_SERVER_SOCKET, authkey: bytes = MODEL_SERVER_AUTHKEY):
+        self.address = address
+        self.authkey = check_authkey(authkey)
+        self._conn: Optional[Connection] = None
+        # Antrian kirim milik koneksi aktif (diganti setiap reconnect)
+        self._outbox: "queue.Queue[Any]" = queue.Queue()
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        # Reconnect yang sedang berjalan di io_executor (dipakai bersama request yang datang bersamaan)
+        self._reconnecting: Optional[Future] = None
+        # Diset stop(): percobaan connect yang sedang menunggu langsung berhenti
+        self._stopped = threading.Event()
+        self.stats = {"requests": 0, "reconnects": 0}
+
+    def connect(self, timeout: float = MODEL_SERVER_CONNECT_TIMEOUT):
+        """Hubungkan ke model server, tunggu sampai server siap (blocking, panggil via run_io)"""
+        deadline = time.monotonic() + timeout
+        delay = 0.1
+        while True:
+            try:
+                conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopped.wait(min(delay, remaining)):
+                    raise ConnectionError(f"Model server {self.address} tidak bisa dihubungi")
+                delay = min(delay * 2, MODEL_SERVER_RETRY_MAX_DELAY)
+        outbox: "queue.Queue[Any]" = queue.Queue()
+        with self._lock:
+            self._conn, self._outbox = conn, outbox
+        threading.Thread(target=self._receive_loop, args=(conn,), name="model-client-recv", daemon=True).start()
+        threading.Thread(target=self._send_loop, args=(conn, outbox), name="model-client-send", daemon=True).start()
+
+    def start(self):
+        """Kompatibel dengan BatchScheduler, koneksi dibuka lewat connect()"""
+        self._stopped.clear()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        self._stopped.set()
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            self._outbox.put(_STOP)
+            conn.close()
+
+    def submit(self, inp: Any, **predict_kwargs) -> Future:
+        """Masukkan 1 input ke antrian model server, Future berisi list RemoteResult"""
+        return self._request("predict", (inp, predict_kwargs), cancellable=True)
+
+    def concatenate_markdown_pages(self, markdown_list: List[Any]) -> Future:
+        return self._request("concatenate", markdown_list)
+
+    def remote_stats(self) -> Future:
+        return self._request("stats", None)
+
+    async def predict(self, inp: Any, **predict_kwargs) -> List[Any]:
+        return await asyncio.wrap_future(self.submit(inp, **predict_kwargs))
+
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def _reconnect(self) -> Future:
+        """
+        Sambung ulang di io_executor (Client() + handshake authkey tidak boleh di event loop), dengan backoff
+        sampai MODEL_SERVER_RECONNECT_TIMEOUT selama launcher menjalankan ulang model server
+        """
+        with self._lock:
+            if self._reconnecting is None:
+                self.stats["reconnects"] += 1
+                self._reconnecting = io_executor.submit(self.connect, MODEL_SERVER_RECONNECT_TIMEOUT)
+                self._reconnecting.add_done_callback(self._reconnect_done)
+            return self._reconnecting
+
+    def _reconnect_done(self, reconnecting: Future):
+        with self._lock:
+            if self._reconnecting is reconnecting:
+                self._reconnecting = None
+
+    def _request(self, op: str, payload: Any, cancellable: bool = False) -> Future:
+        future: Future = Future()
+        if self._conn is None:
+            # Model server dijalankan ulang (launcher): request dikirim setelah tersambung lagi
+            def send_when_connected(reconnecting: Future):
+                error = reconnecting.exception()
+                if future.cancelled():
+                    return
+                if error is None:
+                    self._enqueue(future, op, payload, cancellable)
+                elif future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+
+            self._reconnect().add_done_callback(send_when_connected)
+            return future
+        self._enqueue(future, op, payload, cancellable)
+        return future
+
+    def _enqueue(self, future: Future, op: str, payload: Any, cancellable: bool):
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            outbox = self._outbox
+        self.stats["requests"] += 1
+        if cancellable:
+            future.add_done_callback(lambda f: f.cancelled() and outbox.put((None, "cancel", request_id)))
+        outbox.put((request_id, op, payload))
+
+    def _send_loop(self, conn: Connection, outbox: "queue.Queue[Any]"):
+        while True:
+            message = outbox.get()
+            if message is _STOP:
+                return
+            request_id = message[0]
+            future = self._pending.get(request_id) if request_id is not None else None
+            if future is not None and future.cancelled():
+                # Dibatalkan sebelum sempat dikirim
+                self._pending.pop(request_id, None)
+                continue
+            try:
+                conn.send(message)
+            except (OSError, EOFError, ValueError) as e:
+                self._fail_pending(conn, ConnectionError(f"Model server terputus: {e}"))
+                return
+
+    def _receive_loop(self, conn: Connection):
+        while True:
+            try:
+                request_id, ok, result = conn.recv()
+            except Exception as e:
+                self._fail_pending(conn, ConnectionError(f"Model server terputus: {e}"))
+                conn.close()
+                return
+            future = self._pending.pop(request_id, None)
+            if future is None or future.done():
+                continue
+            try:
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+            except Exception:
+                pass  # Dibatalkan pemanggil bersamaan dengan datangnya hasil
+
+    def _fail_pending(self, conn: Connection, error: Exception):
+        with self._lock:
+            if self._conn is not conn:
+                return
+            self._conn = None
+            pending, self._pending = self._pending, {}
+            self._outbox.put(_STOP)
+        for future in pending.values():
+            if not future.done():
+                try:
+                    future.set_exception(error)
+                except Exception:
+                    pass
+
+if __name__ == "__main__":
+    if not MODEL_SERVER_SOCKET:
+        raise SystemExit("MODEL_SERVER_SOCKET belum diset")
+    # Lewat import agar RemoteResult/RemoteError di-pickle sebagai model_server.*, bukan __main__.*
+    import model_server
+    model_server.ModelServer().serve_forever()
@@ -0,0 +1,312 @@
+"""
+Cache hasil OCR berbasis hash konten (content-addressed) di disk lokal.
+
+PageCache: cache per halaman.
+
+Key = sha256(hash image halaman hasil render + DPI + identitas model [+ parameter tambahan]).
+Setiap entry menyimpan:
+- markdown.pkl : res.markdown hasil PaddleOCRVL (dipakai concatenate_markdown_pages)
+- page.md      : file markdown halaman hasil save_to_markdown
+- files/       : artefak lain dari save_to_markdown (gambar di dalam markdown)
+
+Eviction LRU berdasarkan waktu akses terakhir (mtime entry) dengan batas total ukuran.
+Simpan cache di disk lokal (bukan share CIFS) agar lookup tetap murah.
+
+OCR_CACHE_DIR dipakai bersama semua worker HTTP (launcher.py HTTP_WORKERS>1): lookup & put
+langsung ke disk, eviction hanya oleh 1 proses (evict=True, worker primary pemegang flock).
+Index LRU worker primary disinkronkan ulang dari disk setiap OCR_CACHE_SYNC_SECONDS, sehingga
+entry tulisan worker lain ikut dihitung terhadap OCR_CACHE_MAX_MB.
+
+DocumentCache: dedup upload yang identik (byte sama + seleksi halaman sama) tanpa render & OCR.
+"""
+import collections
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join("data", "ocr_cache"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_MB", "2048")) * 1024 * 1024
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "1") == "1"
+OCR_CACHE_SYNC_SECONDS = float(os.getenv("OCR_CACHE_SYNC_SECONDS", "60"))
+# Folder .tmp- yang lebih tua dari ini dianggap sisa penulisan gagal (bukan put yang sedang berjalan)
+STALE_TMP_SECONDS = 3600
+
+MODEL_ID = os.getenv("OCR_MODEL_ID", "PaddleOCR-VL")
+
+
+def hash_image(img) -> str:
+    """Hash pixel hasil render (tidak terpengaruh setting encoder JPEG)"""
+    h = hashlib.sha256()
+    h.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash isi file (untuk upload image yang langsung di-OCR tanpa render)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class PageCache:
+    """
+    Cache OCR per halaman, LRU dengan batas ukuran di disk. Method blocking, panggil via run_io.
+    evict=False: worker lain yang memakai folder cache yang sama, hanya baca & tulis entry.
+    """
+
+    def __init__(
+        self, cache_dir: str = OCR_CACHE_DIR, max_bytes: int = OCR_CACHE_MAX_BYTES, model_id: str = MODEL_ID,
+        evict: bool = True,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.model_id = model_id
+        self.evict = evict
+        self._lock = threading.Lock()
+        # key -> ukuran entry, urutan = LRU (paling lama diakses di depan). Hanya dipakai jika evict=True.
+        self._entries: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+        self._total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        if evict:
+            self.sync()
+
+    def sync(self):
+        """
+        Bangun ulang index LRU dari disk (termasuk entry tulisan worker lain, urut mtime = akses
+        terakhir) lalu evict sampai <= max_bytes. Entry tidak berubah setelah ditulis, jadi ukuran
+        entry yang sudah dikenal tidak dihitung ulang.
+        """
+        # Snapshot di bawah lock: get/put/_evict thread lain bisa mengubah index selama scan
+        with self._lock:
+            known = dict(self._entries)
+        entries = []
+        now = time.time()
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir) or prefix.startswith("."):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    mtime = os.path.getmtime(entry_dir)
+                except OSError:
+                    continue
+                if key.startswith(".") or not os.path.exists(os.path.join(entry_dir, "markdown.pkl")):
+                    # Sisa penulisan yang gagal (put worker lain yang masih berjalan dibiarkan)
+                    if now - mtime > STALE_TMP_SECONDS:
+                        shutil.rmtree(entry_dir, ignore_errors=True)
+                    continue
+                size = known[key] if key in known else _dir_size(entry_dir)
+                entries.append((mtime, key, size))
+        entries.sort()
+        with self._lock:
+            index = collections.OrderedDict((key, size) for _, key, size in entries)
+            # Entry yang di-put selama scan (belum terlihat listdir) tetap dihitung, sebagai yang terbaru
+            for key, size in self._entries.items():
+                if key not in known and key not in index:
+                    index[key] = size
+            self._entries = index
+            self._total_bytes = sum(index.values())
+        self._evict()
+
+    def make_key(self, image_digest: str, dpi: Any, extra: Optional[Dict[str, Any]] = None) -> str:
+        parts = [image_digest, str(dpi), self.model_id]
+        if extra:
+            parts.extend(f"{k}={extra[k]!r}" for k in sorted(extra))
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str, markdown_pages_dir: str, page_stem: str) -> Optional[Tuple[Any, List[str]]]:
+        """
+        Cache hit: salin artefak ke markdown_pages_dir sebagai {page_stem}.md,
+        return (res.markdown, path file yang disalin).
+        Cache miss: return None.
+        """
+        entry_dir = self._entry_dir(key)
+        # Cek ke disk, bukan index: entry bisa ditulis worker lain
+        if not os.path.exists(os.path.join(entry_dir, "markdown.pkl")):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            with open(os.path.join(entry_dir, "markdown.pkl"), "rb") as f:
+                markdown = pickle.load(f)
+            os.makedirs(markdown_pages_dir, exist_ok=True)
+            files = []
+            page_md = os.path.join(entry_dir, "page.md")
+            if os.path.exists(page_md):
+                files.append(os.path.join(markdown_pages_dir, f"{page_stem}.md"))
+                shutil.copyfile(page_md, files[-1])
+            files_dir = os.path.join(entry_dir, "files")
+            if os.path.isdir(files_dir):
+                shutil.copytree(files_dir, markdown_pages_dir, dirs_exist_ok=True)
+                for root, _, names in os.walk(files_dir):
+                    files.extend(
+                        os.path.join(markdown_pages_dir, os.path.relpath(os.path.join(root, name), files_dir))
+                        for name in names
+                    )
+            now = time.time()
+            os.utime(entry_dir, (now, now))
+        except Exception:
+            # Entry rusak / terhapus dari luar: anggap miss
+            self._drop(key)
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self.stats["hits"] += 1
+        return markdown, files
+
+    def put(self, key: str, markdown: Any, markdown_pages_dir: str, page_stem: str):
+        """Simpan res.markdown + artefak save_to_markdown halaman ini ke cache"""
+        final_dir = self._entry_dir(key)
+        if os.path.exists(final_dir):
+            return
+        tmp_dir = os.path.join(self.cache_dir, key[:2], f".tmp-{key}-{uuid.uuid4().hex[:8]}")
+        try:
+            os.makedirs(tmp_dir)
+            with open(os.path.join(tmp_dir, "markdown.pkl"), "wb") as f:
+                pickle.dump(markdown, f, protocol=pickle.HIGHEST_PROTOCOL)
+            page_md = os.path.join(markdown_pages_dir, f"{page_stem}.md")
+            if os.path.exists(page_md):
+                shutil.copyfile(page_md, os.path.join(tmp_dir, "page.md"))
+            images = markdown.get("markdown_images") if isinstance(markdown, dict) else None
+            for rel_path in (images or {}):
+                src = os.path.join(markdown_pages_dir, rel_path)
+                if os.path.isfile(src):
+                    dst = os.path.join(tmp_dir, "files", rel_path)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    shutil.copyfile(src, dst)
+            size = _dir_size(tmp_dir)
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            # Entry yang sama ditulis request lain / disk penuh: cache bersifat best-effort
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        if not self.evict:
+            return
+        with self._lock:
+            if key not in self._entries:
+                self._total_bytes += size
+            self._entries[key] = size
+        self._evict()
+
+    def _drop(self, key: str):
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._total_bytes -= size
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _evict(self):
+        """Hapus entry yang paling lama tidak diakses sampai total ukuran <= max_bytes"""
+        if not self.evict:
+            return
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+DOC_CACHE_DIR = os.getenv("DOC_CACHE_DIR", os.path.join("data", "doc_cache"))
+
+
+def normalize_pages_param(pages: Optional[str]) -> str:
+    """Normalisasi field `pages` agar "[3,2]" dan "[2, 3]" menghasilkan key yang sama"""
+    if not pages:
+        return "all"
+    try:
+        pages_list = json.loads(pages)
+    except Exception:
+        return "all"
+    if not isinstance(pages_list, list):
+        return "all"
+    selected = sorted({p for p in pages_list if isinstance(p, int)})
+    return ",".join(str(p) for p in selected) if selected else "all"
+
+
+def document_key(file_digest: str, pages: Optional[str], options: Dict[str, Any], model_id: str = MODEL_ID) -> str:
+    """Key isi dokumen: sha256 file upload + seleksi halaman + opsi render + model"""
+    parts = [file_digest, normalize_pages_param(pages), model_id]
+    parts.extend(f"{k}={options[k]!r}" for k in sorted(options))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+class DocumentCache:
+    """
+    Dedup upload utuh: key = sha256 file upload + seleksi halaman + opsi render + model.
+    Value = data response yang sudah pernah dihasilkan (URL disimpan beserta base_url-nya).
+    Method blocking, panggil via run_io.
+    """
+
+    def __init__(self, cache_dir: str = DOC_CACHE_DIR, model_id: str = MODEL_ID):
+        self.cache_dir = cache_dir
+        self.model_id = model_id
+        self.stats = {"hits": 0, "misses": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, file_digest: str, pages: Optional[str], options: Dict[str, Any]) -> str:
+        return document_key(file_digest, pages, options, self.model_id)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str, is_valid: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """Return {"base_url", "data"} atau None. is_valid dipakai untuk cek file output masih ada."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        if is_valid is not None and not is_valid(entry):
+            # Output sudah dihapus (retensi / manual), proses ulang
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: str, base_url: str, data: Dict[str, Any]):
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"base_url": base_url, "data": data, "created_at": time.time()}, f)
+        os.replace(tmp_path, self._path(key))
@@ -0,0 +1,104 @@
+"""
+Layout folder output per dokumen + publish atomik.
+
+Setiap dokumen punya folder sendiri, jadi upload dengan nama file yang sama tidak saling menimpa:
+
+- document (default) : YYYY/YYYY.MM.DD/{document_id}/   document_id = YYYYMMDD-uuid4hex
+- content            : objects/{key[:2]}/{key}/         key = sha256 isi upload + seleksi halaman + opsi + model
+                       (content-addressed: upload & opsi identik selalu menuju folder yang sama)
+
+Isi folder: pdf/ (upload PDF), image/ (upload image & image halaman), markdown_pages/,
+{stem}.md (markdown final), manifest.json.
+
+Folder dirakit di folder staging `.tmp-...` di parent yang sama lalu dipublish dengan 1 os.rename:
+pembaca tidak pernah melihat dokumen setengah jadi, dan dokumen yang gagal cukup dibuang dengan
+1 rmtree. Folder staging tidak ikut direplikasi (path .tmp- dilewati write-behind).
+"""
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+OUTPUT_LAYOUTS = {"document", "content"}
+OUTPUT_LAYOUT = os.getenv("OUTPUT_LAYOUT", "document")
+CONTENT_ROOT = "objects"
+MANIFEST_FILENAME = "manifest.json"
+
+_DATED_ID_RE = re.compile(r"^(\d{4})(\d{2})(\d{2})-[0-9a-f]{32}$")
+_CONTENT_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def new_document_id(content_key: str, layout: Optional[str] = None, now: Optional[datetime] = None) -> str:
+    """Id dokumen baru: content_key (layout content) atau YYYYMMDD-uuid (layout document)"""
+    if (layout or OUTPUT_LAYOUT) == "content":
+        return content_key
+    return f"{(now or datetime.now()):%Y%m%d}-{uuid.uuid4().hex}"
+
+
+def document_dir_rel(document_id: str) -> Optional[str]:
+    """Folder dokumen relatif terhadap root output, None jika format id tidak valid"""
+    match = _DATED_ID_RE.match(document_id or "")
+    if match is not None:
+        year, month, day = match.groups()
+        return f"{year}/{year}.{month}.{day}/{document_id}"
+    if _CONTENT_ID_RE.match(document_id or ""):
+        return f"{CONTENT_ROOT}/{document_id[:2]}/{document_id}"
+    return None
+
+
+def manifest_rel_path(document_id: str) -> Optional[str]:
+    doc_dir = document_dir_rel(document_id)
+    return f"{doc_dir}/{MANIFEST_FILENAME}" if doc_dir else None
+
+
+def split_document_key(key: str) -> Optional[Tuple[str, str]]:
+    """Key storage -> (folder dokumen, path relatif di dalamnya), None jika bukan bagian folder dokumen"""
+    parts = key.split("/")
+    if len(parts) > 3 and document_dir_rel(parts[2]) == "/".join(parts[:3]):
+        return "/".join(parts[:3]), "/".join(parts[3:])
+    return None
+
+
+def staging_dir(root: str, document_id: str) -> str:
+    """
+    Folder staging untuk merakit dokumen. Layout document: nama tetap (.tmp-{id}) agar manifest
+    dokumen yang sedang diproses bisa dibaca. Layout content: diberi suffix acak karena beberapa
+    request identik bisa merakit dokumen yang sama bersamaan.
+    """
+    parent, name = os.path.split(os.path.join(root, document_dir_rel(document_id)))
+    suffix = "" if _DATED_ID_RE.match(document_id) else f"-{uuid.uuid4().hex[:8]}"
+    return os.path.join(parent, f".tmp-{name}{suffix}")
+
+
+def publish_dir(staging_path: str, final_path: str) -> bool:
+    """
+    Rename atomik folder staging ke folder final.
+    False jika folder final sudah ada (dokumen identik sudah dipublish request lain).
+    """
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    if os.path.exists(final_path):
+        return False
+    try:
+        os.rename(staging_path, final_path)
+    except OSError:
+        # Kalah balapan dengan request lain yang publish lebih dulu
+        if os.path.exists(final_path):
+            return False
+        raise
+    return True
+
+
+def discard_dir(path: str):
+    """Buang folder staging (dokumen gagal / kalah publish) dalam 1 operasi"""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def document_files(path: str) -> List[str]:
+    """Semua file di folder dokumen, manifest.json paling akhir (direplikasi setelah artefaknya)"""
+    files = []
+    for root, _, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names)
+    manifest_path = os.path.join(path, MANIFEST_FILENAME)
+    return sorted(files, key=lambda file_path: (file_path == manifest_path, file_path))
@@ -0,0 +1,225 @@
+"""
+Pipeline per dokumen: render -> encode -> dispatch OCR, dengan antrian terbatas antar stage.
+
+Poppler merender halaman N+1 sementara halaman N di-encode dan halaman N-1 diproses model,
+sehingga waktu total mendekati stage paling lambat, bukan jumlah semua stage.
+Antrian antar stage dibatasi (queue_size) dan jumlah halaman yang sedang di-OCR dibatasi
+(max_inflight), jadi hanya beberapa halaman yang ada di memori pada satu waktu.
+
+Batas memori (MemoryBudget)
+---------------------------
+Setiap halaman punya perkiraan biaya memori (`page_cost`, untuk PIL RGB = lebar_px * tinggi_px * 3,
+A4 300 DPI ~ 25 MB). Stage render harus `acquire` biaya halaman dari semua budget (per request &
+global proses) sebelum merender. Biaya halaman non-OCR dilepas setelah di-encode, biaya halaman
+OCR dilepas setelah hasilnya selesai dikonsumsi (array halaman ikut dikirim ke model).
+`encoded` hanya menyimpan metadata halaman (tanpa "input"), jadi melepas budget juga melepas memorinya.
+Halaman yang lebih besar dari budget tetap boleh diproses, tetapi sendirian.
+
+Jaminan peak RSS untuk image halaman hasil render (di luar model & runtime Python):
+- per request : <= max(budget request, 1 halaman terbesar)
+- per proses  : <= max(budget global, 1 halaman terbesar)
+tidak tergantung jumlah halaman dokumen maupun jumlah upload yang berjalan bersamaan.
+
+Hasil OCR dikonsumsi lewat `results()` sesuai urutan halaman:
+
+    pipeline = PagePipeline(render_pages, ocr_pages, render, encode, dispatch)
+    pipeline.start()
+    try:
+        async for page_num, handle in pipeline.results():
+            ...  # await hasil OCR halaman ini, simpan markdown
+    finally:
+        await pipeline.aclose()
+"""
+import asyncio
+import collections
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+PIPELINE_MAX_INFLIGHT = int(os.getenv("PIPELINE_MAX_INFLIGHT", "4"))
+
+# Budget memori image halaman hasil render (lihat docstring modul)
+RASTER_MEMORY_BUDGET = int(os.getenv("RASTER_MEMORY_BUDGET_MB", "256")) * 1024 * 1024
+RASTER_GLOBAL_MEMORY_BUDGET = int(os.getenv("RASTER_GLOBAL_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024
+
+_DONE = object()
+
+
+class MemoryBudget:
+    """Semaphore berbasis byte. acquire() menunggu sampai cukup sisa budget, release() bersifat sync."""
+
+    def __init__(self, limit_bytes: int):
+        self.limit = max(1, limit_bytes)
+        self.used = 0
+        self._waiters: collections.deque = collections.deque()
+
+    async def acquire(self, nbytes: int) -> int:
+        """Ambil budget, return jumlah byte yang benar-benar dicatat (dibatasi limit)"""
+        nbytes = min(max(0, nbytes), self.limit)
+        while self.used + nbytes > self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.used += nbytes
+        return nbytes
+
+    def release(self, nbytes: int):
+        self.used = max(0, self.used - nbytes)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+# Dibagi semua request dalam 1 proses, agar upload yang bersamaan tidak OOM
+global_raster_budget = MemoryBudget(RASTER_GLOBAL_MEMORY_BUDGET)
+
+
+def _without_input(encoded: Any) -> Any:
+    if isinstance(encoded, dict) and "input" in encoded:
+        return {key: value for key, value in encoded.items() if key != "input"}
+    return encoded
+
+
+class PagePipeline:
+    """Stage render, encode, dispatch berjalan sebagai task asyncio yang dihubungkan asyncio.Queue"""
+
+    def __init__(
+        self,
+        render_pages: List[int],
+        ocr_pages: List[int],
+        render: Callable[[int], Awaitable[Any]],
+        encode: Callable[[int, Any], Awaitable[Any]],
+        dispatch: Callable[[int, Any], Awaitable[Any]],
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        max_inflight: int = PIPELINE_MAX_INFLIGHT,
+        page_cost: Optional[Callable[[int], int]] = None,
+        budgets: Optional[List[MemoryBudget]] = None,
+    ):
+        self.render_pages = list(render_pages)
+        self.ocr_pages = list(ocr_pages)
+        self.render = render
+        self.encode = encode
+        self.dispatch = dispatch
+        # Metadata hasil encode semua halaman yang dirender (termasuk halaman non-OCR), {page_num: encoded}.
+        # Key "input" (array halaman untuk model) tidak disimpan: hanya boleh hidup selama budget dipegang.
+        self.encoded: Dict[int, Any] = {}
+        self._ocr_page_set = set(ocr_pages)
+        self._render_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self._encode_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self._inflight = asyncio.Semaphore(max(1, max_inflight))
+        self._slots: Dict[int, asyncio.Future] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._error: Optional[BaseException] = None
+        self.page_cost = page_cost
+        self.budgets = budgets or []
+        # Budget yang sedang dipegang per halaman: {page_num: [(budget, nbytes), ...]}
+        self._held: Dict[int, List[Tuple[MemoryBudget, int]]] = {}
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._slots = {page_num: loop.create_future() for page_num in self.ocr_pages}
+        self._tasks = [
+            asyncio.create_task(self._guard(self._render_stage())),
+            asyncio.create_task(self._guard(self._encode_stage())),
+            asyncio.create_task(self._guard(self._dispatch_stage())),
+        ]
+
+    async def _guard(self, stage: Awaitable[None]):
+        """Error di salah satu stage diteruskan ke semua halaman yang belum selesai"""
+        try:
+            await stage
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            for slot in self._slots.values():
+                if not slot.done():
+                    slot.set_exception(e)
+            for task in self._tasks:
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+    async def _acquire_budget(self, page_num: int):
+        if self.page_cost is None or not self.budgets:
+            return
+        cost = self.page_cost(page_num)
+        held = self._held.setdefault(page_num, [])
+        for budget in self.budgets:
+            held.append((budget, await budget.acquire(cost)))
+
+    def _release_budget(self, page_num: int):
+        for budget, nbytes in self._held.pop(page_num, []):
+            budget.release(nbytes)
+
+    async def _render_stage(self):
+        for page_num in self.render_pages:
+            await self._acquire_budget(page_num)
+            image = await self.render(page_num)
+            await self._render_q.put((page_num, image))
+        await self._render_q.put(_DONE)
+
+    async def _encode_stage(self):
+        while True:
+            item = await self._render_q.get()
+            if item is _DONE:
+                break
+            page_num, image = item
+            encoded = await self.encode(page_num, image)
+            # Lepas referensi image secepatnya agar memori tidak menumpuk
+            del image, item
+            self.encoded[page_num] = _without_input(encoded)
+            if page_num in self._ocr_page_set:
+                await self._encode_q.put((page_num, encoded))
+            else:
+                self._release_budget(page_num)
+            del encoded
+        await self._encode_q.put(_DONE)
+
+    async def _dispatch_stage(self):
+        while True:
+            item = await self._encode_q.get()
+            if item is _DONE:
+                break
+            page_num, encoded = item
+            # Batasi jumlah halaman yang sedang di-OCR / menunggu dikonsumsi
+            await self._inflight.acquire()
+            handle = await self.dispatch(page_num, encoded)
+            del encoded, item
+            self._slots[page_num].set_result(handle)
+
+    async def results(self) -> AsyncIterator[Tuple[int, Any]]:
+        """Yield (page_num, handle dispatch) sesuai urutan ocr_pages"""
+        for page_num in self.ocr_pages:
+            handle = await self._slots[page_num]
+            try:
+                yield page_num, handle
+            finally:
+                self._inflight.release()
+                self._release_budget(page_num)
+
+    async def wait_finished(self):
+        """Tunggu semua stage selesai (halaman non-OCR mode full ikut selesai di-encode)"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._error is not None:
+            raise self._error
+
+    async def aclose(self):
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Budget global jangan sampai bocor saat request batal / error
+        for page_num in list(self._held):
+            self._release_budget(page_num)
+        for slot in self._slots.values():
+            if not slot.done():
+                slot.cancel()
+            elif not slot.cancelled():
+                # Hindari warning "exception was never retrieved"
+                slot.exception()
@@ -0,0 +1,196 @@
+"""
+Routing halaman per section dalam 1 request (workflow tp_header).
+
+Field `sections` berisi JSON map nama section -> halaman, atau objek dengan setting OCR sendiri:
+
+    {
+        "rekap_order_page": {"pages": "1-2", "dpi": 200, "prompt_label": "table"},
+        "material_fabric_page": [3, 4],
+        "material_pack_page": "5"
+    }
+
+Field halaman tp_header (rekap_order_page, material_*_page, format "1, 2, 3") juga diterima
+sebagai form field biasa dan digabung ke map yang sama.
+
+Satu halaman hanya dirender 1 kali walaupun dipakai beberapa section: DPI tetap terbesar yang
+diminta section-nya, atau DPI request jika tidak ada section yang meminta. OCR dijalankan 1 kali
+per kombinasi parameter predict yang berbeda (varian), section dengan parameter sama berbagi
+hasil OCR halaman yang sama.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from dpi_policy import parse_dpi_param
+from extraction import SECTION_TABLES, parse_page_spec
+
+# Parameter PaddleOCRVL.predict yang boleh diatur per section
+PREDICT_OPTIONS = {"prompt_label": str, "use_layout_detection": bool}
+PROMPT_LABELS = ("ocr", "table", "chart", "formula")
+# Field form tp_header yang otomatis menjadi section
+SECTION_FIELDS = tuple(SECTION_TABLES)
+
+_SECTION_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Section:
+    """1 section request: halaman (1-based), DPI tetap (None = ikut DPI request) & parameter predict"""
+
+    __slots__ = ("name", "pages", "dpi", "predict")
+
+    def __init__(self, name: str, pages: List[int], dpi: Optional[int] = None, predict: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.pages = pages
+        self.dpi = dpi
+        self.predict = predict or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Format yang sama dengan input field `sections` (dipakai params job & response)"""
+        return dict(self.predict, pages=list(self.pages), dpi=self.dpi)
+
+
+def _parse_pages(name: str, value: Any) -> List[int]:
+    if isinstance(value, list):
+        if not all(isinstance(p, int) and not isinstance(p, bool) and p >= 1 for p in value):
+            raise ValueError(f"Halaman section {name} tidak valid: {value}")
+        return sorted(set(value))
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        return parse_page_spec(str(value))
+    raise ValueError(f"Halaman section {name} tidak valid: {value}")
+
+
+def _parse_section(name: str, value: Any) -> Section:
+    if not _SECTION_NAME_RE.match(name):
+        raise ValueError(f"Nama section tidak valid: {name}")
+    if not isinstance(value, dict):
+        value = {"pages": value}
+    unknown = set(value) - {"pages", "dpi"} - set(PREDICT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Opsi section {name} tidak dikenal: {', '.join(sorted(unknown))}")
+
+    pages = _parse_pages(name, value.get("pages"))
+    if not pages:
+        raise ValueError(f"Section {name} tidak punya halaman")
+    dpi = None
+    if value.get("dpi") is not None:
+        # "auto" = adaptif, sama dengan tidak mengisi dpi section
+        dpi = parse_dpi_param(str(value["dpi"])) if str(value["dpi"]).strip() else None
+
+    predict = {}
+    for option, kind in PREDICT_OPTIONS.items():
+        if value.get(option) is None:
+            continue
+        if not isinstance(value[option], kind):
+            raise ValueError(f"Opsi {option} section {name} harus {kind.__name__}")
+        predict[option] = value[option]
+    if "prompt_label" in predict:
+        if predict["prompt_label"] not in PROMPT_LABELS:
+            raise ValueError(f"prompt_label harus salah satu dari: {', '.join(PROMPT_LABELS)}")
+        # PaddleOCR-VL hanya memakai prompt_label jika layout detection dimatikan
+        predict.setdefault("use_layout_detection", False)
+    return Section(name, pages, dpi, predict)
+
+
+def parse_sections(
+    raw: Optional[Union[str, Dict[str, Any]]],
+    fields: Optional[Dict[str, Optional[str]]] = None,
+) -> Dict[str, Section]:
+    """
+    Field `sections` (JSON string / dict) + field halaman tp_header -> {nama: Section}.
+    Section di JSON menang atas field form dengan nama yang sama. ValueError jika invalid.
+    """
+    data: Dict[str, Any] = {}
+    if isinstance(raw, str) and raw.strip():
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            raise ValueError("Field sections harus JSON object {nama_section: halaman}")
+    elif isinstance(raw, dict):
+        data = raw
+    if not isinstance(data, dict):
+        raise ValueError("Field sections harus JSON object {nama_section: halaman}")
+
+    sections = {name: _parse_section(name, value) for name, value in data.items()}
+    for name, spec in (fields or {}).items():
+        if name not in sections and spec and str(spec).strip():
+            sections[name] = _parse_section(name, spec)
+    return sections
+
+
+def sections_key(sections: Dict[str, Section]) -> Optional[List[Any]]:
+    """Bentuk stabil map section untuk key dedup dokumen (None jika tanpa section)"""
+    if not sections:
+        return None
+    return [[name, sections[name].to_dict()] for name in sorted(sections)]
+
+
+def _variant_key(predict: Dict[str, Any]) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in predict.items()))
+
+
+class PagePlan:
+    """Rencana 1 halaman: DPI render & varian OCR (parameter predict), varian 0 = markdown utama halaman"""
+
+    __slots__ = ("page", "dpi", "variants", "sections")
+
+    def __init__(self, page: int, dpi: Optional[int]):
+        self.page = page
+        self.dpi = dpi
+        self.variants: List[Dict[str, Any]] = []
+        # nama section -> index varian
+        self.sections: Dict[str, int] = {}
+
+    def add(self, section: Section) -> int:
+        key = _variant_key(section.predict)
+        for index, predict in enumerate(self.variants):
+            if _variant_key(predict) == key:
+                break
+        else:
+            self.variants.append(dict(section.predict))
+            index = len(self.variants) - 1
+        self.sections[section.name] = index
+        return index
+
+
+class SectionPlan:
+    """Gabungan semua section 1 dokumen: halaman unik yang di-OCR beserta rencana per halaman"""
+
+    def __init__(self, sections: Dict[str, Section], total_pages: int, default_dpi: Optional[int]):
+        self.sections = sections
+        self.pages: Dict[int, PagePlan] = {}
+        # Halaman section yang tersedia di dokumen / di luar jumlah halaman
+        self.section_pages: Dict[str, List[int]] = {}
+        self.skipped_pages: Dict[str, List[int]] = {}
+
+        for name, section in sections.items():
+            self.section_pages[name] = [p for p in section.pages if p <= total_pages]
+            skipped = [p for p in section.pages if p > total_pages]
+            if skipped:
+                self.skipped_pages[name] = skipped
+            for page in self.section_pages[name]:
+                self.pages.setdefault(page, PagePlan(page, None)).add(section)
+
+        for page, plan in self.pages.items():
+            requested = [
+                sections[name].dpi for name in plan.sections if sections[name].dpi is not None
+            ]
+            plan.dpi = max(requested) if requested else default_dpi
+
+    @property
+    def ocr_pages(self) -> List[int]:
+        return sorted(self.pages)
+
+    def variants(self, page: int) -> List[Dict[str, Any]]:
+        plan = self.pages.get(page)
+        return plan.variants if plan is not None else [{}]
+
+    def page_dpi(self, page: int, default_dpi: Optional[int]) -> Optional[int]:
+        plan = self.pages.get(page)
+        return plan.dpi if plan is not None else default_dpi
+
+    def sections_of(self, page: int) -> List[str]:
+        plan = self.pages.get(page)
+        return list(plan.sections) if plan is not None else []
+
+    def variant_of(self, section: str, page: int) -> int:
+        return self.pages[page].sections[section]
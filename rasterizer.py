@@ -0,0 +1,267 @@
+"""
+Backend rasterisasi PDF yang bisa dipilih global (env RASTERIZER) atau per request (form `rasterizer`).
+
+- poppler : pdf2image -> subprocess pdftoppm, data PPM/JPEG dikirim balik lewat pipe / file
+- pymupdf : render in-process dengan PyMuPDF (tanpa fork subprocess), murah untuk halaman tertentu
+
+Semua backend punya interface yang sama:
+    page_count(pdf_path) -> int
+    page_sizes(pdf_path) -> {page_num: (lebar_pt, tinggi_pt)}
+    render_page(pdf_path, page_num, dpi) -> PIL image RGB
+    render_page_to_file(pdf_path, page_num, dpi, output_dir, output_name, quality) -> path JPEG
+
+extract_embedded_page_image() mendeteksi halaman scan (1 JPEG memenuhi halaman) agar JPEG aslinya
+langsung dipakai untuk OCR & arsip tanpa render 300 DPI dan kompresi lossy kedua kali.
+"""
+import io
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pypdf import PdfReader
+
+DEFAULT_RASTERIZER = os.getenv("RASTERIZER", "poppler")
+
+
+def group_page_ranges(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """Gabungkan halaman berurutan jadi range (first, last) agar poppler dipanggil seminimal mungkin"""
+    ranges = []
+    for page_num in sorted(page_numbers):
+        if ranges and page_num == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], page_num)
+        else:
+            ranges.append((page_num, page_num))
+    return ranges
+
+
+class Rasterizer(ABC):
+    """Interface backend rasterisasi (backend yang belum lengkap gagal saat dibuat, bukan di tengah request)"""
+
+    name = "base"
+
+    @abstractmethod
+    def page_count(self, pdf_path: str) -> int:
+        ...
+
+    @abstractmethod
+    def page_sizes(self, pdf_path: str) -> Dict[int, Tuple[float, float]]:
+        ...
+
+    @abstractmethod
+    def render_page(self, pdf_path: str, page_num: int, dpi: int):
+        ...
+
+    @abstractmethod
+    def render_page_to_file(self, pdf_path: str, page_num: int, dpi: int, output_dir: str, output_name: str, quality: int = 75) -> str:
+        ...
+
+    def render_pages(self, pdf_path: str, page_numbers: List[int], dpi: int) -> Iterator[Tuple[int, Image.Image]]:
+        """Render beberapa halaman satu per satu, yield (page_num, PIL image)"""
+        for page_num in page_numbers:
+            yield page_num, self.render_page(pdf_path, page_num, dpi)
+
+
+class PopplerRasterizer(Rasterizer):
+    """Render lewat pdf2image / pdftoppm (butuh poppler-utils)"""
+
+    name = "poppler"
+
+    def __init__(self, thread_count: int = 4):
+        self.thread_count = thread_count
+
+    def page_count(self, pdf_path: str) -> int:
+        """Baca jumlah halaman PDF tanpa render (pypdf, fallback ke pdfinfo)"""
+        try:
+            return len(PdfReader(pdf_path).pages)
+        except Exception:
+            return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+    def page_sizes(self, pdf_path: str) -> Dict[int, Tuple[float, float]]:
+        """Ukuran halaman PDF dalam point (1/72 inch) per nomor halaman, kosong jika gagal dibaca"""
+        try:
+            sizes = {}
+            for page_num, page in enumerate(PdfReader(pdf_path).pages, start=1):
+                box = page.mediabox
+                sizes[page_num] = (float(box.width), float(box.height))
+            return sizes
+        except Exception:
+            return {}
+
+    def render_pages(self, pdf_path: str, page_numbers: List[int], dpi: int) -> Iterator[Tuple[int, Image.Image]]:
+        for first, last in group_page_ranges(page_numbers):
+            images = convert_from_path(
+                pdf_path, dpi=dpi, fmt="jpeg", thread_count=self.thread_count, first_page=first, last_page=last
+            )
+            for offset, img in enumerate(images):
+                yield first + offset, img
+
+    def render_page(self, pdf_path: str, page_num: int, dpi: int):
+        for _, img in self.render_pages(pdf_path, [page_num], dpi):
+            return img
+        raise Exception(f"Halaman {page_num} tidak dapat dirender")
+
+    def render_page_to_file(self, pdf_path: str, page_num: int, dpi: int, output_dir: str, output_name: str, quality: int = 75) -> str:
+        """pdftoppm menulis JPEG langsung ke output_dir (output_folder + paths_only)"""
+        paths = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_num,
+            last_page=page_num,
+            fmt="jpeg",
+            jpegopt={"quality": quality, "progressive": False, "optimize": True},
+            output_folder=output_dir,
+            output_file=output_name,
+            single_file=True,
+            paths_only=True,
+        )
+        if not paths:
+            raise Exception(f"Halaman {page_num} tidak dapat dirender")
+        return paths[0]
+
+
+class PyMuPDFRasterizer(Rasterizer):
+    """Render in-process dengan PyMuPDF, tanpa subprocess & tanpa pipe PPM"""
+
+    name = "pymupdf"
+
+    def __init__(self):
+        # Import di sini agar backend poppler tetap jalan walaupun pymupdf tidak terpasang
+        import pymupdf
+        self._pymupdf = pymupdf
+
+    def _open(self, pdf_path: str):
+        # Document PyMuPDF tidak thread-safe, buka per pemanggilan (murah, tanpa parse semua halaman)
+        return self._pymupdf.open(pdf_path)
+
+    def page_count(self, pdf_path: str) -> int:
+        with self._open(pdf_path) as doc:
+            return doc.page_count
+
+    def page_sizes(self, pdf_path: str) -> Dict[int, Tuple[float, float]]:
+        try:
+            with self._open(pdf_path) as doc:
+                return {i + 1: (page.rect.width, page.rect.height) for i, page in enumerate(doc)}
+        except Exception:
+            return {}
+
+    def _pixmap(self, doc, page_num: int, dpi: int):
+        if page_num < 1 or page_num > doc.page_count:
+            raise Exception(f"Halaman {page_num} tidak dapat dirender")
+        return doc[page_num - 1].get_pixmap(dpi=dpi, alpha=False)
+
+    def render_page(self, pdf_path: str, page_num: int, dpi: int):
+        with self._open(pdf_path) as doc:
+            pix = self._pixmap(doc, page_num, dpi)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    def render_page_to_file(self, pdf_path: str, page_num: int, dpi: int, output_dir: str, output_name: str, quality: int = 75) -> str:
+        output_path = os.path.join(output_dir, f"{output_name}.jpg")
+        with self._open(pdf_path) as doc:
+            pix = self._pixmap(doc, page_num, dpi)
+            pix.set_dpi(dpi, dpi)
+            pix.save(output_path, output="jpg", jpg_quality=quality)
+        return output_path
+
+
+# Halaman hasil scan (1 JPEG memenuhi halaman) dipakai langsung tanpa render ulang
+SCANNED_PAGE_REUSE = os.getenv("SCANNED_PAGE_REUSE", "1") == "1"
+# Minimal porsi luas halaman yang tertutup image agar dianggap halaman scan
+SCANNED_PAGE_MIN_COVERAGE = float(os.getenv("SCANNED_PAGE_MIN_COVERAGE", "0.95"))
+# Image dengan DPI efektif lebih dari target * (1 + toleransi) di-downsample ke target DPI
+SCANNED_PAGE_DPI_TOLERANCE = float(os.getenv("SCANNED_PAGE_DPI_TOLERANCE", "0.5"))
+
+
+class EmbeddedPageImage:
+    """
+    Image asli halaman scan.
+    - data  : byte JPEG asli dari stream PDF (tidak di-decode / encode ulang), None jika di-resample
+    - image : PIL image hasil resample ke target DPI, None jika data asli dipakai apa adanya
+    """
+
+    __slots__ = ("data", "image", "width", "height", "dpi")
+
+    def __init__(self, data: Optional[bytes], image, width: int, height: int, dpi: int):
+        self.data = data
+        self.image = image
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+
+
+def extract_embedded_page_image(pdf_path: str, page_num: int, target_dpi: int) -> Optional[EmbeddedPageImage]:
+    """
+    Deteksi halaman yang isinya hanya 1 image raster (output scanner) lalu ambil JPEG aslinya.
+    Return None jika bukan halaman scan / format tidak didukung, pemanggil kembali ke render biasa.
+    Butuh PyMuPDF, tanpa PyMuPDF selalu None.
+    """
+    try:
+        import pymupdf
+    except ImportError:
+        return None
+
+    with pymupdf.open(pdf_path) as doc:
+        if page_num < 1 or page_num > doc.page_count:
+            return None
+        page = doc[page_num - 1]
+        if page.rotation:
+            return None
+        images = page.get_images(full=True)
+        if len(images) != 1:
+            return None
+        xref, smask = images[0][0], images[0][1]
+        if smask:
+            return None
+        rects = page.get_image_rects(xref)
+        if len(rects) != 1:
+            return None
+        page_rect = page.rect
+        covered = rects[0] & page_rect
+        if page_rect.is_empty or covered.is_empty:
+            return None
+        if (covered.width * covered.height) / (page_rect.width * page_rect.height) < SCANNED_PAGE_MIN_COVERAGE:
+            return None
+        # Anotasi / vektor di atas scan (stempel, coretan digital) hanya terlihat jika halaman dirender
+        if page.first_annot is not None or page.get_drawings():
+            return None
+
+        info = doc.extract_image(xref)
+        if not info or info.get("ext") not in ("jpeg", "jpg") or info.get("colorspace") not in (1, 3):
+            return None
+        width, height = info["width"], info["height"]
+        rect = rects[0]
+        # Image yang diputar / dicerminkan di halaman: rasio harus sama dengan area tampilnya
+        if abs((width / height) - (rect.width / rect.height)) > 0.02 * (rect.width / rect.height):
+            return None
+        data = info["image"]
+
+    dpi = int(round(width / (rect.width / 72.0)))
+    if dpi <= target_dpi * (1 + SCANNED_PAGE_DPI_TOLERANCE):
+        # DPI rendah tidak di-upsample: tidak menambah detail, model melakukan resize sendiri
+        return EmbeddedPageImage(data, None, width, height, dpi)
+
+    scale = target_dpi / dpi
+    with Image.open(io.BytesIO(data)) as src:
+        resized = src.convert("RGB").resize(
+            (max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS
+        )
+    return EmbeddedPageImage(None, resized, resized.width, resized.height, target_dpi)
+
+
+RASTERIZER_BACKENDS = {
+    PopplerRasterizer.name: PopplerRasterizer,
+    PyMuPDFRasterizer.name: PyMuPDFRasterizer,
+}
+
+_instances: Dict[str, Rasterizer] = {}
+
+
+def get_rasterizer(name: Optional[str] = None) -> Rasterizer:
+    """Ambil backend rasterisasi berdasarkan nama (default: env RASTERIZER)"""
+    name = (name or DEFAULT_RASTERIZER).lower()
+    if name not in RASTERIZER_BACKENDS:
+        raise ValueError(f"Rasterizer tidak dikenal: {name}. Gunakan: {', '.join(RASTERIZER_BACKENDS)}")
+    if name not in _instances:
+        _instances[name] = RASTERIZER_BACKENDS[name]()
+    return _instances[name]
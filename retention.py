@@ -0,0 +1,450 @@
+"""
+Retensi & compaction tree output (OUTPUT_DIR lokal / object storage).
+
+Tanpa retensi setiap upload menyimpan PDF asli, semua JPEG halaman dan markdown selamanya.
+Policy (env, 0 = mati):
+
+- RETENTION_IMAGE_DAYS    : image halaman (image/*_page_N.jpg) & thumbnail/ dokumen yang lebih tua
+                            dari N hari dihapus, markdown tetap. Di manifest, halaman PDF beralih ke
+                            thumbnail lazy (dirender ulang dari PDF asli saat URL diakses).
+- RETENTION_SOURCE_DAYS   : file upload asli dihapus setelah N hari
+- RETENTION_DOCUMENT_DAYS : seluruh dokumen dihapus setelah N hari
+- RETENTION_MAX_GB        : batas total ukuran; dokumen yang paling lama tidak diakses dihapus
+                            lebih dulu (LRU, waktu akses = max(atime, mtime) file dokumen)
+- RETENTION_STAGING_HOURS : folder staging .tmp- yang ditinggal proses crash dihapus setelah N jam
+                            (default 24), kecuali milik job yang masih antri
+
+Unit retensi = folder dokumen (lihat output_layout.py). Output layout lama (sebelum folder per
+dokumen) diperlakukan sebagai 1 unit per folder tanggal. Dokumen dihapus mulai dari manifest.json,
+jadi dedup & endpoint manifest langsung menganggap dokumen sudah tidak ada. Dokumen yang berubah
+dalam RETENTION_MIN_AGE_HOURS terakhir tidak disentuh (bisa jadi masih direplikasi write-behind).
+
+Compaction: folder kosong (sisa sweep scratch / retensi) dihapus agar listing folder tetap kecil,
+sehingga lookup StaticFiles & backup tetap cepat.
+
+Jalan sebagai background task di app (RETENTION_INTERVAL_MINUTES) dan sebagai CLI:
+
+    python retention.py --dry-run
+    python retention.py --image-days 30 --max-gb 500 --json
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from log import print_with_time
+from output_layout import MANIFEST_FILENAME, split_document_key
+from storage import StorageBackend, StoredObject
+
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL_MINUTES", "60")) * 60
+RETENTION_IMAGE_DAYS = float(os.getenv("RETENTION_IMAGE_DAYS", "0"))
+RETENTION_SOURCE_DAYS = float(os.getenv("RETENTION_SOURCE_DAYS", "0"))
+RETENTION_DOCUMENT_DAYS = float(os.getenv("RETENTION_DOCUMENT_DAYS", "0"))
+RETENTION_MAX_BYTES = int(float(os.getenv("RETENTION_MAX_GB", "0")) * 1024 ** 3)
+RETENTION_STAGING_HOURS = float(os.getenv("RETENTION_STAGING_HOURS", "24"))
+RETENTION_MIN_AGE_HOURS = float(os.getenv("RETENTION_MIN_AGE_HOURS", "1"))
+
+_HOUR = 3600.0
+_DAY = 24 * _HOUR
+# Folder kosong yang baru dibuat (mis. parent folder dokumen sebelum publish) tidak dihapus
+_EMPTY_DIR_GRACE = 300.0
+
+# Output layout lama: YYYY/YYYY.MM.DD/{pdf,image,markdown_pages,thumbnail}/...
+_LEGACY_DATE_DIR_RE = re.compile(r"^(\d{4}/\d{4}\.\d{2}\.\d{2})/(.+)$")
+_PAGE_IMAGE_RE = re.compile(r"_page_\d+\.jpg$")
+
+POLICY_NAMES = ("documents", "source", "images", "size_cap", "staging")
+
+
+class RetentionPolicy:
+    """Konfigurasi retensi (default dari env), nilai 0 = policy mati"""
+
+    def __init__(
+        self,
+        image_days: float = RETENTION_IMAGE_DAYS,
+        source_days: float = RETENTION_SOURCE_DAYS,
+        document_days: float = RETENTION_DOCUMENT_DAYS,
+        max_bytes: int = RETENTION_MAX_BYTES,
+        staging_hours: float = RETENTION_STAGING_HOURS,
+        min_age_hours: float = RETENTION_MIN_AGE_HOURS,
+    ):
+        self.image_days = image_days
+        self.source_days = source_days
+        self.document_days = document_days
+        self.max_bytes = max_bytes
+        self.staging_hours = staging_hours
+        self.min_age_hours = min_age_hours
+
+    def storage_enabled(self) -> bool:
+        """True jika ada policy yang butuh scan seluruh storage"""
+        return any(value > 0 for value in (self.image_days, self.source_days, self.document_days, self.max_bytes))
+
+    def enabled(self) -> bool:
+        return self.storage_enabled() or self.staging_hours > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "image_days": self.image_days,
+            "source_days": self.source_days,
+            "document_days": self.document_days,
+            "max_bytes": self.max_bytes,
+            "staging_hours": self.staging_hours,
+            "min_age_hours": self.min_age_hours,
+        }
+
+
+class DocumentGroup:
+    """Object milik 1 folder dokumen (atau 1 folder tanggal layout lama)"""
+
+    __slots__ = ("path", "legacy", "objects")
+
+    def __init__(self, path: str, legacy: bool):
+        self.path = path
+        self.legacy = legacy
+        self.objects: List[StoredObject] = []
+
+    def rel(self, obj: StoredObject) -> str:
+        return obj.key[len(self.path) + 1:]
+
+    @property
+    def size(self) -> int:
+        return sum(obj.size for obj in self.objects)
+
+    @property
+    def created(self) -> float:
+        return min(obj.mtime for obj in self.objects)
+
+    @property
+    def modified(self) -> float:
+        return max(obj.mtime for obj in self.objects)
+
+    @property
+    def last_access(self) -> float:
+        return max(max(obj.atime, obj.mtime) for obj in self.objects)
+
+
+def group_objects(objects: Iterable[StoredObject]) -> Dict[str, DocumentGroup]:
+    """Kelompokkan hasil scan per folder dokumen. Object di luar layout output tidak disentuh."""
+    groups: Dict[str, DocumentGroup] = {}
+    for obj in objects:
+        split = split_document_key(obj.key)
+        if split is not None:
+            path, legacy = split[0], False
+        else:
+            match = _LEGACY_DATE_DIR_RE.match(obj.key)
+            if match is None:
+                continue
+            path, legacy = match.group(1), True
+        if path not in groups:
+            groups[path] = DocumentGroup(path, legacy)
+        groups[path].objects.append(obj)
+    return groups
+
+
+def is_page_image(rel_path: str) -> bool:
+    """Image halaman hasil render / thumbnail (bisa dibuat ulang dari PDF)"""
+    if rel_path.startswith("thumbnail/"):
+        return True
+    return rel_path.startswith("image/") and _PAGE_IMAGE_RE.search(rel_path) is not None
+
+
+def tree_usage(path: str) -> Tuple[int, int, float]:
+    """(jumlah file, total byte, mtime terbaru) sebuah folder"""
+    files, size, newest = 0, 0, os.path.getmtime(path)
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                st = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            files += 1
+            size += st.st_size
+            newest = max(newest, st.st_mtime)
+    return files, size, newest
+
+
+def remove_empty_dirs(root: str, cutoff: float) -> int:
+    """Hapus folder kosong di bawah root (root sendiri tidak), return jumlah folder yang dihapus"""
+    removed = 0
+    for dirpath, _, _ in os.walk(root, topdown=False):
+        if os.path.realpath(dirpath) == os.path.realpath(root):
+            continue
+        try:
+            if not os.listdir(dirpath) and os.path.getmtime(dirpath) < cutoff:
+                os.rmdir(dirpath)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class RetentionService:
+    """
+    Jalankan policy retensi terhadap storage backend + bersihkan folder lokal.
+    - local_roots : folder lokal tempat staging dokumen (scratch / OUTPUT_DIR) untuk pembersihan
+                    staging .tmp- & compaction folder kosong
+    - protected   : callable -> path staging yang masih dipakai job (tidak boleh dihapus)
+    Blocking, panggil via run_io.
+    """
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        policy: RetentionPolicy,
+        local_roots: Iterable[str] = (),
+        protected: Optional[Callable[[], Iterable[str]]] = None,
+        dry_run: bool = False,
+    ):
+        self.backend = backend
+        self.policy = policy
+        self.local_roots = list(local_roots)
+        self.protected = protected
+        self.dry_run = dry_run
+
+    def run(self, now: Optional[float] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        now = time.time() if now is None else now
+        report: Dict[str, Any] = {
+            "dry_run": self.dry_run,
+            "policy": self.policy.to_dict(),
+            "documents": 0,
+            "files_deleted": 0,
+            "bytes_reclaimed": 0,
+            "bytes_before": None,
+            "bytes_after": None,
+            "dirs_removed": 0,
+            "policies": {name: {"files": 0, "bytes": 0} for name in POLICY_NAMES},
+        }
+
+        if self.policy.storage_enabled():
+            groups = group_objects(self.backend.scan())
+            report["documents"] = len(groups)
+            report["bytes_before"] = sum(group.size for group in groups.values())
+            self._apply_storage_policies(list(groups.values()), now, report)
+            report["bytes_after"] = sum(group.size for group in groups.values())
+
+        if self.policy.staging_hours > 0:
+            self._clean_staging(now, report)
+        if not self.dry_run:
+            for root in self.local_roots:
+                if os.path.isdir(root):
+                    report["dirs_removed"] += remove_empty_dirs(root, now - _EMPTY_DIR_GRACE)
+
+        report["duration_seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def _apply_storage_policies(self, groups: List[DocumentGroup], now: float, report: Dict[str, Any]):
+        min_age = self.policy.min_age_hours * _HOUR
+        candidates = [group for group in groups if now - group.modified >= min_age]
+
+        for group in candidates:
+            age = now - group.created
+            if self.policy.document_days > 0 and age >= self.policy.document_days * _DAY:
+                self._delete_group(group, "documents", report)
+                continue
+            drop_source = self.policy.source_days > 0 and age >= self.policy.source_days * _DAY
+            drop_images = self.policy.image_days > 0 and age >= self.policy.image_days * _DAY
+            if drop_source or drop_images:
+                self._compact_group(group, drop_source, drop_images, now, report)
+
+        if self.policy.max_bytes > 0:
+            total = sum(group.size for group in groups)
+            # LRU: dokumen yang paling lama tidak diakses dihapus lebih dulu
+            for group in sorted((g for g in candidates if g.objects), key=lambda g: g.last_access):
+                if total <= self.policy.max_bytes:
+                    break
+                total -= group.size
+                self._delete_group(group, "size_cap", report)
+
+    def _delete_objects(self, objects: List[StoredObject], policy: str, report: Dict[str, Any]):
+        for obj in objects:
+            if not self.dry_run:
+                self.backend.delete(obj.key)
+                self._prune_parents(obj.key)
+            report["files_deleted"] += 1
+            report["bytes_reclaimed"] += obj.size
+            report["policies"][policy]["files"] += 1
+            report["policies"][policy]["bytes"] += obj.size
+
+    def _prune_parents(self, key: str):
+        """Backend filesystem: hapus folder induk yang jadi kosong setelah file dihapus"""
+        path = self.backend.local_path(key)
+        root = self.backend.local_path("")
+        if path is None or root is None:
+            return
+        parent = os.path.dirname(path)
+        while os.path.realpath(parent) != os.path.realpath(root):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                return
+            parent = os.path.dirname(parent)
+
+    def _delete_group(self, group: DocumentGroup, policy: str, report: Dict[str, Any]):
+        manifest_key = f"{group.path}/{MANIFEST_FILENAME}"
+        # Manifest dihapus pertama: dokumen langsung tidak terlihat oleh dedup / endpoint manifest
+        objects = sorted(group.objects, key=lambda obj: obj.key != manifest_key)
+        self._delete_objects(objects, policy, report)
+        group.objects = []
+
+    def _load_manifest(self, group: DocumentGroup) -> Optional[Dict[str, Any]]:
+        manifest_key = f"{group.path}/{MANIFEST_FILENAME}"
+        if group.legacy or not any(obj.key == manifest_key for obj in group.objects):
+            return None
+        try:
+            return json.loads(self.backend.get(manifest_key))
+        except Exception as e:
+            print_with_time(f"Retensi: manifest {manifest_key} tidak terbaca: {e}")
+            return None
+
+    def _compact_group(self, group: DocumentGroup, drop_source: bool, drop_images: bool, now: float, report: Dict[str, Any]):
+        """Hapus upload asli / image halaman dokumen, markdown & manifest tetap"""
+        manifest = self._load_manifest(group)
+        source = manifest.get("source") if manifest else None
+        dropped: Dict[str, List[StoredObject]] = {"source": [], "images": []}
+        for obj in group.objects:
+            rel_path = group.rel(obj)
+            if drop_source and (rel_path == source or rel_path.startswith("pdf/")):
+                dropped["source"].append(obj)
+            elif drop_images and rel_path != source and is_page_image(rel_path):
+                dropped["images"].append(obj)
+        if not dropped["source"] and not dropped["images"]:
+            return
+
+        for policy, objects in dropped.items():
+            self._delete_objects(objects, policy, report)
+        removed = {obj.key for objects in dropped.values() for obj in objects}
+        group.objects = [obj for obj in group.objects if obj.key not in removed]
+
+        if manifest is not None:
+            self._update_manifest(
+                group, manifest,
+                {group.rel(obj) for objects in dropped.values() for obj in objects},
+                bool(dropped["source"]), bool(dropped["images"]), now,
+            )
+
+    def _update_manifest(
+        self, group: DocumentGroup, manifest: Dict[str, Any], dropped: Set[str],
+        source_dropped: bool, images_dropped: bool, now: float,
+    ):
+        """Manifest tidak lagi menunjuk file yang sudah dihapus"""
+        retention = manifest.setdefault("retention", {})
+        if source_dropped:
+            retention["source_dropped_at"] = now
+        if images_dropped:
+            retention["images_dropped_at"] = now
+        # Thumbnail lazy hanya bisa dibuat selama PDF asli masih ada
+        can_render = "source_dropped_at" not in retention and str(manifest.get("source", "")).lower().endswith(".pdf")
+        for page in manifest.get("pages", {}).values():
+            if page.get("image") in dropped:
+                page["image"] = None
+                page["thumbnail"] = can_render
+            elif page.get("thumbnail") and not can_render:
+                page["thumbnail"] = False
+        if not self.dry_run:
+            self.backend.put(
+                f"{group.path}/{MANIFEST_FILENAME}", json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+            )
+
+    def _clean_staging(self, now: float, report: Dict[str, Any]):
+        """Folder staging .tmp- (dokumen yang tidak pernah dipublish) di YYYY/YYYY.MM.DD/ & objects/xx/"""
+        cutoff = now - self.policy.staging_hours * _HOUR
+        protected = {os.path.realpath(path) for path in (self.protected() if self.protected else [])}
+        for root in self.local_roots:
+            if not os.path.isdir(root):
+                continue
+            # Staging selalu 2 level di bawah root, tidak perlu walk seluruh tree
+            for top in os.scandir(root):
+                if not top.is_dir() or top.name.startswith(".tmp-"):
+                    continue
+                for parent in os.scandir(top.path):
+                    if not parent.is_dir():
+                        continue
+                    for entry in os.scandir(parent.path):
+                        if not entry.name.startswith(".tmp-") or not entry.is_dir():
+                            continue
+                        if os.path.realpath(entry.path) in protected:
+                            continue
+                        files, size, newest = tree_usage(entry.path)
+                        if newest > cutoff:
+                            continue
+                        if not self.dry_run:
+                            shutil.rmtree(entry.path, ignore_errors=True)
+                        report["files_deleted"] += files
+                        report["bytes_reclaimed"] += size
+                        report["policies"]["staging"]["files"] += files
+                        report["policies"]["staging"]["bytes"] += size
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Retensi{' (dry run)' if report['dry_run'] else ''}: "
+        f"{report['files_deleted']} file, {format_bytes(report['bytes_reclaimed'])} dibebaskan "
+        f"({report['duration_seconds']} detik)"
+    ]
+    if report["bytes_before"] is not None:
+        lines.append(
+            f"  storage: {report['documents']} dokumen, "
+            f"{format_bytes(report['bytes_before'])} -> {format_bytes(report['bytes_after'])}"
+        )
+    for name, stats in report["policies"].items():
+        if stats["files"]:
+            lines.append(f"  {name}: {stats['files']} file, {format_bytes(stats['bytes'])}")
+    if report["dirs_removed"]:
+        lines.append(f"  folder kosong dihapus: {report['dirs_removed']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    from job_queue import JOB_DB_PATH, JobStore
+    from storage import MOUNT_PATH, OUTPUT_DIR, SCRATCH_DIR, create_storage_backend
+
+    parser = argparse.ArgumentParser(description="Retensi & compaction tree output (default dari env RETENTION_*)")
+    parser.add_argument("--image-days", type=float, default=RETENTION_IMAGE_DAYS, help="hapus image halaman setelah N hari")
+    parser.add_argument("--source-days", type=float, default=RETENTION_SOURCE_DAYS, help="hapus upload asli setelah N hari")
+    parser.add_argument("--document-days", type=float, default=RETENTION_DOCUMENT_DAYS, help="hapus dokumen setelah N hari")
+    parser.add_argument("--max-gb", type=float, default=RETENTION_MAX_BYTES / 1024 ** 3, help="batas total ukuran (LRU)")
+    parser.add_argument("--staging-hours", type=float, default=RETENTION_STAGING_HOURS, help="hapus staging .tmp- setelah N jam")
+    parser.add_argument("--min-age-hours", type=float, default=RETENTION_MIN_AGE_HOURS, help="dokumen lebih baru tidak disentuh")
+    parser.add_argument("--dry-run", action="store_true", help="hanya laporan, tidak ada yang dihapus")
+    parser.add_argument("--json", action="store_true", help="laporan dalam format JSON")
+    args = parser.parse_args(argv)
+
+    policy = RetentionPolicy(
+        image_days=args.image_days,
+        source_days=args.source_days,
+        document_days=args.document_days,
+        max_bytes=int(args.max_gb * 1024 ** 3),
+        staging_hours=args.staging_hours,
+        min_age_hours=args.min_age_hours,
+    )
+    # Staging folder job yang masih antri tidak boleh dihapus
+    job_store = JobStore() if os.path.exists(JOB_DB_PATH) else None
+    service = RetentionService(
+        create_storage_backend(OUTPUT_DIR, MOUNT_PATH),
+        policy,
+        local_roots=[root for root in (SCRATCH_DIR, OUTPUT_DIR) if os.path.isdir(root)],
+        protected=job_store.active_base_paths if job_store is not None else None,
+        dry_run=args.dry_run,
+    )
+    try:
+        report = service.run()
+    finally:
+        if job_store is not None:
+            job_store.close()
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
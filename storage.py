@@ -0,0 +1,560 @@
+"""
+Storage artefak output: backend (lokal / S3-compatible) + write-behind dari scratch lokal.
+
+Backend (STORAGE_BACKEND)
+-------------------------
+Interface StorageBackend: put, put_file, get, exists, delete, url, scan. Key = path relatif '/'
+terhadap root output (mis. "2026/2026.01.31/{document_id}/image/PN_page_1.jpg").
+
+- local : LocalStorage, file di OUTPUT_DIR (share CIFS di docker-compose), dilayani StaticFiles
+- s3    : S3Storage, object storage S3-compatible (AWS S3 / MinIO), butuh `pip install boto3`.
+          Upload besar otomatis multipart (streaming per chunk), URL download = presigned URL
+          sehingga image multi-MB tidak lewat proses Python. Untuk tes lokal jalankan MinIO
+          (`docker compose --profile s3 up minio`) dengan S3_ENDPOINT_URL=http://localhost:9000.
+
+Write-behind
+------------
+
+Semua artefak request (PDF upload, image halaman, markdown per halaman, markdown final, thumbnail)
+ditulis dulu ke SCRATCH_DIR di disk lokal dengan struktur folder yang sama seperti root output.
+Setelah request selesai, folder dokumen di-enqueue ke WriteBehindReplicator: thread background yang
+mengirim artefak ke backend, dengan retry + backoff jika storage remote bermasalah.
+Latency storage remote tidak lagi masuk ke latency request. Backend non-lokal selalu memakai
+write-behind (PaddleOCR menulis hasil ke disk lokal lebih dulu).
+
+- File di scratch = journal: saat startup semua file yang masih ada di scratch di-enqueue ulang,
+  jadi artefak yang belum tersalin tidak hilang walaupun service restart.
+- File scratch baru dihapus WRITE_BEHIND_SCRATCH_RETAIN detik setelah tersalin (dan hanya jika
+  tidak berubah sejak disalin), agar request yang sedang membaca file tersebut tidak terputus.
+- ScratchFirstStaticFiles melayani URL output dari scratch dulu, lalu dari OUTPUT_DIR (local)
+  atau redirect ke presigned URL (s3), sehingga URL di response langsung bisa diakses sebelum
+  replikasi selesai.
+
+Publish dokumen di storage (aturan untuk semua pembaca, termasuk aplikasi lain yang membaca share)
+---------------------------------------------------------------------------------------------------
+- local : folder dokumen disalin ke folder `.tmp-{nama}-{acak}` di share lalu di-rename dalam 1 operasi,
+          sama seperti publish di scratch. Pembaca share harus melewati folder `.tmp-*`; folder dokumen
+          yang terlihat selalu lengkap.
+- s3    : object storage tidak punya rename. File disalin per key dengan manifest.json paling akhir:
+          dokumen dianggap BELUM ADA sampai `{folder dokumen}/manifest.json` ada. ScratchFirstStaticFiles
+          menerapkan aturan ini sebelum redirect ke presigned URL.
+"""
+import heapq
+import io
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi.responses import RedirectResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+
+from metrics import stage_timer
+from log import print_with_time
+from output_layout import MANIFEST_FILENAME, document_files, split_document_key
+
+# Root output lokal (share CIFS di docker-compose) dan path static mount-nya
+OUTPUT_DIR = os.path.join("storage", "agen", "production-note", "outputs")
+MOUNT_PATH = "/storage/agen/production-note/outputs"
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET = os.getenv("S3_BUCKET", "production-note")
+S3_PREFIX = os.getenv("S3_PREFIX", "outputs")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "3600"))
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", os.path.join("data", "scratch"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "32"))
+WRITE_BEHIND_BATCH_WAIT = float(os.getenv("WRITE_BEHIND_BATCH_WAIT_MS", "200")) / 1000.0
+WRITE_BEHIND_RETRY_BASE = float(os.getenv("WRITE_BEHIND_RETRY_BASE", "2"))
+WRITE_BEHIND_RETRY_MAX = float(os.getenv("WRITE_BEHIND_RETRY_MAX", "300"))
+WRITE_BEHIND_SCRATCH_RETAIN = float(os.getenv("WRITE_BEHIND_SCRATCH_RETAIN", "600"))
+
+_STOP = object()
+
+
+def is_within(path: str, root: str) -> bool:
+    """True jika path berada di dalam folder root"""
+    root = os.path.realpath(root)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def path_to_key(path: str, root: str) -> str:
+    """Path file di bawah root -> key storage (pemisah '/')"""
+    return os.path.relpath(os.path.realpath(path), os.path.realpath(root)).replace("\\", "/")
+
+
+class StoredObject:
+    """Hasil scan storage: key, ukuran (byte), waktu modifikasi & akses terakhir (epoch)"""
+
+    __slots__ = ("key", "size", "mtime", "atime")
+
+    def __init__(self, key: str, size: int, mtime: float, atime: float):
+        self.key = key
+        self.size = size
+        self.mtime = mtime
+        self.atime = atime
+
+
+class StorageBackend(ABC):
+    """Interface storage artefak output. Semua method blocking, panggil via run_io."""
+
+    name = "base"
+
+    @abstractmethod
+    def put(self, key: str, data: Union[bytes, BinaryIO]):
+        """Simpan bytes / file object (dibaca streaming) sebagai key"""
+
+    @abstractmethod
+    def put_file(self, key: str, local_path: str):
+        ...
+
+    def put_tree(self, key: str, local_dir: str, files: List[str]):
+        """
+        Salin folder dokumen `local_dir` (daftar `files`, manifest.json paling akhir) sebagai prefix key.
+        Default per file: dokumen baru lengkap setelah manifest.json tersalin (lihat docstring modul).
+        """
+        for path in files:
+            self.put_file(f"{key}/{path_to_key(path, local_dir)}", path)
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    def download(self, key: str, local_path: str):
+        """Salin isi key ke file lokal"""
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        with open(local_path, "wb") as f:
+            f.write(self.get(key))
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def url(self, key: str, base_url: str = "") -> str:
+        ...
+
+    @abstractmethod
+    def scan(self, prefix: str = "") -> Iterator[StoredObject]:
+        """Semua object di bawah prefix (file sementara .tmp- dilewati)"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path lokal untuk key jika backend berbasis filesystem, None untuk object storage"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Filesystem (OUTPUT_DIR), URL = static mount aplikasi"""
+
+    name = "local"
+
+    def __init__(self, root: str, mount_path: str):
+        self.root = root
+        self.mount_path = mount_path
+
+    def _path(self, key: str) -> str:
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, key))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Key di luar root storage: {key}")
+        return path
+
+    def put(self, key: str, data: Union[bytes, BinaryIO]):
+        self._atomic_write(key, lambda f: f.write(data) if isinstance(data, bytes) else shutil.copyfileobj(data, f))
+
+    def put_file(self, key: str, local_path: str):
+        with open(local_path, "rb") as src:
+            self._atomic_write(key, lambda f: shutil.copyfileobj(src, f, 1024 * 1024))
+
+    def _atomic_write(self, key: str, write):
+        dst = self._path(key)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        # Tulis ke file sementara lalu rename, agar pembaca tidak melihat file setengah jadi
+        tmp_dst = f"{dst}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            with open(tmp_dst, "wb") as f:
+                write(f)
+            os.replace(tmp_dst, dst)
+        except BaseException:
+            try:
+                os.remove(tmp_dst)
+            except OSError:
+                pass
+            raise
+
+    def put_tree(self, key: str, local_dir: str, files: List[str]):
+        """Folder dokumen baru dirakit di .tmp- di share lalu di-rename, pembaca tidak melihat dokumen setengah jadi"""
+        dst = self._path(key)
+        if os.path.exists(dst):
+            # Dokumen sudah dipublish, hanya menambah / mengganti file (extraction.json, thumbnail)
+            return super().put_tree(key, local_dir, files)
+        parent, name = os.path.split(dst)
+        tmp_dst = os.path.join(parent, f".tmp-{name}-{uuid.uuid4().hex[:8]}")
+        try:
+            for path in files:
+                target = os.path.join(tmp_dst, os.path.relpath(path, local_dir))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+        except BaseException:
+            shutil.rmtree(tmp_dst, ignore_errors=True)
+            raise
+        try:
+            os.rename(tmp_dst, dst)
+        except OSError:
+            shutil.rmtree(tmp_dst, ignore_errors=True)
+            if not os.path.exists(dst):
+                raise
+            # Worker lain mempublish dokumen yang sama lebih dulu
+            super().put_tree(key, local_dir, files)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str, base_url: str = "") -> str:
+        return f"{base_url}{self.mount_path}/{key}"
+
+    def scan(self, prefix: str = "") -> Iterator[StoredObject]:
+        root = self._path(prefix) if prefix else os.path.realpath(self.root)
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Folder staging (.tmp-) belum dipublish, bukan bagian tree output
+            dirnames[:] = [d for d in dirnames if not d.startswith(".tmp-")]
+            for name in filenames:
+                if ".tmp-" in name:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield StoredObject(path_to_key(path, self.root), st.st_size, st.st_mtime, st.st_atime)
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+class S3Storage(StorageBackend):
+    """Object storage S3-compatible (AWS S3 / MinIO) via boto3"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        prefix: str = S3_PREFIX,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: str = S3_REGION,
+        presign_expires: int = S3_PRESIGN_EXPIRES,
+    ):
+        # Import di sini agar boto3 hanya wajib jika STORAGE_BACKEND=s3
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presign_expires = presign_expires
+        # Kredensial dari env standar AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            # MinIO butuh path-style addressing (http://host:9000/bucket/key)
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+        chunk = S3_MULTIPART_CHUNK_MB * 1024 * 1024
+        self.transfer_config = TransferConfig(multipart_threshold=chunk, multipart_chunksize=chunk)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: Union[bytes, BinaryIO]):
+        fileobj = io.BytesIO(data) if isinstance(data, bytes) else data
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key), Config=self.transfer_config)
+
+    def put_file(self, key: str, local_path: str):
+        self.client.upload_file(local_path, self.bucket, self._key(key), Config=self.transfer_config)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+
+    def download(self, key: str, local_path: str):
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        self.client.download_file(self.bucket, self._key(key), local_path, Config=self.transfer_config)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def url(self, key: str, base_url: str = "") -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=self.presign_expires,
+        )
+
+    def scan(self, prefix: str = "") -> Iterator[StoredObject]:
+        # S3 tidak menyimpan waktu akses, atime = LastModified
+        base = f"{self.prefix}/" if self.prefix else ""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=base + prefix):
+            for item in page.get("Contents", []):
+                key = item["Key"][len(base):]
+                if ".tmp-" in key:
+                    continue
+                modified = item["LastModified"].timestamp()
+                yield StoredObject(key, item["Size"], modified, modified)
+
+
+def create_storage_backend(output_dir: str, mount_path: str, name: Optional[str] = None) -> StorageBackend:
+    """Backend sesuai env STORAGE_BACKEND (local / s3)"""
+    name = (name or STORAGE_BACKEND).lower()
+    if name == "local":
+        return LocalStorage(output_dir, mount_path)
+    if name == "s3":
+        return S3Storage()
+    raise ValueError(f"STORAGE_BACKEND tidak dikenal: {name}. Gunakan: local, s3")
+
+
+class ScratchFirstStaticFiles(StaticFiles):
+    """
+    StaticFiles yang mencari file di beberapa folder berurutan (scratch lokal lalu OUTPUT_DIR).
+    Jika backend object storage diberikan, file yang tidak ada di folder lokal di-redirect
+    ke URL backend (presigned URL) sehingga isi file tidak dilayani proses Python.
+    """
+
+    def __init__(self, directories: List[str], backend: Optional[StorageBackend] = None, **kwargs):
+        self._directories = list(directories)
+        self.backend = backend
+        super().__init__(directory=self._directories[0], **kwargs)
+
+    def get_directories(self, directory=None, packages=None):
+        return self._directories
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            if e.status_code != 404 or self.backend is None:
+                raise
+            key = path.replace(os.sep, "/")
+            if not await run_in_threadpool(self._published, key):
+                raise
+            return RedirectResponse(await run_in_threadpool(self.backend.url, key), status_code=307)
+
+    def _published(self, key: str) -> bool:
+        """File dokumen di object storage baru dilayani setelah manifest.json dokumennya tersalin"""
+        if not self.backend.exists(key):
+            return False
+        document = split_document_key(key)
+        return document is None or self.backend.exists(f"{document[0]}/{MANIFEST_FILENAME}")
+
+
+class WriteBehindReplicator:
+    """Thread background yang mengirim folder dokumen / file dari scratch_root ke backend (key = path relatif)"""
+
+    def __init__(
+        self,
+        scratch_root: str,
+        backend: StorageBackend,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        batch_wait: float = WRITE_BEHIND_BATCH_WAIT,
+        retain_seconds: float = WRITE_BEHIND_SCRATCH_RETAIN,
+    ):
+        self.scratch_root = scratch_root
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait)
+        self.retain_seconds = max(0.0, retain_seconds)
+        self._queue: "queue.Queue" = queue.Queue()
+        # (waktu retry, attempt, path) untuk file yang gagal disalin
+        self._retries: List[Tuple[float, int, str]] = []
+        # path scratch -> (mtime saat disalin, waktu selesai disalin), menunggu dihapus dari scratch
+        self._replicated: Dict[str, Tuple[float, float]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"replicated": 0, "bytes": 0, "failures": 0, "batches": 0}
+
+    # ---------- API untuk pemanggil ----------
+
+    def start(self):
+        os.makedirs(self.scratch_root, exist_ok=True)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, paths: Iterable[Optional[str]]):
+        """Jadwalkan salin file / folder dokumen (path di dalam scratch_root, path lain diabaikan)"""
+        for path in paths:
+            if path and is_within(path, self.scratch_root):
+                self._queue.put(path)
+
+    def recover_pending(self) -> int:
+        """
+        Enqueue ulang semua yang masih ada di scratch (belum tersalin sebelum restart): file di dalam
+        folder dokumen dijadwalkan sebagai 1 folder dokumen, file lain per file
+        """
+        documents = set()
+        count = 0
+        for root, _, files in os.walk(self.scratch_root):
+            for name in files:
+                if name.startswith(".tmp-") or ".tmp-" in root:
+                    continue
+                path = os.path.join(root, name)
+                document = split_document_key(self.key_for(path))
+                if document is not None:
+                    documents.add(document[0])
+                    continue
+                self._queue.put(path)
+                count += 1
+        for document in sorted(documents):
+            self._queue.put(os.path.join(self.scratch_root, document))
+        return count + len(documents)
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retries)
+
+    def key_for(self, scratch_path: str) -> str:
+        return path_to_key(scratch_path, self.scratch_root)
+
+    # ---------- Thread replikasi ----------
+
+    def _next_timeout(self) -> float:
+        deadlines = []
+        if self._retries:
+            deadlines.append(self._retries[0][0])
+        if self._replicated:
+            deadlines.append(min(t for _, t in self._replicated.values()) + self.retain_seconds)
+        if not deadlines:
+            return 1.0
+        return min(1.0, max(0.0, min(deadlines) - time.time()))
+
+    def _run(self):
+        while True:
+            batch: List[Tuple[int, str]] = []
+            try:
+                item = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append((0, item))
+                # Kumpulkan item lain yang masuk dalam batch_wait (path ganda disalin 1 kali).
+                # Item disalin berurutan; dokumen baru masuk sebagai 1 folder (put_tree), bukan per file.
+                deadline = time.monotonic() + self.batch_wait
+                while len(batch) < self.batch_size:
+                    try:
+                        nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if nxt is _STOP:
+                        self._copy_batch(batch)
+                        return
+                    batch.append((0, nxt))
+
+            now = time.time()
+            while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size * 2:
+                _, attempt, path = heapq.heappop(self._retries)
+                batch.append((attempt, path))
+
+            if batch:
+                self._copy_batch(batch)
+            self._sweep_scratch()
+
+    def _copy_batch(self, batch: List[Tuple[int, str]]):
+        self.stats["batches"] += 1
+        seen = set()
+        for attempt, path in batch:
+            if path in seen:
+                continue
+            seen.add(path)
+            try:
+                if os.path.isdir(path):
+                    self._copy_tree(path)
+                else:
+                    self._copy_one(path)
+            except FileNotFoundError:
+                # File sudah dihapus dari scratch (retensi / duplikat antrian)
+                continue
+            except Exception as e:
+                self.stats["failures"] += 1
+                delay = min(WRITE_BEHIND_RETRY_MAX, WRITE_BEHIND_RETRY_BASE * (2 ** attempt))
+                print_with_time(f"Write-behind gagal ({path}), retry {delay:.1f} detik lagi: {e}")
+                heapq.heappush(self._retries, (time.time() + delay, attempt + 1, path))
+
+    def _copy_one(self, path: str):
+        mtime = os.path.getmtime(path)
+        size = os.path.getsize(path)
+        with stage_timer("storage_write"):
+            self.backend.put_file(self.key_for(path), path)
+        self.stats["replicated"] += 1
+        self.stats["bytes"] += size
+        self._replicated[path] = (mtime, time.time())
+
+    def _copy_tree(self, path: str):
+        files = document_files(path)
+        if not files:
+            return
+        stats = {file_path: os.stat(file_path) for file_path in files}
+        with stage_timer("storage_write"):
+            self.backend.put_tree(self.key_for(path), path, files)
+        now = time.time()
+        self.stats["replicated"] += len(files)
+        self.stats["bytes"] += sum(st.st_size for st in stats.values())
+        for file_path, st in stats.items():
+            self._replicated[file_path] = (st.st_mtime, now)
+
+    def _sweep_scratch(self):
+        """Hapus file scratch yang sudah tersalin lebih dari retain_seconds"""
+        now = time.time()
+        for path, (mtime, replicated_at) in list(self._replicated.items()):
+            if now - replicated_at < self.retain_seconds:
+                continue
+            del self._replicated[path]
+            try:
+                if os.path.getmtime(path) != mtime:
+                    # Berubah setelah disalin: salin ulang
+                    self._queue.put(path)
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                pass
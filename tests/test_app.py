@@ -0,0 +1,96 @@
+"""Integrasi /document-parsing dengan model stub (benchmark/stub_paddleocr.py), tanpa GPU & poppler"""
+import importlib
+import io
+import os
+import sys
+
+import pytest
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark")
+
+
+def sample_pdf(pages: int) -> bytes:
+    from PIL import Image, ImageDraw
+
+    images = []
+    for page in range(pages):
+        img = Image.new("RGB", (600, 800), "white")
+        ImageDraw.Draw(img).text((50, 50), f"HALAMAN {page + 1}", fill="black")
+        images.append(img)
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", resolution=72, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    from fastapi.testclient import TestClient
+
+    with pytest.MonkeyPatch.context() as patch:
+        # Path data/ & storage/ app relatif terhadap folder kerja
+        patch.chdir(tmp_path_factory.mktemp("app"))
+        patch.syspath_prepend(BENCH_DIR)
+        import stub_paddleocr
+        stub_paddleocr.install(latency=0.0)
+        # Thumbnail lazy memakai rasterizer default (poppler tidak wajib terpasang untuk test)
+        import rasterizer
+        patch.setattr(rasterizer, "DEFAULT_RASTERIZER", "pymupdf")
+        patch.delitem(sys.modules, "app", raising=False)
+        app = importlib.import_module("app")
+        with TestClient(app.app) as test_client:
+            yield test_client, stub_paddleocr.stats
+        sys.modules.pop("paddleocr", None)
+        sys.modules.pop("app", None)
+
+
+def parse(test_client, data: bytes, **form):
+    form.setdefault("rasterizer", "pymupdf")
+    return test_client.post("/document-parsing", files={"file": ("PN_1.pdf", data, "application/pdf")}, data=form)
+
+
+def test_document_parsing_selected_pages(client):
+    test_client, stats = client
+    calls_before = stats["inputs"]
+    response = parse(test_client, sample_pdf(3), pages="[1,3]")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"] is True
+    data = body["data"]
+    assert data["pages_processed"] == 2
+    assert data["page_sources"] == ["ocr", "", "ocr"]
+    assert data["cache"]["document"] == "miss"
+    assert stats["inputs"] - calls_before == 2
+    assert data["markdown"].count("Stub PaddleOCR-VL.") == 2
+
+    # Markdown final & manifest bisa diambil lewat URL di response
+    download = test_client.get(data["download_url"])
+    assert download.status_code == 200
+    assert download.text == data["markdown"]
+    manifest = test_client.get(data["manifest_url"])
+    assert manifest.status_code == 200
+    for url in filter(None, data["stored_markdown"] + data["stored_images"]):
+        assert test_client.get(url).status_code == 200
+
+
+def test_identical_upload_is_deduplicated(client):
+    test_client, stats = client
+    pdf = sample_pdf(2)
+    first = parse(test_client, pdf).json()["data"]
+    calls_before = stats["calls"]
+    second = parse(test_client, pdf).json()["data"]
+
+    assert second["cache"]["document"] == "hit"
+    assert stats["calls"] == calls_before
+    assert second["markdown"] == first["markdown"]
+    assert second["download_url"] == first["download_url"]
+
+
+def test_document_parsing_rejects_bad_input(client):
+    test_client, _ = client
+    response = test_client.post("/document-parsing", files={"file": ("a.txt", b"halo", "text/plain")})
+    assert response.json()["success"] is False
+    response = parse(test_client, sample_pdf(1), rasterizer="tidak-ada")
+    assert response.json()["success"] is False
+    response = parse(test_client, sample_pdf(1), sections="bukan json")
+    assert response.json()["success"] is False
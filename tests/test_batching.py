@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from batching import BatchScheduler, SchedulerStopped
+
+
+class StubPipeline:
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def predict(self, input, **kwargs):
+        with self._lock:
+            self.batches.append((list(input), kwargs))
+        broken = [x for x in input if str(x).startswith("rusak")]
+        if broken:
+            raise ValueError(f"halaman rusak: {broken}")
+        return [f"res-{x}" for x in input]
+
+
+@pytest.fixture
+def stub():
+    return StubPipeline()
+
+
+def make_scheduler(stub, **kwargs):
+    scheduler = BatchScheduler(lambda: stub, **kwargs)
+    scheduler.start()
+    return scheduler
+
+
+async def submit_request(scheduler, request_id, pages, **predict_kwargs):
+    inputs = [f"r{request_id}-p{page}" for page in range(pages)]
+    return inputs, await asyncio.gather(*(scheduler.predict(inp, **predict_kwargs) for inp in inputs))
+
+
+def test_concurrent_requests_share_batches_and_keep_order(stub):
+    scheduler = make_scheduler(stub, max_batch_size=4, max_wait=0.05)
+
+    async def concurrent():
+        return await asyncio.gather(*(submit_request(scheduler, i, 5) for i in range(6)))
+
+    try:
+        outputs = asyncio.run(asyncio.wait_for(concurrent(), timeout=10))
+    finally:
+        scheduler.stop()
+    assert max(len(inputs) for inputs, _ in stub.batches) > 1
+    assert all(len(inputs) <= 4 for inputs, _ in stub.batches)
+    for inputs, results in outputs:
+        assert results == [[f"res-{inp}"] for inp in inputs]
+
+
+def test_different_predict_kwargs_are_not_batched_together(stub):
+    scheduler = make_scheduler(stub, max_batch_size=8, max_wait=0.05)
+
+    async def mixed():
+        return await asyncio.gather(
+            submit_request(scheduler, 0, 4, use_layout_detection=True),
+            submit_request(scheduler, 1, 4, use_layout_detection=False),
+        )
+
+    try:
+        outputs = asyncio.run(asyncio.wait_for(mixed(), timeout=10))
+    finally:
+        scheduler.stop()
+    for inputs, kwargs in stub.batches:
+        assert all(inp.startswith("r0-") == kwargs["use_layout_detection"] for inp in inputs)
+    for inputs, results in outputs:
+        assert results == [[f"res-{inp}"] for inp in inputs]
+
+
+def test_broken_page_does_not_fail_its_batch(stub):
+    scheduler = make_scheduler(stub, max_batch_size=4, max_wait=0.05)
+
+    async def broken():
+        return await asyncio.gather(*(scheduler.predict(inp) for inp in ["a", "rusak-b", "c"]), return_exceptions=True)
+
+    try:
+        results = asyncio.run(asyncio.wait_for(broken(), timeout=10))
+    finally:
+        scheduler.stop()
+    assert results[0] == ["res-a"]
+    assert isinstance(results[1], ValueError)
+    assert results[2] == ["res-c"]
+
+
+def test_submit_call_runs_on_scheduler_thread(stub):
+    scheduler = make_scheduler(stub)
+    try:
+        name = scheduler.submit_call(lambda: threading.current_thread().name).result(timeout=5)
+    finally:
+        scheduler.stop()
+    assert name == "ocr-batch-scheduler"
+
+
+def test_stop_fails_deferred_items(stub):
+    # Item pertama menunggu batch (max_wait lama), item kedua ditunda karena parameter berbeda
+    scheduler = make_scheduler(stub, max_batch_size=4, max_wait=30)
+    first = scheduler.submit("a", use_layout_detection=True)
+    deferred = scheduler.submit("b", use_layout_detection=False)
+    scheduler.stop(timeout=5)
+    assert first.result(timeout=1) == ["res-a"]
+    with pytest.raises(SchedulerStopped):
+        deferred.result(timeout=1)
+
+
+def test_stop_fails_items_queued_without_running_thread(stub):
+    scheduler = BatchScheduler(lambda: stub)
+    queued = scheduler.submit("a")
+    call = scheduler.submit_call(lambda: None)
+    scheduler.stop()
+    with pytest.raises(SchedulerStopped):
+        queued.result(timeout=1)
+    with pytest.raises(SchedulerStopped):
+        call.result(timeout=1)
+    assert stub.batches == []
@@ -0,0 +1,162 @@
+import pytest
+
+from extraction import (
+    BREAKDOWN_TABLE, MATERIAL_TABLE, extract_document, extract_page, extract_tables, parse_date, parse_decimal,
+    parse_int, parse_page_spec,
+)
+
+SIZES = ["XS", "S", "M", "L"]
+
+
+def rekap_page(rows, country=True) -> str:
+    """Tabel rekap order HTML (matriks color x size) seperti output PaddleOCR-VL"""
+    extra = '<td rowspan="2">COUNTRY</td><td rowspan="2">SHIP DATE</td>' if country else ""
+    head = (
+        f'<table border=1><tr><td rowspan="2">COLOR</td>{extra}<td colspan="{len(SIZES)}">SIZE</td>'
+        '<td rowspan="2">TOTAL</td></tr><tr>' + "".join(f"<td>{size}</td>" for size in SIZES) + "</tr>"
+    )
+    body = "".join(
+        "<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows
+    )
+    return f"# REKAP ORDER\n\n{head}{body}</table>\n"
+
+
+def material_page() -> str:
+    return (
+        "# MATERIAL LIST\n\n"
+        "| No | Style | Garment Color | Material Color | JO | Item Description | Description 2 | Cons (YY/MT) | UM |\n"
+        "|---|---|---|---|---|---|---|---|---|\n"
+        "| 1 | ST-100 | BLACK | RED | 12345 | Cotton Twill | Main body | 1,25 | yd |\n"
+        "| 2 | | BLACK | WHITE | 12345 | Label | | 0.5 | pcs |\n"
+        "| | | | | | Total | | 1.75 | |\n"
+    )
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("1, 2, 3", [1, 2, 3]),
+    ("3-5", [3, 4, 5]),
+    ("[2,1,2]", [1, 2]),
+    ("1; 4-5", [1, 4, 5]),
+    ("", []),
+    (None, []),
+])
+def test_parse_page_spec(spec, expected):
+    assert parse_page_spec(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["a", "0", "5-3", "1-x"])
+def test_parse_page_spec_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_page_spec(spec)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("0,35", 0.35),
+    ("1.234,5", 1234.5),
+    ("1,234.5", 1234.5),
+    ("1.234.567", 1234.567),
+    ("-", None),
+    ("", None),
+])
+def test_parse_decimal(value, expected):
+    assert parse_decimal(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("01/02/2025", "2025-02-01"),
+    ("2025-02-01", "2025-02-01"),
+    ("1-Feb-25", "2025-02-01"),
+    ("Feb 1, 2025", "2025-02-01"),
+    ("besok", None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+def test_parse_int_ignores_non_ascii_digits():
+    assert parse_int("No. 12") == 12
+    assert parse_int("²") is None
+
+
+def test_html_table_spans_are_expanded():
+    grid = extract_tables(rekap_page([["BLACK", "US", "01/02/2025", "1", "2", "3", "4", "10"]]))[0]
+    # Baris header pertama: COLOR (rowspan) & SIZE (colspan) diisi ulang ke setiap sel
+    assert grid.shape == (3, 8)
+    assert grid[1, 0] == grid[0, 0]
+    assert list(grid[0, 3:7]) == [grid[0, 3]] * 4
+
+
+def test_breakdown_matrix_rows():
+    markdown = rekap_page([
+        ["BLACK", "us", "01/02/2025", "1", "", "1.200", "0", "1201"],
+        ["", "JP", "02/02/2025", "", "5", "", "", "5"],
+        ["TOTAL", "", "", "1", "5", "1200", "", "1206"],
+    ])
+    rows = extract_page(markdown)[BREAKDOWN_TABLE]
+    assert [(r["color"], r["country_code"], r["size_code"], r["quantity"], r["shipment_date"]) for r in rows] == [
+        ("BLACK", "US", "XS", "1", "2025-02-01"),
+        ("BLACK", "US", "M", "1200", "2025-02-01"),
+        ("BLACK", "JP", "S", "5", "2025-02-02"),
+    ]
+    assert {r["type"] for r in rows} == {"breakdown"}
+
+
+def test_breakdown_without_country_is_main():
+    rows = extract_page(rekap_page([["NAVY", "3", "", "", "", "3"]], country=False))[BREAKDOWN_TABLE]
+    assert [(r["size_code"], r["quantity"], r["type"], r["country_code"]) for r in rows] == [("XS", "3", "main", None)]
+
+
+@pytest.mark.parametrize("cells, expected", [
+    # Melebihi int64: dulu OverflowError saat cast
+    (["99999999999999999999999"], {"XS": "99999999999999999999999"}),
+    # Superscript lolos isdigit tapi bukan angka: dulu ValueError
+    (["12²", "5"], {"S": "5"}),
+    (["0012", "0", "1.234"], {"XS": "12", "M": "1234"}),
+])
+def test_breakdown_quantity_regressions(cells, expected):
+    row = ["BLACK", "US", "01/02/2025"] + cells + [""] * (len(SIZES) - len(cells)) + ["1"]
+    rows = extract_page(rekap_page([row]))[BREAKDOWN_TABLE]
+    assert {r["size_code"]: r["quantity"] for r in rows} == expected
+
+
+def test_material_rows():
+    rows = extract_page(material_page())[MATERIAL_TABLE]
+    assert len(rows) == 2
+    first, second = rows
+    assert first["item_number"] == 1
+    assert first["style"] == "ST-100"
+    assert first["garmen_color"] == "BLACK"
+    assert first["material_color"] == "RED"
+    assert first["job_order"] == 12345
+    assert first["item_material_description_1"] == "Cotton Twill"
+    assert first["item_material_description_2"] == "Main body"
+    assert first["consumption_yy_mt"] == 1.25
+    assert first["um"] == "YD"
+    # Sel style kosong = sel merge, diisi dari baris di atasnya
+    assert second["style"] == "ST-100"
+    assert second["item_material_description_2"] is None
+    assert second["consumption_yy_mt"] == 0.5
+
+
+def test_unrelated_table_is_skipped():
+    markdown = "| Nama | Alamat |\n|---|---|\n| A | B |\n"
+    assert extract_page(markdown) == {BREAKDOWN_TABLE: [], MATERIAL_TABLE: []}
+
+
+def test_extract_document_sections():
+    result = extract_document(
+        {
+            "rekap_order_page": {1: rekap_page([["BLACK", "US", "01/02/2025", "7", "", "", "", "7"]])},
+            "material_fabric_page": {2: material_page() + "\n| Nama | Alamat |\n|---|---|\n| A | B |\n"},
+        },
+        {"rekap_order_page": [1], "material_fabric_page": [2, 3]},
+        tp_header_id=42,
+    )
+    assert len(result[BREAKDOWN_TABLE]) == 1
+    assert len(result[MATERIAL_TABLE]) == 2
+    assert result["tables"] == 2
+    assert result["tables_skipped"] == 1
+    assert result["missing_pages"] == {"material_fabric_page": [3]}
+    row = result[BREAKDOWN_TABLE][0]
+    assert row["tp_header_id"] == 42
+    assert row["source"] == {"section": "rekap_order_page", "page": 1, "table": 0}
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import job_queue
+from job_queue import STATUS_ANALYSIS, STATUS_FAILED, STATUS_FINISH, STATUS_OCR, STATUS_WAITING, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def create(store: JobStore, name: str) -> str:
+    return store.create(f"{name}.pdf", f"/tmp/{name}.pdf", f"/out/.tmp-{name}", "http://x", {"pages": "1"})
+
+
+def test_claim_next_takes_oldest_waiting_job(store):
+    first, second = create(store, "a"), create(store, "b")
+    job = store.claim_next()
+    assert job["id"] == first
+    assert job["status"] == STATUS_OCR
+    assert job["attempts"] == 1
+    assert job["params"] == {"pages": "1"}
+    assert store.claim_next()["id"] == second
+    assert store.claim_next() is None
+
+
+def test_concurrent_claims_never_share_a_job(store):
+    created = {create(store, str(i)) for i in range(40)}
+    claimed = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            job = store.claim_next()
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(created)
+
+
+def test_recover_interrupted_requeues_and_fails_exhausted(store, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    # exhausted sudah 2 kali terputus, retried baru 1 kali, done selesai normal
+    exhausted = create(store, "b")
+    store.claim_next()
+    store.recover_interrupted()
+    store.claim_next()
+    assert store.get(exhausted)["attempts"] == 2
+    retried, done = create(store, "a"), create(store, "c")
+    store.claim_next()
+    store.claim_next()
+    store.update_progress(retried, STATUS_ANALYSIS, 3, 3, {"1": "done"})
+    store.finish(done, {"markdown": "ok"})
+
+    assert sorted(store.recover_interrupted()) == sorted([retried])
+    assert store.get(retried)["status"] == STATUS_WAITING
+    assert store.get(retried)["page_progress"] == {"1": "done"}
+    assert store.get(exhausted)["status"] == STATUS_FAILED
+    assert store.get(done)["status"] == STATUS_FINISH
+    assert store.get(done)["result"] == {"markdown": "ok"}
+    assert store.active_base_paths() == ["/out/.tmp-a"]
+    assert store.count_by_status() == {STATUS_WAITING: 1, STATUS_FAILED: 1, STATUS_FINISH: 1}
+
+
+def test_jobs_survive_reopen(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    job_id = create(store, "a")
+    store.claim_next()
+    store.close()
+
+    reopened = JobStore(path)
+    try:
+        assert reopened.recover_interrupted() == [job_id]
+        assert reopened.claim_next()["attempts"] == 2
+    finally:
+        reopened.close()
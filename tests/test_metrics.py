@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+
+import metrics
+from metrics import RETIRED_SNAPSHOT, Registry, merge_snapshots, read_peer_snapshots, render_metrics, retire_snapshot
+
+
+def worker_snapshot(pages: float, stage_seconds: float, in_flight: float):
+    registry = Registry()
+    registry.counter("ocr_pages_total", "halaman", ["source"]).inc(pages, ("ocr",))
+    registry.histogram("ocr_stage_seconds", "stage", ["stage"], buckets=(1, 10)).observe(stage_seconds, ("render",))
+    registry.gauge("ocr_requests_in_flight", "in flight", ["route"]).set(in_flight, ("/document-parsing",))
+    return registry.snapshot()
+
+
+def samples(snapshot, name):
+    return {tuple(labels): value for labels, value in snapshot[name]["samples"]}
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_merge_snapshots_sums_counters_gauges_and_histograms():
+    merged = merge_snapshots([worker_snapshot(3, 0.5, 1), worker_snapshot(4, 5, 2)])
+    assert samples(merged, "ocr_pages_total") == {("ocr",): 7}
+    assert samples(merged, "ocr_requests_in_flight") == {("/document-parsing",): 3}
+    # [count per bucket (<=1, <=10, +Inf), sum, count]
+    assert samples(merged, "ocr_stage_seconds") == {("render",): [[1, 1, 0], 5.5, 2]}
+
+
+def test_render_metrics_histogram_is_cumulative():
+    text = render_metrics(merge_snapshots([worker_snapshot(3, 0.5, 1), worker_snapshot(4, 5, 2)]))
+    assert 'ocr_pages_total{source="ocr"} 7' in text
+    assert 'ocr_stage_seconds_bucket{stage="render",le="1"} 1' in text
+    assert 'ocr_stage_seconds_bucket{stage="render",le="10"} 2' in text
+    assert 'ocr_stage_seconds_bucket{stage="render",le="+Inf"} 2' in text
+    assert 'ocr_stage_seconds_count{stage="render"} 2' in text
+
+
+def test_dead_worker_snapshot_is_retired_once(tmp_path):
+    metrics_dir = str(tmp_path)
+    dead = os.path.join(metrics_dir, f"worker-{dead_pid()}.json")
+    with open(dead, "w") as f:
+        json.dump(worker_snapshot(5, 0.5, 9), f)
+
+    for _ in range(2):
+        merged = merge_snapshots(read_peer_snapshots(metrics_dir))
+        # Counter proses mati tetap dijumlahkan, gauge-nya tidak
+        assert samples(merged, "ocr_pages_total") == {("ocr",): 5}
+        assert "ocr_requests_in_flight" not in merged
+    assert not os.path.exists(dead)
+    assert os.path.exists(os.path.join(metrics_dir, RETIRED_SNAPSHOT))
+
+
+def test_retire_snapshot_adds_to_retired_totals(tmp_path, monkeypatch):
+    metrics_dir = str(tmp_path)
+    with open(os.path.join(metrics_dir, RETIRED_SNAPSHOT), "w") as f:
+        json.dump(merge_snapshots([{"ocr_pages_total": worker_snapshot(5, 0.5, 0)["ocr_pages_total"]}]), f)
+    registry = Registry()
+    registry.counter("ocr_pages_total", "halaman", ["source"]).inc(2, ("cache",))
+    registry.gauge("ocr_queue_depth", "antrian").set(4)
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    metrics.write_snapshot(metrics_dir)
+    retire_snapshot(metrics_dir)
+
+    assert not os.path.exists(os.path.join(metrics_dir, f"worker-{os.getpid()}.json"))
+    with open(os.path.join(metrics_dir, RETIRED_SNAPSHOT)) as f:
+        retired = json.load(f)
+    assert samples(retired, "ocr_pages_total") == {("ocr",): 5, ("cache",): 2}
+    assert "ocr_queue_depth" not in retired
@@ -0,0 +1,114 @@
+import os
+
+import ocr_cache
+from ocr_cache import PageCache
+
+
+def put_page(cache: PageCache, pages_dir, name: str, size: int) -> str:
+    """Tulis 1 halaman palsu (page.md berukuran size byte) ke cache, return key"""
+    os.makedirs(pages_dir, exist_ok=True)
+    with open(os.path.join(pages_dir, f"{name}.md"), "w") as f:
+        f.write("x" * size)
+    key = cache.make_key(name, 300)
+    cache.put(key, {"markdown_texts": name}, str(pages_dir), name)
+    return key
+
+
+def test_sync_keeps_entries_put_during_scan(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / "cache"), max_bytes=10**9)
+    first = put_page(cache, tmp_path / "pages", "a", 100)
+
+    # put() dari thread lain selesai setelah sync membaca isi folder cache
+    listdir = os.listdir
+    added = []
+
+    def listdir_then_put(path):
+        names = listdir(path)
+        if path == cache.cache_dir and not added:
+            added.append(put_page(cache, tmp_path / "pages", "b", 200))
+        return names
+
+    monkeypatch.setattr(ocr_cache.os, "listdir", listdir_then_put)
+    cache.sync()
+    monkeypatch.undo()
+
+    assert list(cache._entries) == [first, added[0]]
+    assert cache.total_bytes() == sum(cache._entries.values())
+
+
+def test_get_copies_cached_page(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"))
+    key = put_page(cache, tmp_path / "pages", "a", 10)
+
+    hit = cache.get(key, str(tmp_path / "out"), "doc_page_1")
+    assert hit is not None
+    markdown, files = hit
+    assert markdown == {"markdown_texts": "a"}
+    assert files == [str(tmp_path / "out" / "doc_page_1.md")]
+    with open(files[0]) as f:
+        assert f.read() == "x" * 10
+    assert cache.get(cache.make_key("lain", 300), str(tmp_path / "out"), "p") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_make_key_depends_on_dpi_model_and_extra(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"))
+    other_model = PageCache(str(tmp_path / "cache"), model_id="model-lain")
+    keys = {
+        cache.make_key("digest", 300),
+        cache.make_key("digest", 200),
+        cache.make_key("digest", 300, {"prompt_label": "table"}),
+        other_model.make_key("digest", 300),
+    }
+    assert len(keys) == 4
+    assert cache.make_key("digest", 300, {"a": 1, "b": 2}) == cache.make_key("digest", 300, {"b": 2, "a": 1})
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"), max_bytes=10**9)
+    a = put_page(cache, tmp_path / "pages", "a", 1000)
+    b = put_page(cache, tmp_path / "pages", "b", 1000)
+    entry_size = cache._entries[a]
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+
+    # a baru diakses, jadi b yang paling lama tidak dipakai
+    assert cache.get(a, str(tmp_path / "out"), "a") is not None
+    c = put_page(cache, tmp_path / "pages", "c", 1000)
+
+    assert list(cache._entries) == [a, c]
+    assert cache.total_bytes() <= cache.max_bytes
+    assert cache.stats["evictions"] == 1
+    assert cache.get(b, str(tmp_path / "out"), "b") is None
+    assert cache.get(a, str(tmp_path / "out"), "a") is not None
+
+
+def test_only_evicting_worker_enforces_limit_after_sync(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    primary = PageCache(cache_dir, max_bytes=10**9)
+    worker = PageCache(cache_dir, max_bytes=1, evict=False)
+    keys = [put_page(worker, tmp_path / "pages", name, 1000) for name in ("a", "b", "c")]
+
+    # Worker non-primary tidak pernah menghapus, walaupun melewati batas
+    assert all(worker.get(key, str(tmp_path / "out"), "p") is not None for key in keys)
+    assert primary.total_bytes() == 0
+
+    primary.sync()
+    assert set(primary._entries) == set(keys)
+    primary.max_bytes = primary.total_bytes() - 1
+    primary.sync()
+    assert len(primary._entries) == 2
+    assert sum(worker.get(key, str(tmp_path / "out"), "p") is not None for key in keys) == 2
+
+
+def test_sync_removes_stale_partial_entries(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"))
+    stale = tmp_path / "cache" / "ab" / ".tmp-abc-1234"
+    fresh = tmp_path / "cache" / "ab" / ".tmp-abd-5678"
+    stale.mkdir(parents=True)
+    fresh.mkdir()
+    old = os.path.getmtime(stale) - ocr_cache.STALE_TMP_SECONDS - 10
+    os.utime(stale, (old, old))
+
+    cache.sync()
+    assert not stale.exists()
+    assert fresh.exists()
@@ -0,0 +1,80 @@
+import os
+from datetime import datetime
+
+from output_layout import (
+    MANIFEST_FILENAME, document_dir_rel, document_files, manifest_rel_path, new_document_id, publish_dir,
+    split_document_key, staging_dir,
+)
+
+CONTENT_KEY = "ab" + "0" * 62
+
+
+def write(path, text="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_document_ids_and_dirs():
+    dated = new_document_id(CONTENT_KEY, "document", now=datetime(2025, 2, 1))
+    assert dated.startswith("20250201-")
+    assert document_dir_rel(dated) == f"2025/2025.02.01/{dated}"
+    assert new_document_id(CONTENT_KEY, "content") == CONTENT_KEY
+    assert document_dir_rel(CONTENT_KEY) == f"objects/ab/{CONTENT_KEY}"
+    assert manifest_rel_path(CONTENT_KEY) == f"objects/ab/{CONTENT_KEY}/{MANIFEST_FILENAME}"
+    assert new_document_id(CONTENT_KEY, "document") != new_document_id(CONTENT_KEY, "document")
+
+
+def test_invalid_document_ids_have_no_dir():
+    for document_id in ("", "../etc", "20250201-xyz", "AB" + "0" * 62):
+        assert document_dir_rel(document_id) is None
+        assert manifest_rel_path(document_id) is None
+
+
+def test_split_document_key():
+    dated = new_document_id(CONTENT_KEY, "document", now=datetime(2025, 2, 1))
+    doc_dir = document_dir_rel(dated)
+    assert split_document_key(f"{doc_dir}/image/a_page_1.jpg") == (doc_dir, "image/a_page_1.jpg")
+    assert split_document_key(f"objects/ab/{CONTENT_KEY}/{MANIFEST_FILENAME}") == (
+        f"objects/ab/{CONTENT_KEY}", MANIFEST_FILENAME,
+    )
+    # Folder dokumen sendiri / layout lama / id tidak cocok dengan folder tanggal
+    assert split_document_key(doc_dir) is None
+    assert split_document_key("2025/2025.02.01/pdf/a.pdf") is None
+    assert split_document_key(f"2024/2024.01.01/{dated}/a.md") is None
+
+
+def test_staging_dir_is_hidden_sibling(tmp_path):
+    root = str(tmp_path)
+    dated = new_document_id(CONTENT_KEY, "document", now=datetime(2025, 2, 1))
+    final = os.path.join(root, document_dir_rel(dated))
+    assert staging_dir(root, dated) == os.path.join(os.path.dirname(final), f".tmp-{dated}")
+    # Layout content: request identik bisa merakit dokumen yang sama bersamaan
+    first, second = staging_dir(root, CONTENT_KEY), staging_dir(root, CONTENT_KEY)
+    assert first != second
+    assert os.path.basename(first).startswith(f".tmp-{CONTENT_KEY}-")
+
+
+def test_publish_dir_first_writer_wins(tmp_path):
+    root = str(tmp_path)
+    final = os.path.join(root, document_dir_rel(CONTENT_KEY))
+    first, second = staging_dir(root, CONTENT_KEY), staging_dir(root, CONTENT_KEY)
+    write(os.path.join(first, MANIFEST_FILENAME), "first")
+    write(os.path.join(second, MANIFEST_FILENAME), "second")
+
+    assert publish_dir(first, final) is True
+    assert not os.path.exists(first)
+    assert publish_dir(second, final) is False
+    assert os.path.exists(second)
+    with open(os.path.join(final, MANIFEST_FILENAME)) as f:
+        assert f.read() == "first"
+
+
+def test_document_files_lists_manifest_last(tmp_path):
+    doc = str(tmp_path / "doc")
+    for rel in (MANIFEST_FILENAME, "a.md", "image/z_page_1.jpg", "markdown_pages/z_page_1.md"):
+        write(os.path.join(doc, rel))
+    files = document_files(doc)
+    assert files[-1] == os.path.join(doc, MANIFEST_FILENAME)
+    assert sorted(files[:-1]) == files[:-1]
+    assert len(files) == 4
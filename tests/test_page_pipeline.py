@@ -0,0 +1,59 @@
+import asyncio
+import tracemalloc
+
+import numpy as np
+
+from page_pipeline import MemoryBudget, PagePipeline
+
+PAGE_BYTES = 2 * 1024 * 1024
+
+
+def run_document(pages: int, ocr_every: int = 1):
+    """Proses dokumen palsu (array 2 MB per halaman), return (peak, memori tersisa sebelum aclose, encoded)"""
+    render_pages = list(range(1, pages + 1))
+    ocr_pages = [p for p in render_pages if p % ocr_every == 0]
+
+    async def render(page_num):
+        await asyncio.sleep(0)
+        return np.full(PAGE_BYTES, page_num % 256, dtype=np.uint8)
+
+    async def encode(page_num, image):
+        return {"path": f"page_{page_num}.jpg", "digest": str(page_num), "dpi": 300, "input": image.copy()}
+
+    async def dispatch(page_num, encoded):
+        return {"path": encoded["path"], "checksum": int(encoded["input"][0])}
+
+    async def main():
+        pipeline = PagePipeline(
+            render_pages, ocr_pages, render, encode, dispatch,
+            page_cost=lambda page_num: PAGE_BYTES * 2, budgets=[MemoryBudget(PAGE_BYTES * 8)],
+        )
+        tracemalloc.start()
+        pipeline.start()
+        try:
+            async for page_num, handle in pipeline.results():
+                assert handle["checksum"] == page_num % 256
+            await pipeline.wait_finished()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            await pipeline.aclose()
+        return peak, current, pipeline.encoded
+
+    return asyncio.run(main())
+
+
+def test_encoded_keeps_metadata_without_input():
+    _, _, encoded = run_document(6, ocr_every=2)
+    assert sorted(encoded) == [1, 2, 3, 4, 5, 6]
+    assert all("input" not in item for item in encoded.values())
+    assert encoded[3] == {"path": "page_3.jpg", "digest": "3", "dpi": 300}
+
+
+def test_memory_flat_as_page_count_grows():
+    small_peak, small_current, _ = run_document(8)
+    large_peak, large_current, _ = run_document(64)
+    # Peak dibatasi budget (bukan jumlah halaman), setelah selesai tidak ada array halaman yang tertahan
+    assert large_peak < small_peak * 1.5
+    assert large_current < PAGE_BYTES
+    assert small_current < PAGE_BYTES
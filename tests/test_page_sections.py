@@ -0,0 +1,83 @@
+import pytest
+
+from page_sections import SectionPlan, parse_sections, sections_key
+
+
+def test_parse_sections_json_and_form_fields():
+    sections = parse_sections(
+        '{"rekap_order_page": {"pages": "1-2", "dpi": 200, "prompt_label": "table"}, "material_fabric_page": [4, 3, 4]}',
+        {"material_fabric_page": "9", "material_pack_page": "5", "material_accessories_page": ""},
+    )
+    assert sorted(sections) == ["material_fabric_page", "material_pack_page", "rekap_order_page"]
+    rekap = sections["rekap_order_page"]
+    assert rekap.pages == [1, 2]
+    assert rekap.dpi == 200
+    # prompt_label hanya dipakai PaddleOCR-VL tanpa layout detection
+    assert rekap.predict == {"prompt_label": "table", "use_layout_detection": False}
+    # JSON menang atas field form dengan nama sama
+    assert sections["material_fabric_page"].pages == [3, 4]
+    assert sections["material_pack_page"].pages == [5]
+    assert sections["material_pack_page"].dpi is None
+
+
+def test_parse_sections_empty():
+    assert parse_sections(None) == {}
+    assert parse_sections("  ", {"rekap_order_page": None}) == {}
+
+
+@pytest.mark.parametrize("raw", [
+    "[1, 2]",
+    "bukan json",
+    '{"nama spasi": "1"}',
+    '{"a": {"pages": "1", "warna": "merah"}}',
+    '{"a": {"pages": []}}',
+    '{"a": [0]}',
+    '{"a": true}',
+    '{"a": {"pages": "1", "prompt_label": "foto"}}',
+    '{"a": {"pages": "1", "use_layout_detection": "ya"}}',
+    '{"a": {"pages": "1", "dpi": 10000}}',
+])
+def test_parse_sections_invalid(raw):
+    with pytest.raises(ValueError):
+        parse_sections(raw)
+
+
+def test_sections_key_is_stable():
+    a = parse_sections({"b": "2", "a": {"pages": [1], "prompt_label": "ocr"}})
+    b = parse_sections({"a": {"pages": "1", "prompt_label": "ocr"}, "b": [2]})
+    assert sections_key(a) == sections_key(b)
+    assert sections_key({}) is None
+
+
+def test_section_plan_shares_pages_and_variants():
+    sections = parse_sections({
+        "rekap_order_page": {"pages": "1-2", "dpi": 200},
+        "material_fabric_page": {"pages": "2-3", "dpi": 250},
+        "material_pack_page": {"pages": [2, 9], "prompt_label": "table"},
+    })
+    plan = SectionPlan(sections, total_pages=5, default_dpi=None)
+
+    # Halaman 2 dipakai 3 section tapi dirender 1 kali, DPI terbesar yang diminta
+    assert plan.ocr_pages == [1, 2, 3]
+    assert plan.page_dpi(1, 300) == 200
+    assert plan.page_dpi(2, 300) == 250
+    assert plan.page_dpi(4, 300) == 300
+
+    # Section dengan parameter predict sama berbagi varian OCR
+    assert plan.variants(2) == [{}, {"prompt_label": "table", "use_layout_detection": False}]
+    assert plan.variant_of("rekap_order_page", 2) == plan.variant_of("material_fabric_page", 2) == 0
+    assert plan.variant_of("material_pack_page", 2) == 1
+    assert plan.variants(4) == [{}]
+    assert plan.sections_of(2) == ["rekap_order_page", "material_fabric_page", "material_pack_page"]
+    assert plan.sections_of(4) == []
+
+    # Halaman di luar jumlah halaman dokumen dilaporkan, bukan di-OCR
+    assert plan.section_pages["material_pack_page"] == [2]
+    assert plan.skipped_pages == {"material_pack_page": [9]}
+
+
+def test_section_plan_without_requested_dpi_uses_default():
+    plan = SectionPlan(parse_sections({"a": "1", "b": {"pages": "1", "dpi": "auto"}}), total_pages=1, default_dpi=None)
+    assert plan.page_dpi(1, 150) is None
+    plan = SectionPlan(parse_sections({"a": "1"}), total_pages=1, default_dpi=180)
+    assert plan.page_dpi(1, 300) == 180
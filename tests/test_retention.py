@@ -0,0 +1,160 @@
+import json
+import os
+import time
+
+import pytest
+
+from output_layout import MANIFEST_FILENAME, document_dir_rel
+from retention import RetentionPolicy, RetentionService, group_objects, is_page_image
+from storage import LocalStorage
+
+DAY = 24 * 3600.0
+NOW = time.time()
+
+
+def make_document(root: str, index: int, age_days: float, size: int = 100, access_days: float = None) -> str:
+    """Dokumen layout content berisi PDF asli, image halaman, markdown & manifest, umur age_days hari"""
+    document_id = f"{index:02x}" + "0" * 62
+    doc_dir = document_dir_rel(document_id)
+    manifest = {
+        "source": "pdf/a.pdf",
+        "pages": {"1": {"image": "image/a_page_1.jpg", "thumbnail": False, "markdown": "markdown_pages/a_page_1.md"}},
+    }
+    files = {
+        "pdf/a.pdf": "p" * size,
+        "image/a_page_1.jpg": "i" * size,
+        "markdown_pages/a_page_1.md": "m" * size,
+        "a.md": "m" * size,
+        MANIFEST_FILENAME: json.dumps(manifest),
+    }
+    mtime = NOW - age_days * DAY
+    atime = NOW - (age_days if access_days is None else access_days) * DAY
+    for rel, text in files.items():
+        path = os.path.join(root, doc_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        os.utime(path, (atime, mtime))
+    return doc_dir
+
+
+def remaining(root: str, doc_dir: str):
+    path = os.path.join(root, doc_dir)
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), path) for dirpath, _, names in os.walk(path) for name in names
+    )
+
+
+def run(root: str, **policy) -> dict:
+    policy.setdefault("staging_hours", 0)
+    policy.setdefault("min_age_hours", 1)
+    service = RetentionService(LocalStorage(root, "/outputs"), RetentionPolicy(**{
+        "image_days": 0, "source_days": 0, "document_days": 0, "max_bytes": 0, **policy,
+    }), local_roots=[root])
+    return service.run(now=NOW)
+
+
+def test_disabled_policy_touches_nothing(tmp_path):
+    root = str(tmp_path)
+    doc = make_document(root, 1, age_days=400)
+    report = run(root)
+    assert report["files_deleted"] == 0
+    assert report["bytes_before"] is None
+    assert len(remaining(root, doc)) == 5
+
+
+def test_document_days_deletes_whole_old_documents(tmp_path):
+    root = str(tmp_path)
+    old, young = make_document(root, 1, age_days=40), make_document(root, 2, age_days=10)
+    report = run(root, document_days=30)
+    assert remaining(root, old) == []
+    assert not os.path.exists(os.path.join(root, old))
+    assert len(remaining(root, young)) == 5
+    assert report["policies"]["documents"]["files"] == 5
+
+
+def test_image_and_source_days_compact_and_update_manifest(tmp_path):
+    root = str(tmp_path)
+    images_only, both = make_document(root, 1, age_days=10), make_document(root, 2, age_days=40)
+    report = run(root, image_days=7, source_days=30)
+
+    assert remaining(root, images_only) == ["a.md", MANIFEST_FILENAME, "markdown_pages/a_page_1.md", "pdf/a.pdf"]
+    assert remaining(root, both) == ["a.md", MANIFEST_FILENAME, "markdown_pages/a_page_1.md"]
+    assert report["policies"]["images"]["files"] == 2
+    assert report["policies"]["source"]["files"] == 1
+
+    with open(os.path.join(root, images_only, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    # PDF asli masih ada: halaman beralih ke thumbnail lazy
+    assert manifest["pages"]["1"] == {"image": None, "thumbnail": True, "markdown": "markdown_pages/a_page_1.md"}
+    with open(os.path.join(root, both, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    assert manifest["pages"]["1"]["thumbnail"] is False
+    assert "source_dropped_at" in manifest["retention"]
+
+
+def test_size_cap_deletes_least_recently_accessed_first(tmp_path):
+    root = str(tmp_path)
+    stale = make_document(root, 1, age_days=5, size=1000, access_days=5)
+    used = make_document(root, 2, age_days=9, size=1000, access_days=0.5)
+    newest = make_document(root, 3, age_days=2, size=1000, access_days=2)
+    document_size = sum(os.path.getsize(os.path.join(root, stale, rel)) for rel in remaining(root, stale))
+
+    report = run(root, max_bytes=document_size * 2)
+    assert remaining(root, stale) == []
+    assert len(remaining(root, used)) == 5
+    assert len(remaining(root, newest)) == 5
+    assert report["bytes_after"] <= document_size * 2
+
+
+def test_recently_modified_documents_are_protected(tmp_path):
+    root = str(tmp_path)
+    doc = make_document(root, 1, age_days=0.01)
+    run(root, document_days=0.001, max_bytes=1)
+    assert len(remaining(root, doc)) == 5
+
+
+def test_staging_cleanup_keeps_active_jobs(tmp_path):
+    root = str(tmp_path)
+    stale, active, fresh = (os.path.join(root, "2025", "2025.02.01", f".tmp-{name}") for name in ("a", "b", "c"))
+    for path in (stale, active, fresh):
+        os.makedirs(path)
+        with open(os.path.join(path, "a.md"), "w") as f:
+            f.write("x")
+    for path in (stale, active):
+        old = NOW - 2 * DAY
+        os.utime(os.path.join(path, "a.md"), (old, old))
+        os.utime(path, (old, old))
+
+    service = RetentionService(
+        LocalStorage(root, "/outputs"), RetentionPolicy(0, 0, 0, 0, staging_hours=24),
+        local_roots=[root], protected=lambda: [active],
+    )
+    report = service.run(now=NOW)
+    assert not os.path.exists(stale)
+    assert os.path.exists(active) and os.path.exists(fresh)
+    assert report["policies"]["staging"]["files"] == 1
+
+
+@pytest.mark.parametrize("rel, expected", [
+    ("image/a_page_1.jpg", True),
+    ("thumbnail/a_page_1.jpg", True),
+    ("image/foto.jpg", False),
+    ("markdown_pages/a_page_1.md", False),
+])
+def test_is_page_image(rel, expected):
+    assert is_page_image(rel) is expected
+
+
+def test_group_objects_includes_legacy_layout(tmp_path):
+    root = str(tmp_path)
+    doc = make_document(root, 1, age_days=1)
+    legacy = os.path.join(root, "2024", "2024.01.01", "pdf", "lama.pdf")
+    os.makedirs(os.path.dirname(legacy))
+    open(legacy, "w").close()
+    open(os.path.join(root, "lain.txt"), "w").close()
+
+    groups = group_objects(LocalStorage(root, "/outputs").scan())
+    assert sorted(groups) == sorted([doc, "2024/2024.01.01"])
+    assert groups["2024/2024.01.01"].legacy is True
+    assert len(groups[doc].objects) == 5
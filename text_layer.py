@@ -0,0 +1,113 @@
+"""
+Jalur cepat text layer untuk PDF born-digital (export Excel / PLM).
+
+Halaman yang punya cukup teks TERLIHAT (bukan layer OCR tak terlihat hasil scanner) langsung
+diubah ke markdown dari text layer-nya, tabel via PyMuPDF find_tables().to_markdown(),
+tanpa render & tanpa PaddleOCRVL.predict. Halaman lain tetap masuk model seperti biasa.
+
+Hasilnya dibungkus sebagai dict yang formatnya sama dengan res.markdown PaddleOCR-VL agar bisa
+ikut digabung oleh concatenate_markdown_pages.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+# Mode text layer:
+# - off  : semua halaman di-OCR (default)
+# - auto : halaman dengan text layer yang cukup tidak dikirim ke model
+TEXT_LAYER_MODES = {"off", "auto"}
+TEXT_LAYER_MODE = os.getenv("TEXT_LAYER_MODE", "off")
+# Minimal jumlah karakter terlihat (tanpa spasi) agar halaman dianggap born-digital
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "200"))
+
+# Span text trace type 3 = render mode invisible (layer OCR di atas scan)
+_INVISIBLE_TEXT = 3
+
+
+class TextLayerPage:
+    """Hasil stage render untuk halaman yang diproses dari text layer (tanpa image)"""
+
+    __slots__ = ("markdown",)
+
+    def __init__(self, markdown: str):
+        self.markdown = markdown
+
+
+def resolve_text_layer_mode(mode: Optional[str]) -> str:
+    """Mode dari request, fallback ke env TEXT_LAYER_MODE"""
+    mode = (mode or TEXT_LAYER_MODE).lower()
+    return mode if mode in TEXT_LAYER_MODES else "off"
+
+
+def count_visible_chars(page) -> int:
+    """Jumlah karakter non-spasi yang benar-benar tergambar di halaman"""
+    total = 0
+    for span in page.get_texttrace():
+        if span.get("type") == _INVISIBLE_TEXT or span.get("opacity", 1) == 0:
+            continue
+        total += sum(1 for char in span["chars"] if not chr(char[0]).isspace())
+    return total
+
+
+def detect_text_layer_pages(pdf_path: str, page_numbers: List[int], min_chars: int = TEXT_LAYER_MIN_CHARS) -> List[int]:
+    """Halaman (dari page_numbers) yang cukup diproses dari text layer. Blocking, panggil via run_io."""
+    try:
+        import pymupdf
+    except ImportError:
+        return []
+
+    selected = []
+    with pymupdf.open(pdf_path) as doc:
+        for page_num in page_numbers:
+            if 1 <= page_num <= doc.page_count and count_visible_chars(doc[page_num - 1]) >= min_chars:
+                selected.append(page_num)
+    return selected
+
+
+def page_markdown(page) -> str:
+    """Markdown 1 halaman: blok teks & tabel diurutkan sesuai posisi (atas ke bawah, kiri ke kanan)"""
+    import pymupdf
+
+    items = []
+    table_rects = []
+    try:
+        tables = page.find_tables().tables
+    except Exception:
+        tables = []
+    for table in tables:
+        markdown = table.to_markdown(clean=False).strip()
+        if not markdown:
+            continue
+        rect = pymupdf.Rect(table.bbox)
+        table_rects.append(rect)
+        items.append((rect.y0, rect.x0, markdown))
+
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks", sort=True):
+        if block_type != 0:
+            continue
+        center = pymupdf.Point((x0 + x1) / 2, (y0 + y1) / 2)
+        # Teks di dalam tabel sudah ada di markdown tabel
+        if any(rect.contains(center) for rect in table_rects):
+            continue
+        text = text.strip()
+        if text:
+            items.append((y0, x0, text))
+
+    items.sort(key=lambda item: (round(item[0]), item[1]))
+    return "\n\n".join(item[2] for item in items)
+
+
+def extract_page_markdown(pdf_path: str, page_num: int) -> str:
+    """Buka PDF dan buat markdown 1 halaman dari text layer. Blocking, panggil via run_io."""
+    import pymupdf
+
+    with pymupdf.open(pdf_path) as doc:
+        return page_markdown(doc[page_num - 1])
+
+
+def text_layer_result(markdown_text: str) -> Dict[str, Any]:
+    """Bungkus markdown text layer dengan format res.markdown PaddleOCR-VL"""
+    return {
+        "markdown_texts": markdown_text,
+        "markdown_images": {},
+        "page_continuation_flags": (True, True),
+    }
@@ -0,0 +1,313 @@
+"""
+Tracing per request (opsional, TRACING_ENABLED=1): span bertingkat untuk 1 parsing dokumen.
+
+    request document_parsing
+    ├── receive            (request masuk sampai form upload selesai dibaca)
+    ├── save               (tampung upload + hash, pindah ke folder dokumen)
+    ├── parse_document
+    │   ├── open_pdf
+    │   ├── page {page, width_pt, height_pt, dpi, source}
+    │   │   ├── render / encode / predict / save_to_markdown
+    │   ├── concatenate, write_markdown, publish
+    │   └── build_urls
+    └── ...
+
+Span disimpan di contextvar sehingga ikut ke task asyncio turunan; span stage halaman diberi
+parent eksplisit (span `page`) karena stage halaman berjalan di task pipeline yang berbeda.
+Tanpa trace aktif semua fungsi span() langsung no-op.
+
+Trace selesai diekspor sebagai OTLP JSON (1 ExportTraceServiceRequest per baris, format file
+exporter OpenTelemetry Collector) ke TRACE_EXPORT_PATH oleh thread background. Trace yang lebih
+lama dari TRACE_SLOW_SECONDS juga di-dump utuh (tree span + ukuran halaman) ke TRACE_SLOW_DIR.
+"""
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from log import print_with_time
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0") == "1"
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", os.path.join("data", "traces", "spans.jsonl"))
+TRACE_EXPORT_MAX_BYTES = int(float(os.getenv("TRACE_EXPORT_MAX_MB", "100")) * 1024 * 1024)
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "60"))
+TRACE_SLOW_DIR = os.getenv("TRACE_SLOW_DIR", os.path.join("data", "traces", "slow"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "paddleocr-vl-api")
+
+# OTLP: SPAN_KIND_INTERNAL / SPAN_KIND_SERVER, STATUS_CODE_OK / STATUS_CODE_ERROR
+_KIND_INTERNAL = 1
+_KIND_SERVER = 2
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Kumpulan span 1 request"""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "kind")
+
+    def __init__(self, trace: Trace, name: str, parent: Optional["Span"], attributes: Dict[str, Any],
+                 start_ns: Optional[int] = None, kind: int = _KIND_INTERNAL):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.error: Optional[str] = None
+        self.kind = kind
+        trace.add(self)
+
+    @property
+    def is_root(self) -> bool:
+        return self.parent_id is None
+
+    def duration_seconds(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        """Tandai span gagal (untuk error yang ditangkap handler & dijadikan response)"""
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self, error: Optional[BaseException] = None):
+        """Tutup span (idempotent). Root span yang ditutup mengekspor seluruh trace."""
+        if self.end_ns is not None:
+            return
+        if error is not None:
+            self.set_error(error)
+        self.end_ns = time.time_ns()
+        if self.is_root:
+            _finish_trace(self)
+
+
+# ---------- API span ----------
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_trace(name: str, start_ns: Optional[int] = None, **attributes) -> Optional[Span]:
+    """Root span request baru (None jika tracing mati). Tutup dengan span.end()."""
+    if not TRACING_ENABLED:
+        return None
+    return Span(Trace(), name, None, attributes, start_ns=start_ns, kind=_KIND_SERVER)
+
+
+def start_span(name: str, parent: Optional[Span] = None, start_ns: Optional[int] = None, **attributes) -> Optional[Span]:
+    """Span anak dari `parent` / span aktif, None jika tidak ada trace aktif"""
+    parent = parent or _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent, attributes, start_ns=start_ns)
+
+
+@contextmanager
+def use_span(span: Optional[Span], end: bool = False) -> Iterator[Optional[Span]]:
+    """Jadikan span aktif di blok ini (end=True: tutup span di akhir blok)"""
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if end:
+            span.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        if end:
+            span.end()
+
+
+@contextmanager
+def trace_request(name: str, start_ns: Optional[int] = None, **attributes) -> Iterator[Optional[Span]]:
+    """`with trace_request("document_parsing", ...)`: root span aktif selama blok"""
+    with use_span(start_trace(name, start_ns=start_ns, **attributes), end=True) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Optional[Span]]:
+    """`with span("render", parent=page_span, page=3):` - no-op tanpa trace aktif"""
+    with use_span(start_span(name, parent=parent, **attributes), end=True) as active:
+        yield active
+
+
+def record_span(name: str, start_ns: int, parent: Optional[Span] = None, **attributes) -> Optional[Span]:
+    """Span yang sudah terjadi (mulai start_ns, selesai sekarang), mis. waktu terima upload"""
+    created = start_span(name, parent=parent, start_ns=start_ns, **attributes)
+    if created is not None:
+        created.end()
+    return created
+
+
+# ---------- Export ----------
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP JSON: int64 ditulis sebagai string
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """Trace -> ExportTraceServiceRequest (OTLP/JSON)"""
+    spans = []
+    for item in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": item.kind,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns or item.start_ns),
+            "attributes": _otlp_attributes(item.attributes),
+            "status": {"code": _STATUS_ERROR, "message": item.error} if item.error else {"code": _STATUS_OK},
+        }
+        if item.parent_id:
+            otlp_span["parentSpanId"] = item.parent_id
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "paddleocr-vl-api.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def span_tree(trace: Trace) -> Optional[Dict[str, Any]]:
+    """Tree span bersarang (urut waktu mulai) untuk dump request lambat"""
+    nodes = {
+        item.span_id: {
+            "name": item.name,
+            "start_offset_seconds": 0.0,
+            "duration_seconds": round(item.duration_seconds(), 4) if item.end_ns else None,
+            "attributes": item.attributes,
+            **({"error": item.error} if item.error else {}),
+            "children": [],
+        }
+        for item in trace.spans
+    }
+    root = None
+    ordered = sorted(trace.spans, key=lambda item: item.start_ns)
+    root_start = min(item.start_ns for item in ordered)
+    for item in ordered:
+        node = nodes[item.span_id]
+        node["start_offset_seconds"] = round((item.start_ns - root_start) / 1e9, 4)
+        if item.parent_id is None:
+            root = node
+        elif item.parent_id in nodes:
+            nodes[item.parent_id]["children"].append(node)
+    return root
+
+
+def slow_request_dump(root: Span) -> Dict[str, Any]:
+    """Isi dump request lambat: ringkasan, ukuran halaman & tree span lengkap"""
+    pages = [
+        dict(item.attributes, duration_seconds=round(item.duration_seconds() or 0.0, 4))
+        for item in sorted(root.trace.spans, key=lambda item: item.attributes.get("page", 0))
+        if item.name == "page"
+    ]
+    return {
+        "trace_id": root.trace.trace_id,
+        "name": root.name,
+        "duration_seconds": round(root.duration_seconds(), 4),
+        "threshold_seconds": TRACE_SLOW_SECONDS,
+        "attributes": root.attributes,
+        "error": root.error,
+        "pages": pages,
+        "tree": span_tree(root.trace),
+    }
+
+
+class _Exporter:
+    """Thread background penulis file trace, agar handler tidak menunggu disk"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Span]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, root: Span):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        self._queue.put(root)
+
+    def _run(self):
+        while True:
+            root = self._queue.get()
+            try:
+                export_trace(root)
+            except Exception as e:
+                print_with_time(f"Gagal ekspor trace {root.trace.trace_id}: {e}")
+
+
+def export_trace(root: Span, export_path: str = TRACE_EXPORT_PATH, slow_dir: str = TRACE_SLOW_DIR):
+    """Tulis trace ke file OTLP JSON lines + dump jika lambat (blocking)"""
+    if export_path:
+        os.makedirs(os.path.dirname(export_path) or ".", exist_ok=True)
+        if os.path.exists(export_path) and os.path.getsize(export_path) > TRACE_EXPORT_MAX_BYTES:
+            os.replace(export_path, f"{export_path}.1")
+        line = (json.dumps(to_otlp(root.trace), ensure_ascii=False) + "\n").encode("utf-8")
+        # 1 write O_APPEND per trace: baris dari beberapa worker tidak saling menyela
+        fd = os.open(export_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    duration = root.duration_seconds() or 0.0
+    if slow_dir and duration >= TRACE_SLOW_SECONDS:
+        os.makedirs(slow_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(root.start_ns / 1e9))
+        path = os.path.join(slow_dir, f"{stamp}-{root.trace.trace_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(slow_request_dump(root), f, ensure_ascii=False, indent=2)
+        print_with_time(f"Request lambat ({duration:.1f} detik), trace di-dump ke {path}")
+
+
+_exporter = _Exporter()
+
+
+def _finish_trace(root: Span):
+    # Span anak yang belum ditutup (error / batal di tengah halaman) ditutup bersama root
+    for item in root.trace.spans:
+        if item.end_ns is None:
+            item.end_ns = root.end_ns
+    _exporter.submit(root)